@@ -9,7 +9,8 @@ c.InteractiveShellApp.extensions = [
     'IPython.extensions.autoreload',
 ]
 c.IPKernelApp.exec_lines = [
-    'import os; os.chdir("/app/source")'
+    'import os; os.chdir("/app/source")',
+    'os.environ.setdefault("MICAP_LIVE_RELOAD", "1")'
 ]
 c.InteractiveShellApp.exec_lines = [
     'import os; os.chdir("/app/source")'
@@ -0,0 +1,6 @@
+#!/bin/bash
+# Start the pre-warmed fork server that micap_run.sh --forkServer submits jobs to.
+# Restart it after publishing a release pinned with MICAP_CODE_VERSION.
+
+docker rm -f micap_fork_server >/dev/null 2>&1
+docker run --detach --name micap_fork_server --restart unless-stopped --network micapnetwork --env "PYTHONUNBUFFERED=1" --env MICAP_IMPORT_MODE --env MICAP_REDIS_URL --env MICAP_CODE_VERSION --env MICAP_PRELOAD_MODULES --volume micap_bytecode_cache:/var/cache/micap/bytecode --volume micap_profiles:/var/lib/micap/profiles --volume micap_artifacts:/var/lib/micap/artifacts --shm-size=${MICAP_SHM_SIZE:-2g} --privileged --entrypoint poetry micaprun:latest run python -u source/micap_runtime/fork_server.py serve
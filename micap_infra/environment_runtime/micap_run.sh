@@ -10,6 +10,12 @@ die() {
 # This ensures we are not contaminated by variables from the environment.
 jobModule="none"
 runDate="none"
+codeVersion=""
+forkServer=0
+batch=""
+dag=""
+concurrency=""
+runnerArgs=""
 
 while :; do
     case $1 in
@@ -32,6 +38,33 @@ while :; do
     --logLevel=?*)
         logLevel=${1#*=} # Delete everything up to "=" and assign the remainder.
         ;;
+    --codeVersion=?*)
+        codeVersion=${1#*=} # Pin the job to an immutable codebase release.
+        ;;
+    --batch=?*)
+        batch=${1#*=} # JSON manifest of jobs to run concurrently in one container.
+        ;;
+    --dag=?*)
+        dag=${1#*=} # JSON spec of chained jobs run in one container, passing results in-process.
+        ;;
+    --concurrency=?*)
+        concurrency=${1#*=}
+        ;;
+    --partitionSize=?*)
+        runnerArgs="$runnerArgs $1" # Run dates per partition when --runDate is a range.
+        ;;
+    --profile=?*)
+        runnerArgs="$runnerArgs $1" # cpu, mem or both, written to the micap_profiles volume.
+        ;;
+    --asyncConcurrency=?* | --asyncTimeout=?*)
+        runnerArgs="$runnerArgs $1" # Limits of a job defining async def main.
+        ;;
+    --ignoreCheckpoints | --forceRerun)
+        runnerArgs="$runnerArgs $1"
+        ;;
+    --forkServer)
+        forkServer=1 # Fork the job from the pre-warmed server started by micap_fork_server.sh.
+        ;;
         
     -v | --verbose)
         verbose=$((verbose + 1)) # Each -v adds 1 to verbosity.
@@ -60,6 +93,32 @@ else
     printf "Argument logLevel is %s\n" "$logLevel"
 fi
 
+if [ -n "$codeVersion" ]; then
+    printf "Argument codeVersion is %s\n" "$codeVersion"
+fi
+
+if [ -n "$batch" ]; then
+    printf "Argument batch is %s\n" "$batch"
+    batchArgs="--batch=- --logLevel=$logLevel$runnerArgs"
+    [ "$runDate" != "none" ] && batchArgs="$batchArgs --runDate=$runDate"
+    [ -n "$concurrency" ] && batchArgs="$batchArgs --concurrency=$concurrency"
+    exec docker run --interactive --network micapnetwork --env "PYTHONUNBUFFERED=1" --env MICAP_IMPORT_MODE --env MICAP_REDIS_URL --env "MICAP_CODE_VERSION=$codeVersion" --volume micap_bytecode_cache:/var/cache/micap/bytecode --volume micap_profiles:/var/lib/micap/profiles --volume micap_artifacts:/var/lib/micap/artifacts --shm-size=${MICAP_SHM_SIZE:-2g} --privileged micaprun:latest $batchArgs <"$batch"
+fi
+
+if [ -n "$dag" ]; then
+    printf "Argument dag is %s\n" "$dag"
+    dagArgs="--dag=- --logLevel=$logLevel$runnerArgs"
+    [ "$runDate" != "none" ] && dagArgs="$dagArgs --runDate=$runDate"
+    exec docker run --interactive --network micapnetwork --env "PYTHONUNBUFFERED=1" --env MICAP_IMPORT_MODE --env MICAP_REDIS_URL --env "MICAP_CODE_VERSION=$codeVersion" --volume micap_bytecode_cache:/var/cache/micap/bytecode --volume micap_profiles:/var/lib/micap/profiles --volume micap_artifacts:/var/lib/micap/artifacts --shm-size=${MICAP_SHM_SIZE:-2g} --privileged micaprun:latest $dagArgs ${concurrency:+--concurrency=$concurrency} <"$dag"
+fi
+
+if [ "$forkServer" -eq 1 ]; then
+    if [ "$(docker inspect -f '{{.State.Running}}' micap_fork_server 2>/dev/null)" = "true" ]; then
+        exec docker exec --env MICAP_IMPORT_PROFILE micap_fork_server python -u source/micap_runtime/fork_server.py run -- --jobModule=$jobModule --runDate=$runDate --logLevel=$logLevel ${codeVersion:+--codeVersion=$codeVersion}$runnerArgs
+    fi
+    printf 'WARN: Fork server is not running, starting a new container\n' >&2
+fi
+
 #docker run -ti --rm test /file.sh abc
 #jobModule
-docker run --network micapnetwork --env "PYTHONUNBUFFERED=1" --privileged micaprun:latest --jobModule=$jobModule --runDate=$runDate --logLevel=$logLevel
+docker run --network micapnetwork --env "PYTHONUNBUFFERED=1" --env MICAP_IMPORT_MODE --env MICAP_REDIS_URL --env "MICAP_CODE_VERSION=$codeVersion" --volume micap_bytecode_cache:/var/cache/micap/bytecode --volume micap_profiles:/var/lib/micap/profiles --volume micap_artifacts:/var/lib/micap/artifacts --privileged micaprun:latest --jobModule=$jobModule --runDate=$runDate --logLevel=$logLevel ${concurrency:+--concurrency=$concurrency} $runnerArgs
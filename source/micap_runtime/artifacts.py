@@ -0,0 +1,280 @@
+"""Content-addressed store of job outputs as Arrow IPC files.
+
+Instead of printing results or writing timestamped CSV and JSON files, a job
+writes its output frames to the store::
+
+    from artifacts import read_output, write_output
+
+    def main(args):
+        write_output(args, "ecb_fx_rates", rates)
+
+and a downstream job or notebook reads the latest one back::
+
+    rates = read_output("ecb_fx_rates", run_date="2025-03-20")
+
+Outputs are Arrow IPC files (Feather v2), stored under the sha256 of their bytes,
+so writing an identical output again costs no space. A SQLite index next to the
+files maps each output name, job module and run date to the file and its row
+count, size, schema and metadata. Files are uncompressed by default and read
+through a memory map, so a table's buffers point into the page cache instead of
+being parsed or copied; ``read_frame`` converts to pandas, which copies only the
+columns pandas cannot wrap.
+
+The store lives in MICAP_ARTIFACT_DIR, the micap_artifacts volume in the runtime
+container.
+"""
+
+__author__ = "David Dawson"
+__copyright__ = "Copyright 2025, David Dawson"
+__credits__ = ["David Dawson"]
+__license__ = "GPL"
+__version__ = "1.0.1"
+__maintainer__ = "Dave Dawson"
+__email__ = "davedawson.co@gmail.com"
+__status__ = "Production"
+
+import argparse
+import contextlib
+import datetime
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+
+import pandas as pd
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_DIR_ENV = "MICAP_ARTIFACT_DIR"
+DEFAULT_ARTIFACT_DIR = os.path.join(os.path.expanduser("~"), ".micap", "artifacts")
+SUFFIX = ".arrow"
+
+_index_name = "index.sqlite"
+_hash_chunk_bytes = 1 << 20
+_schema = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    job_module TEXT,
+    run_date TEXT,
+    rows INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    schema TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artifacts_by_name ON artifacts (name, run_date, id);
+CREATE INDEX IF NOT EXISTS artifacts_by_job ON artifacts (job_module, id);
+"""
+
+
+@dataclass(frozen=True)
+class Artifact:
+    """An output in the store."""
+
+    name: str
+    digest: str
+    path: str
+    rows: int
+    bytes: int
+    job_module: str | None = None
+    run_date: str | None = None
+    created_at: str | None = None
+    schema: str = field(default="", repr=False)
+    metadata: dict = field(default_factory=dict)
+
+
+class ArtifactStore:
+    """Arrow IPC files keyed by content hash, with an index of the outputs that wrote them."""
+
+    def __init__(self, root: str | None = None) -> None:
+        """Initialize the store, creating its directory and index if needed.
+
+        Args:
+            root: Store directory, defaults to MICAP_ARTIFACT_DIR, then ~/.micap/artifacts.
+        """
+        self.root = root or os.environ.get(ARTIFACT_DIR_ENV) or DEFAULT_ARTIFACT_DIR
+        os.makedirs(os.path.join(self.root, "objects"), exist_ok=True)
+        with self._index() as db:
+            db.executescript(_schema)
+
+    @contextlib.contextmanager
+    def _index(self) -> Iterator[sqlite3.Connection]:
+        db = sqlite3.connect(os.path.join(self.root, _index_name), timeout=30)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.row_factory = sqlite3.Row
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def path(self, digest: str) -> str:
+        """Return the file of a content hash."""
+        return os.path.join(self.root, "objects", digest[:2], digest + SUFFIX)
+
+    def put(
+        self,
+        name: str,
+        data: pd.DataFrame | pa.Table,
+        job_module: str | None = None,
+        run_date: str | None = None,
+        metadata: dict | None = None,
+        compression: str | None = None,
+    ) -> Artifact:
+        """Write an output and index it.
+
+        Args:
+            name: Output name, e.g. ``ecb_fx_rates``.
+            data: DataFrame or Arrow table.
+            job_module: Job that wrote it.
+            run_date: Run date it is for.
+            metadata: JSON-serializable details to index with it.
+            compression: ``lz4`` or ``zstd`` for smaller files that are decompressed on read, None to memory-map them.
+
+        Returns:
+            The stored output.
+        """
+        table = data if isinstance(data, pa.Table) else pa.Table.from_pandas(data)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".tmp-", suffix=SUFFIX)
+        os.close(fd)
+        try:
+            options = pa.ipc.IpcWriteOptions(compression=compression)
+            with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema, options=options) as writer:
+                writer.write_table(table)
+            digest = _file_digest(tmp_path)
+            path = self.path(digest)
+            size = os.path.getsize(tmp_path)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+
+        artifact = Artifact(
+            name=name,
+            digest=digest,
+            path=path,
+            rows=table.num_rows,
+            bytes=size,
+            job_module=job_module,
+            run_date=run_date,
+            created_at=datetime.datetime.now(datetime.UTC).isoformat(),
+            schema=table.schema.to_string(show_schema_metadata=False),
+            metadata=metadata or {},
+        )
+        with self._index() as db:
+            db.execute(
+                "INSERT INTO artifacts (name, digest, job_module, run_date, rows, bytes, schema, metadata, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    name,
+                    digest,
+                    job_module,
+                    run_date,
+                    artifact.rows,
+                    size,
+                    artifact.schema,
+                    json.dumps(artifact.metadata, default=str),
+                    artifact.created_at,
+                ),
+            )
+        logger.info(f"Stored {name} ({table.num_rows} rows, {size / 1024:.1f} KiB) as {digest[:12]}")
+        return artifact
+
+    def find(self, name: str | None = None, run_date: str | None = None, job_module: str | None = None) -> list[Artifact]:
+        """Return indexed outputs matching every given filter, newest first."""
+        filters = {column: value for column, value in {"name": name, "run_date": run_date, "job_module": job_module}.items() if value is not None}
+        where = f"WHERE {' AND '.join(f'{column} = ?' for column in filters)}" if filters else ""
+        with self._index() as db:
+            rows = db.execute(f"SELECT * FROM artifacts {where} ORDER BY id DESC", list(filters.values())).fetchall()
+        return [self._artifact(row) for row in rows]
+
+    def latest(self, name: str, run_date: str | None = None) -> Artifact | None:
+        """Return the newest output of a name, for a run date if given."""
+        found = self.find(name, run_date)
+        return found[0] if found else None
+
+    def _artifact(self, row: sqlite3.Row) -> Artifact:
+        return Artifact(
+            name=row["name"],
+            digest=row["digest"],
+            path=self.path(row["digest"]),
+            rows=row["rows"],
+            bytes=row["bytes"],
+            job_module=row["job_module"],
+            run_date=row["run_date"],
+            created_at=row["created_at"],
+            schema=row["schema"],
+            metadata=json.loads(row["metadata"]),
+        )
+
+    def read_table(self, artifact: Artifact | str, memory_map: bool = True) -> pa.Table:
+        """Read an output as an Arrow table.
+
+        Args:
+            artifact: Output, or its content hash.
+            memory_map: Map the file, so buffers of an uncompressed file are not copied.
+        """
+        path = artifact.path if isinstance(artifact, Artifact) else self.path(artifact)
+        source = pa.memory_map(path, "r") if memory_map else pa.OSFile(path, "rb")
+        with pa.ipc.open_file(source) as reader:
+            return reader.read_all()
+
+    def read_frame(self, artifact: Artifact | str) -> pd.DataFrame:
+        """Read an output as a DataFrame."""
+        return self.read_table(artifact).to_pandas()
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_hash_chunk_bytes), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+_default_store: ArtifactStore | None = None
+
+
+def default_store() -> ArtifactStore:
+    """Return the store in MICAP_ARTIFACT_DIR, created on first use."""
+    global _default_store
+    if _default_store is None:
+        _default_store = ArtifactStore()
+    return _default_store
+
+
+def write_output(args: argparse.Namespace, name: str, data: pd.DataFrame | pa.Table, **metadata: object) -> Artifact:
+    """Store an output of the running job, indexed by its module and run date.
+
+    Args:
+        args: Runner arguments of the job.
+        name: Output name.
+        data: DataFrame or Arrow table.
+        **metadata: Details to index with it.
+    """
+    return default_store().put(name, data, getattr(args, "jobModule", None), getattr(args, "runDate", None), metadata)
+
+
+def read_output(name: str, run_date: str | None = None) -> pd.DataFrame:
+    """Return the newest output of a name as a DataFrame, for a run date if given.
+
+    Raises:
+        LookupError: If no such output is stored.
+    """
+    store = default_store()
+    artifact = store.latest(name, run_date)
+    if artifact is None:
+        raise LookupError(f"No {name} output stored" + (f" for {run_date}" if run_date else ""))
+    return store.read_frame(artifact)
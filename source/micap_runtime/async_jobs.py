@@ -0,0 +1,219 @@
+"""Running jobs that define ``async def main(args)``.
+
+An I/O-bound job, fetching many instruments or conids, can define its entry
+point as a coroutine and overlap its requests in one process::
+
+    from async_jobs import gather
+
+    async def main(args):
+        quotes = await gather(*(fetch_quote(conid) for conid in conids))
+
+The runner detects the coroutine and runs it on an event loop it owns:
+
+* ``gather`` and ``limited`` run awaitables under the job's concurrency limit,
+  ``--asyncConcurrency`` (MICAP_ASYNC_CONCURRENCY), so a job can start hundreds of
+  requests without opening hundreds of connections. Blocking calls sent to
+  ``asyncio.to_thread`` share a thread pool of the same size.
+* ``--asyncTimeout`` (MICAP_ASYNC_TIMEOUT) seconds cancels ``main`` and every task
+  it started, and the job fails with TimeoutError.
+* A monitor task measures how late the loop wakes it. Lag means a callback is
+  blocking the loop, typically synchronous I/O or parsing; stalls are logged as
+  they happen and a summary when the job ends.
+"""
+
+__author__ = "David Dawson"
+__copyright__ = "Copyright 2025, David Dawson"
+__credits__ = ["David Dawson"]
+__license__ = "GPL"
+__version__ = "1.0.1"
+__maintainer__ = "Dave Dawson"
+__email__ = "davedawson.co@gmail.com"
+__status__ = "Production"
+
+import argparse
+import asyncio
+import contextvars
+import inspect
+import logging
+import os
+import time
+from collections.abc import Awaitable, Callable, Coroutine
+from concurrent.futures import ThreadPoolExecutor
+from types import ModuleType
+from typing import Any, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CONCURRENCY_ENV = "MICAP_ASYNC_CONCURRENCY"
+TIMEOUT_ENV = "MICAP_ASYNC_TIMEOUT"
+DEFAULT_CONCURRENCY = 64
+
+_lag_interval_seconds = 0.1
+_lag_warning_seconds = 0.5
+_limit: contextvars.ContextVar[asyncio.Semaphore | None] = contextvars.ContextVar("micap_async_limit", default=None)
+
+
+def default_concurrency() -> int:
+    """Return MICAP_ASYNC_CONCURRENCY, or 64."""
+    return int(os.environ.get(CONCURRENCY_ENV) or DEFAULT_CONCURRENCY)
+
+
+def default_timeout() -> float | None:
+    """Return MICAP_ASYNC_TIMEOUT in seconds, or None for no timeout."""
+    value = os.environ.get(TIMEOUT_ENV)
+    return float(value) if value else None
+
+
+def is_async_job(module: ModuleType) -> bool:
+    """Return whether a job module's ``main`` is a coroutine function."""
+    return inspect.iscoroutinefunction(getattr(module, "main", None))
+
+
+async def limited(awaitable: Awaitable[T]) -> T:
+    """Await under the job's concurrency limit, unlimited outside a runner-managed loop."""
+    limit = _limit.get()
+    if limit is None:
+        return await awaitable
+    async with limit:
+        return await awaitable
+
+
+async def gather(*awaitables: Awaitable[Any], return_exceptions: bool = False) -> list[Any]:
+    """``asyncio.gather`` with at most the job's concurrency limit of awaitables running at once."""
+    return await asyncio.gather(*(limited(aw) for aw in awaitables), return_exceptions=return_exceptions)
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop runs a task that sleeps at a fixed interval."""
+
+    def __init__(self, interval: float = _lag_interval_seconds, warning: float = _lag_warning_seconds) -> None:
+        """Initialize the monitor.
+
+        Args:
+            interval: Seconds between wake-ups.
+            warning: Lag in seconds above which a stall is logged.
+        """
+        self.interval = interval
+        self.warning = warning
+        self.samples = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Start measuring on the running loop."""
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="micap-loop-lag")
+
+    async def stop(self) -> None:
+        """Stop measuring."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.record(max(time.perf_counter() - expected, 0.0))
+
+    def record(self, lag: float) -> None:
+        """Count one lag measurement in seconds."""
+        self.samples += 1
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+        if lag >= self.warning:
+            self.stalls += 1
+            logger.warning(f"Event loop blocked for {lag * 1000:.0f} ms, a callback is doing blocking work")
+
+    def stats(self) -> dict:
+        """Return the mean and max lag in milliseconds and the number of stalls."""
+        mean = self.total_lag / self.samples if self.samples else 0.0
+        return {
+            "samples": self.samples,
+            "mean_lag_ms": round(mean * 1000, 3),
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+            "stalls": self.stalls,
+        }
+
+
+async def _supervise(
+    main: Callable[[argparse.Namespace], Coroutine[Any, Any, T]],
+    args: argparse.Namespace,
+    concurrency: int,
+    timeout: float | None,
+    monitor: LoopLagMonitor,
+) -> T:
+    _limit.set(asyncio.Semaphore(concurrency))
+    monitor.start()
+    deadline = asyncio.timeout(timeout)
+    try:
+        async with deadline:
+            return await main(args)
+    except TimeoutError as e:
+        # A TimeoutError of main's own, e.g. from a socket, is the job's error and passes through unchanged
+        if not deadline.expired():
+            raise
+        name = getattr(main, "__module__", None) or "job"
+        raise TimeoutError(f"{name} did not finish within {timeout}s and was cancelled") from e
+    finally:
+        await monitor.stop()
+
+
+def run_async_main(
+    main: Callable[[argparse.Namespace], Coroutine[Any, Any, T]],
+    args: argparse.Namespace,
+    concurrency: int | None = None,
+    timeout: float | None = None,
+    monitor: LoopLagMonitor | None = None,
+) -> T:
+    """Run a coroutine ``main`` on a new event loop.
+
+    Args:
+        main: The job's ``async def main(args)``.
+        args: Runner arguments passed to ``main``.
+        concurrency: Awaitables ``gather`` and ``limited`` run at once and thread pool size, defaults to MICAP_ASYNC_CONCURRENCY.
+        timeout: Seconds after which ``main`` and its tasks are cancelled, None for no timeout.
+        monitor: Loop lag monitor, a new one if None.
+
+    Returns:
+        What ``main`` returned.
+
+    Raises:
+        TimeoutError: If ``main`` did not finish within the timeout.
+    """
+    concurrency = concurrency or default_concurrency()
+    monitor = monitor or LoopLagMonitor()
+    name = getattr(main, "__module__", None) or "job"
+    started = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="micap-async")
+    try:
+        with asyncio.Runner() as runner:
+            runner.get_loop().set_default_executor(executor)
+            # Tasks still pending when main returns or is cancelled are cancelled and awaited on close
+            return runner.run(_supervise(main, args, concurrency, timeout, monitor))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        logger.info(f"Async job {name} ran {time.perf_counter() - started:.3f}s, loop lag: {monitor.stats()}")
+
+
+def call_job_main(module: ModuleType, args: argparse.Namespace) -> object:
+    """Call a job's ``main``, on a managed event loop if it is a coroutine function.
+
+    Args:
+        module: Imported job module.
+        args: Runner arguments, asyncConcurrency and asyncTimeout apply to async jobs.
+
+    Returns:
+        What ``main`` returned.
+    """
+    if not is_async_job(module):
+        return module.main(args)
+    return run_async_main(
+        module.main,
+        args,
+        getattr(args, "asyncConcurrency", None),
+        getattr(args, "asyncTimeout", None) or default_timeout(),
+    )
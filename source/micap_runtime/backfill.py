@@ -0,0 +1,183 @@
+r"""Partitioned, resumable date-range backfills.
+
+``runner.py --runDate 2020-01-01:2024-12-31:target`` runs a job over every run date
+of the range (see run_dates.py) instead of one. The range is split into partitions
+of ``--partitionSize`` run dates, and partitions run in forked children under
+``--concurrency`` like batch jobs, each child running its dates in order.
+
+Every finished partition is checkpointed in the ``backfill_partitions`` collection,
+one document per job module and run date. A restarted backfill skips the run dates
+that already succeeded and partitions the rest, so it resumes where it stopped even
+with a different ``--partitionSize``; ``--ignoreCheckpoints`` runs them all again.
+Progress is reported as partitions per minute with an estimate of the
+time remaining.
+
+Usage (from source/micap_runtime/):
+    python -u runner.py --jobModule jobs.market_data.ecb.fx_api --runDate 2020-01-01:2024-12-31:target \
+        --partitionSize 20 --concurrency 4
+"""
+
+__author__ = "David Dawson"
+__copyright__ = "Copyright 2025, David Dawson"
+__credits__ = ["David Dawson"]
+__license__ = "GPL"
+__version__ = "1.0.1"
+__maintainer__ = "Dave Dawson"
+__email__ = "davedawson.co@gmail.com"
+__status__ = "Production"
+
+import datetime
+import logging
+import time
+from collections.abc import Callable
+from typing import IO
+
+import pymongo
+
+try:
+    from .batch import BatchJob, BatchRunner, default_concurrency, job_argv, summary, warm_up
+    from .dynamic_import_lib import get_micap_importer
+    from .fork_server import run_job
+    from .run_dates import expand_run_dates, partition_run_dates
+except ImportError:
+    from batch import BatchJob, BatchRunner, default_concurrency, job_argv, summary, warm_up
+    from dynamic_import_lib import get_micap_importer
+    from fork_server import run_job
+    from run_dates import expand_run_dates, partition_run_dates
+
+logger = logging.getLogger(__name__)
+
+_checkpoint_collection_name = "backfill_partitions"
+# Arguments passed on to every partition
+PARTITION_ARGUMENTS = ("jobModule", "logLevel", "codeVersion", "forceRerun", "profile", "profileDir", "asyncConcurrency", "asyncTimeout")
+
+
+class PartitionCheckpoints:
+    """Outcome of every backfill partition, one document per job module and run date."""
+
+    def __init__(self, collection: pymongo.collection.Collection) -> None:
+        """Initialize with the checkpoint collection."""
+        self.collection = collection
+
+    @classmethod
+    def from_importer(cls) -> "PartitionCheckpoints | None":
+        """Return checkpoints in the codebase database of the installed importer, if any."""
+        importer = get_micap_importer()
+        if importer is None:
+            return None
+        return cls(importer.loader.db[_checkpoint_collection_name])
+
+    @staticmethod
+    def key(job_module: str, run_date: str) -> str:
+        """Return the document id of a run date."""
+        return f"{job_module}@{run_date}"
+
+    def completed(self, job_module: str) -> set[str]:
+        """Return the run dates of a job that finished successfully."""
+        documents = self.collection.find({"job_module": job_module, "exit_code": 0}, {"run_date": 1})
+        return {doc["run_date"] for doc in documents}
+
+    def record(self, job_module: str, partition: str, exit_code: int, seconds: float) -> None:
+        """Store the outcome of a partition for each of its run dates, replacing that of an earlier attempt."""
+        finished_at = datetime.datetime.now(datetime.UTC)
+        for run_date in expand_run_dates(partition):
+            self.collection.update_one(
+                {"_id": self.key(job_module, run_date)},
+                {
+                    "$set": {
+                        "job_module": job_module,
+                        "run_date": run_date,
+                        "partition": partition,
+                        "exit_code": exit_code,
+                        "seconds": round(seconds, 3),
+                        "finished_at": finished_at,
+                    },
+                    "$inc": {"attempts": 1},
+                },
+                upsert=True,
+            )
+
+
+class Throughput:
+    """Partitions finished per minute and the time the rest will take."""
+
+    def __init__(self, total: int, clock: Callable[[], float] = time.monotonic) -> None:
+        """Initialize for ``total`` partitions, starting now."""
+        self.total = total
+        self.finished = 0
+        self.failed = 0
+        self.clock = clock
+        self.started_at = clock()
+
+    def record(self, exit_code: int) -> None:
+        """Count a finished partition."""
+        self.finished += 1
+        self.failed += exit_code != 0
+
+    def per_minute(self) -> float:
+        """Return partitions finished per minute so far."""
+        elapsed = self.clock() - self.started_at
+        return self.finished * 60 / elapsed if elapsed > 0 else 0.0
+
+    def report(self) -> str:
+        """Return a progress line."""
+        rate = self.per_minute()
+        remaining = self.total - self.finished
+        eta = f", {remaining / rate:.1f} min remaining" if rate and remaining else ""
+        failed = f", {self.failed} failed" if self.failed else ""
+        return f"{self.finished}/{self.total} partitions{failed}, {rate:.1f} partitions/min{eta}"
+
+
+def run_backfill(
+    arguments: dict,
+    partition_size: int = 1,
+    concurrency: int | None = None,
+    log_dir: str | None = None,
+    checkpoints: PartitionCheckpoints | None = None,
+    ignore_checkpoints: bool = False,
+    execute: Callable[[list[str]], int] = run_job,
+    output: IO[str] | None = None,
+) -> list[BatchJob]:
+    """Run a job over a run date range, partition by partition.
+
+    Args:
+        arguments: runner.py arguments by name, ``runDate`` being the range.
+        partition_size: Run dates per partition.
+        concurrency: Maximum number of partitions running at once, defaults to MICAP_BATCH_CONCURRENCY.
+        log_dir: Directory for one log file per partition.
+        checkpoints: Where finished partitions are recorded, nothing is recorded or skipped if None.
+        ignore_checkpoints: Run partitions that already succeeded again.
+        execute: Runs a partition in the child from its argv and returns the exit code.
+        output: Stream for the partition logs, progress and summary, defaults to the batch runner's.
+
+    Returns:
+        The partitions run, with their exit codes.
+    """
+    job_module = arguments["jobModule"]
+    run_dates = expand_run_dates(arguments["runDate"])
+    done = checkpoints.completed(job_module) if checkpoints is not None and not ignore_checkpoints else set()
+    todo = partition_run_dates(arguments["runDate"], partition_size, skip=done)
+    done_before = sum(run_date in done for run_date in run_dates)
+    logger.info(f"Backfilling {job_module}: {len(todo)} partitions, {done_before} of {len(run_dates)} run dates done before")
+
+    passed_on = {name: arguments.get(name) for name in PARTITION_ARGUMENTS}
+    jobs = [BatchJob(f"{job_module}@{partition}", job_module, job_argv({**passed_on, "runDate": partition})) for partition in todo]
+    throughput = Throughput(len(jobs))
+
+    def finished(job: BatchJob) -> None:
+        partition = job.label.rpartition("@")[2]
+        throughput.record(job.exit_code)
+        if checkpoints is not None:
+            try:
+                checkpoints.record(job_module, partition, job.exit_code, job.seconds)
+            except pymongo.errors.PyMongoError as e:
+                logger.warning(f"Could not checkpoint {partition}, it will run again on resume: {e}")
+        runner.output.write(f"[backfill] {throughput.report()}\n")
+
+    warm_up(jobs[:1])
+    runner = BatchRunner(jobs, concurrency or default_concurrency(), log_dir, execute, output, on_finish=finished)
+    runner.run()
+    if jobs:
+        print(summary(jobs), file=runner.output)
+    print(f"[backfill] {job_module} {arguments['runDate']}: {throughput.report()}", file=runner.output)
+    return jobs
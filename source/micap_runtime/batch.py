@@ -0,0 +1,282 @@
+"""Batch mode: run many jobs from one runner invocation.
+
+A manifest lists jobs as runner.py arguments, for example the morning market data
+run::
+
+    {
+        "concurrency": 3,
+        "jobs": [
+            {"jobModule": "jobs.market_data.ecb.fx_api"},
+            {"jobModule": "jobs.market_data.deribit.book_summary", "logLevel": "INFO"},
+            {"jobModule": "jobs.market_data.asx.prices"}
+        ]
+    }
+
+A plain list of jobs is accepted too. Jobs without a ``runDate`` or ``logLevel``
+take the one given on the command line.
+
+Before any job starts the runner prefetches and imports every job module and its
+dependency closure once, then forks one child per job from the warm process,
+running at most ``concurrency`` at a time. Each child is isolated, its output is
+one log stream prefixed with the job's label and optionally copied to a file per
+job, and its exit status is reported separately. The batch exits non-zero if any
+job failed.
+
+Usage (from source/micap_runtime/):
+    python -u runner.py --batch morning.json --runDate 2025-03-20 --concurrency 3
+"""
+
+__author__ = "David Dawson"
+__copyright__ = "Copyright 2025, David Dawson"
+__credits__ = ["David Dawson"]
+__license__ = "GPL"
+__version__ = "1.0.1"
+__maintainer__ = "Dave Dawson"
+__email__ = "davedawson.co@gmail.com"
+__status__ = "Production"
+
+import contextlib
+import json
+import logging
+import os
+import re
+import selectors
+import sys
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from typing import IO
+
+try:
+    from .dynamic_import_lib import prefetch_module_closure
+    from .fork_server import exit_code_from_status, preload_modules, run_forked_job, run_job
+except ImportError:
+    from dynamic_import_lib import prefetch_module_closure
+    from fork_server import exit_code_from_status, preload_modules, run_forked_job, run_job
+
+logger = logging.getLogger(__name__)
+
+CONCURRENCY_ENV = "MICAP_BATCH_CONCURRENCY"
+LOG_DIR_ENV = "MICAP_BATCH_LOG_DIR"
+# Arguments a job takes from the batch command line when its manifest entry omits them
+INHERITED_ARGUMENTS = ("runDate", "logLevel", "forceRerun", "profile", "profileDir", "asyncConcurrency", "asyncTimeout")
+
+_read_size = 65536
+
+
+@dataclass
+class BatchJob:
+    """A job of the batch and, once it ran, its outcome."""
+
+    label: str
+    module: str
+    argv: list[str]
+    exit_code: int | None = None
+    seconds: float = 0.0
+    log_path: str | None = None
+    pid: int | None = None
+    started_at: float = 0.0
+    _pending: bytes = field(default=b"", repr=False)
+    _log: IO[bytes] | None = field(default=None, repr=False)
+
+
+def default_concurrency() -> int:
+    """Return MICAP_BATCH_CONCURRENCY, or the number of CPUs."""
+    return int(os.environ.get(CONCURRENCY_ENV) or os.cpu_count() or 1)
+
+
+def load_manifest(path: str) -> tuple[list[dict], int | None]:
+    """Read a batch manifest.
+
+    Args:
+        path: JSON file, ``-`` for stdin.
+
+    Returns:
+        The job entries and the manifest's concurrency, None if it sets none.
+    """
+    with contextlib.nullcontext(sys.stdin) if path == "-" else open(path) as f:
+        manifest = json.load(f)
+    if isinstance(manifest, list):
+        return manifest, None
+    return manifest["jobs"], manifest.get("concurrency")
+
+
+def job_argv(arguments: dict) -> list[str]:
+    """Return runner.py command line arguments for arguments by name, booleans being flags."""
+    argv = []
+    for key, value in arguments.items():
+        if value is True:
+            argv.append(f"--{key}")
+        elif value is not None and value is not False:
+            argv.append(f"--{key}={value}")
+    return argv
+
+
+def job_label(entry: dict) -> str:
+    """Return ``module@runDate`` for a job's arguments."""
+    return f"{entry['jobModule']}@{entry['runDate']}" if entry.get("runDate") else entry["jobModule"]
+
+
+def warm_up(jobs: Iterable[BatchJob], preload: Iterable[str] = ()) -> None:
+    """Prefetch and import every job module once, so forked children inherit them.
+
+    Failures are only logged, the job's child reports them when it imports the module.
+    """
+    modules = list(preload)
+    for job in jobs:
+        if job.module not in modules:
+            prefetch_module_closure(job.module)
+            modules.append(job.module)
+    preload_modules(modules)
+
+
+class BatchRunner:
+    """Forks one child per job, at most ``concurrency`` at a time, and collects their output."""
+
+    def __init__(
+        self,
+        jobs: list[BatchJob],
+        concurrency: int,
+        log_dir: str | None = None,
+        execute: Callable[[list[str]], int] = run_job,
+        output: IO[str] | None = None,
+        on_finish: Callable[[BatchJob], None] | None = None,
+    ) -> None:
+        """Initialize the runner.
+
+        Args:
+            jobs: Jobs to run, in start order.
+            concurrency: Maximum number of jobs running at once.
+            log_dir: Directory to copy each job's log to, one file per job.
+            execute: Runs a job in the child from its argv and returns the exit code.
+            output: Stream for the prefixed job logs and the summary, defaults to stdout.
+            on_finish: Called with each job once its exit code is known.
+        """
+        self.jobs = jobs
+        self.concurrency = max(1, concurrency)
+        self.log_dir = log_dir
+        self.execute = execute
+        self.output = output or sys.stdout
+        self.on_finish = on_finish
+        self.selector = selectors.DefaultSelector()
+        self.running: dict[int, BatchJob] = {}
+
+    def run(self) -> list[BatchJob]:
+        """Run every job and return them with their exit codes."""
+        pending = list(self.jobs)
+        try:
+            while pending or self.running:
+                while pending and len(self.running) < self.concurrency:
+                    self.start(pending.pop(0))
+                for key, _ in self.selector.select(0.05):
+                    self.read(key.data, key.fileobj)
+                self.reap()
+        finally:
+            self.selector.close()
+        return self.jobs
+
+    def start(self, job: BatchJob) -> None:
+        """Fork a child for a job with its stdout and stderr on one pipe."""
+        if self.log_dir:
+            os.makedirs(self.log_dir, exist_ok=True)
+            job.log_path = os.path.join(self.log_dir, re.sub(r"[^\w.@-]", "_", job.label) + ".log")
+            job._log = open(job.log_path, "wb")  # noqa: SIM115
+        read_fd, write_fd = os.pipe()
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        self.output.flush()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            pipes = [key.fileobj for key in self.selector.get_map().values()]
+            logs = [other._log for other in (job, *self.running.values()) if other._log]
+            run_forked_job(self.execute, job.argv, [devnull, write_fd, write_fd], inherited=[*pipes, *logs, self.selector])
+        os.close(write_fd)
+        os.close(devnull)
+        job.pid = pid
+        job.started_at = time.perf_counter()
+        self.running[pid] = job
+        self.selector.register(os.fdopen(read_fd, "rb", buffering=0), selectors.EVENT_READ, job)
+        logger.info(f"Started {job.label} as pid {pid}")
+
+    def read(self, job: BatchJob, pipe: IO[bytes]) -> None:
+        """Copy available output of a job to the batch log, closing the pipe at its end."""
+        data = pipe.read(_read_size)
+        if not data:
+            self.selector.unregister(pipe)
+            pipe.close()
+            self.write(job, job._pending, final=True)
+            job._pending = b""
+            return
+        if job._log:
+            job._log.write(data)
+        lines = (job._pending + data).split(b"\n")
+        job._pending = lines.pop()
+        for line in lines:
+            self.write(job, line)
+
+    def write(self, job: BatchJob, line: bytes, final: bool = False) -> None:
+        """Write one line of a job's output, prefixed with its label."""
+        if final and not line:
+            return
+        self.output.write(f"[{job.label}] {line.decode(errors='replace')}\n")
+
+    def reap(self) -> None:
+        """Record the exit codes of finished jobs once their output is drained."""
+        for pid, job in list(self.running.items()):
+            if any(key.data is job for key in self.selector.get_map().values()):
+                continue
+            _, status = os.waitpid(pid, 0)
+            job.exit_code = exit_code_from_status(status)
+            job.seconds = time.perf_counter() - job.started_at
+            if job._log:
+                job._log.close()
+                job._log = None
+            del self.running[pid]
+            self.output.write(f"[{job.label}] exited with {job.exit_code} after {job.seconds:.1f}s\n")
+            if self.on_finish is not None:
+                self.on_finish(job)
+
+
+def summary(jobs: list[BatchJob]) -> str:
+    """Render the jobs' outcomes as a table."""
+    width = max((len(job.label) for job in jobs), default=0)
+    lines = [f"{'job':<{width}}  exit  seconds  log"]
+    for job in jobs:
+        lines.append(f"{job.label:<{width}}  {job.exit_code:>4}  {job.seconds:>7.1f}  {job.log_path or '-'}")
+    return "\n".join(lines)
+
+
+def run_batch(
+    entries: list[dict],
+    defaults: dict,
+    concurrency: int | None = None,
+    log_dir: str | None = None,
+    execute: Callable[[list[str]], int] = run_job,
+    preload: Iterable[str] = (),
+    output: IO[str] | None = None,
+) -> list[BatchJob]:
+    """Warm up, run every job of a manifest and print a summary.
+
+    Args:
+        entries: Manifest entries, runner.py arguments by name.
+        defaults: Arguments for entries that omit them, e.g. the command line runDate.
+        concurrency: Maximum number of jobs running at once, defaults to MICAP_BATCH_CONCURRENCY.
+        log_dir: Directory for one log file per job, defaults to MICAP_BATCH_LOG_DIR.
+        execute: Runs a job in the child from its argv and returns the exit code.
+        preload: Further modules to import before forking.
+        output: Stream for the job logs and the summary, defaults to stdout.
+
+    Returns:
+        The jobs with their exit codes, in manifest order.
+    """
+    jobs = []
+    for entry in entries:
+        arguments = {**{key: value for key, value in defaults.items() if value is not None}, **entry}
+        jobs.append(BatchJob(job_label(arguments), arguments["jobModule"], job_argv(arguments)))
+    warm_up(jobs, preload)
+    runner = BatchRunner(jobs, concurrency or default_concurrency(), log_dir or os.environ.get(LOG_DIR_ENV), execute, output)
+    runner.run()
+    print(summary(jobs), file=runner.output)
+    return jobs
@@ -0,0 +1 @@
+"""Benchmarks for the Mongo importer, run against in-process stand-ins for MongoDB."""
@@ -0,0 +1,75 @@
+"""Serial versus prefetched startup of a job module.
+
+Builds a synthetic codebase whose job module imports a tree of library modules,
+serves it from an in-memory collection that sleeps for a fixed round-trip time on
+every query, and compares importing the job one module at a time with importing
+it after ``MongoDBModuleLoader.prefetch`` fetched its dependency closure.
+
+Usage (from source/):
+    python -m micap_runtime.benchmarks.prefetch_report --modules 40 --rtt-ms 2
+"""
+
+import argparse
+import importlib
+import sys
+import time
+
+from micap_runtime.benchmarks.standin import LatencyCollection, synthetic_codebase
+from micap_runtime.dynamic_import_lib import MongoDBImporter, MongoDBModuleLoader
+
+
+def time_startup(module_count: int, rtt_seconds: float, prefetch: bool, run_id: int) -> tuple[float, int]:
+    """Time setting up the importer and importing the job module.
+
+    Returns:
+        Tuple of (seconds, round trips).
+    """
+    prefix = f"bench_{run_id}"
+    collection = LatencyCollection(synthetic_codebase(prefix, module_count), rtt_seconds)
+    loader = MongoDBModuleLoader()
+    loader.collection = collection
+
+    start = time.perf_counter()
+    importer = MongoDBImporter(loader)
+    sys.meta_path.insert(0, importer)
+    try:
+        if prefetch:
+            loader.prefetch(f"{prefix}.jobs.job")
+        importlib.import_module(f"{prefix}.jobs.job")
+        elapsed = time.perf_counter() - start
+    finally:
+        sys.meta_path.remove(importer)
+        for name in [name for name in sys.modules if name.startswith(prefix)]:
+            del sys.modules[name]
+    return elapsed, collection.round_trips
+
+
+def main() -> None:
+    """Print a markdown table comparing serial and prefetched startup."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modules", type=int, nargs="+", default=[10, 40, 160])
+    parser.add_argument("--rtt-ms", type=float, default=2.0, help="Simulated Mongo round-trip time")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"Simulated round trip: {args.rtt_ms} ms, best of {args.repeat}\n")
+    print("| modules | serial ms | serial round trips | prefetched ms | prefetched round trips | speedup |")
+    print("|---:|---:|---:|---:|---:|---:|")
+    run_id = 0
+    for module_count in args.modules:
+        results = {}
+        for prefetch in (False, True):
+            timings = []
+            for _ in range(args.repeat):
+                run_id += 1
+                timings.append(time_startup(module_count, args.rtt_ms / 1000, prefetch, run_id))
+            results[prefetch] = min(timings)
+        (serial, serial_trips), (prefetched, prefetched_trips) = results[False], results[True]
+        print(
+            f"| {module_count} | {serial * 1000:.1f} | {serial_trips} | {prefetched * 1000:.1f} | {prefetched_trips} | "
+            f"{serial / prefetched:.1f}x |"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""In-process stand-in for the codebase collection and synthetic codebases to serve from it."""
+
+import threading
+import time
+
+import bson
+
+from micap_runtime.import_graph import static_imports
+
+# Body appended to every synthetic library module, so compile time resembles real modules
+_MODULE_BODY = '''
+
+class Model{i}:
+    """Synthetic model {i}."""
+
+    def __init__(self, values):
+        self.values = list(values)
+
+    def total(self):
+        return sum(value * {i} for value in self.values)
+
+    def describe(self):
+        return {{"index": {i}, "count": len(self.values), "total": self.total()}}
+
+
+def transform_{i}(rows):
+    result = []
+    for row in rows:
+        if row.get("skip"):
+            continue
+        result.append({{key: value for key, value in row.items() if not key.startswith("_")}})
+    return result
+'''
+
+
+class LatencyCollection:
+    """Minimal codebase collection that charges a round trip per query and counts the bytes it returns."""
+
+    def __init__(self, documents: dict[str, dict], rtt_seconds: float) -> None:
+        """Initialize with documents keyed by module name."""
+        self.documents = documents
+        self.rtt_seconds = rtt_seconds
+        self.round_trips = 0
+        self.bytes_returned = 0
+        self._lock = threading.Lock()
+
+    def _round_trip(self, documents: list[dict] = ()) -> None:
+        size = sum(len(bson.encode(doc)) for doc in documents)
+        with self._lock:
+            self.round_trips += 1
+            self.bytes_returned += size
+        time.sleep(self.rtt_seconds)
+
+    def find(self, query: dict, projection: dict | None = None) -> list[dict]:
+        """Return every document, or those whose _id is in an ``$in`` list, with inclusion projections applied."""
+        names = query["_id"]["$in"] if query else list(self.documents)
+        documents = [self.documents[name] for name in names if name in self.documents]
+        if projection:
+            documents = [{key: value for key, value in doc.items() if key == "_id" or projection.get(key)} for doc in documents]
+        self._round_trip(documents)
+        return documents
+
+    def find_one(self, query: dict, **kwargs: object) -> dict | None:
+        """Return the document with the given _id."""
+        document = self.documents.get(query["_id"])
+        self._round_trip([document] if document else [])
+        return document
+
+
+def synthetic_codebase(prefix: str, module_count: int, fan_out: int = 3, padded: bool = False) -> dict[str, dict]:
+    """Build a job module importing a tree of ``module_count`` library modules.
+
+    Args:
+        prefix: Top level package name, unique per run so sys.modules never interferes.
+        module_count: Number of library modules below the job.
+        fan_out: Number of modules each library module imports.
+        padded: Give every library module a class and a function, about 1 KB of source.
+
+    Returns:
+        Documents keyed by module name, as release_codebase stores them.
+    """
+    names = [f"{prefix}.lib.mod_{i}" for i in range(module_count)]
+    documents = {}
+    for i, name in enumerate(names):
+        children = names[i * fan_out + 1 : i * fan_out + 1 + fan_out]
+        content = "".join(f"import {child}\n" for child in children) + f"VALUE = {i}\n"
+        if padded:
+            content += _MODULE_BODY.format(i=i)
+        documents[name] = {"_id": name, "content": content}
+    job = f"{prefix}.jobs.job"
+    documents[job] = {"_id": job, "content": f"import {names[0]}\n\ndef main(args):\n    return {names[0]}.VALUE\n"}
+    for name, doc in documents.items():
+        doc["parent"] = name.rpartition(".")[0]
+        doc["is_package"] = False
+        doc["imports"] = static_imports(doc["content"], name)
+    return documents
@@ -0,0 +1,189 @@
+"""Cold and warm runner startup against synthetic codebases, compared to stored baselines.
+
+Each run follows runner.py's startup path in-process: install the importer, prefetch
+the job's dependency closure, import the job and call its ``main``. The codebase is
+served by ``LatencyCollection``, which charges a simulated round trip per query and
+counts the BSON bytes it returns.
+
+A cold start uses an empty bytecode cache, as a fresh container does. A warm start
+is a new process with the same cache volume: the importer, manifest and sys.modules
+start from nothing, but compiled code comes from the cache filled by the cold run.
+
+Round trips and bytes are deterministic and are checked against the baseline with
+``--check``. Times depend on the machine and are reported against the baseline for
+reference only.
+
+Usage (from source/):
+    python -m micap_runtime.benchmarks.startup_benchmark
+    python -m micap_runtime.benchmarks.startup_benchmark --check
+    python -m micap_runtime.benchmarks.startup_benchmark --save-baseline
+"""
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from micap_runtime.benchmarks.standin import LatencyCollection, synthetic_codebase
+from micap_runtime.bytecode_cache import BytecodeCache
+from micap_runtime.dynamic_import_lib import MongoDBImporter, MongoDBModuleLoader
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "startup.json")
+SIZES = (50, 500, 5000)
+SCENARIOS = ("cold", "warm")
+CHECKED_METRICS = ("round_trips", "bytes")
+
+
+def time_runner_startup(documents: dict[str, dict], job: str, rtt_seconds: float, cache_dir: str) -> dict:
+    """Time one runner startup: importer setup, prefetch, job import and ``main``.
+
+    Args:
+        documents: Codebase documents keyed by module name.
+        job: Name of the job module.
+        rtt_seconds: Simulated round-trip time per query.
+        cache_dir: Bytecode cache directory, empty for a cold start.
+
+    Returns:
+        Milliseconds, round trips, bytes returned and bytecode cache hits.
+    """
+    prefix = job.partition(".")[0]
+    collection = LatencyCollection(documents, rtt_seconds)
+    loader = MongoDBModuleLoader()
+    loader.collection = collection
+    loader.bytecode_cache = BytecodeCache(cache_dir)
+
+    start = time.perf_counter()
+    importer = MongoDBImporter(loader)
+    sys.meta_path.insert(0, importer)
+    try:
+        loader.prefetch(job)
+        importlib.import_module(job).main(None)
+        elapsed = time.perf_counter() - start
+    finally:
+        sys.meta_path.remove(importer)
+        for name in [name for name in sys.modules if name == prefix or name.startswith(prefix + ".")]:
+            del sys.modules[name]
+    return {
+        "ms": round(elapsed * 1000, 1),
+        "round_trips": collection.round_trips,
+        "bytes": collection.bytes_returned,
+        "cache_hits": loader.bytecode_cache.hits,
+    }
+
+
+def run(sizes: tuple[int, ...] = SIZES, rtt_ms: float = 1.0, repeat: int = 3) -> list[dict]:
+    """Run cold and warm startups for each codebase size, keeping the fastest of ``repeat`` runs.
+
+    Args:
+        sizes: Numbers of library modules in the synthetic codebases.
+        rtt_ms: Simulated Mongo round-trip time.
+        repeat: Runs per size and scenario.
+
+    Returns:
+        One result per size and scenario.
+    """
+    results = []
+    run_id = 0
+    for size in sizes:
+        best = {}
+        for _ in range(repeat):
+            run_id += 1
+            prefix = f"startup_bench_{run_id}"
+            documents = synthetic_codebase(prefix, size, padded=True)
+            with tempfile.TemporaryDirectory() as cache_dir:
+                for scenario in SCENARIOS:
+                    result = time_runner_startup(documents, f"{prefix}.jobs.job", rtt_ms / 1000, cache_dir)
+                    if scenario not in best or result["ms"] < best[scenario]["ms"]:
+                        best[scenario] = result
+        results.extend({"modules": size, "scenario": scenario, **best[scenario]} for scenario in SCENARIOS)
+    return results
+
+
+def load_baseline(path: str = BASELINE_PATH) -> dict | None:
+    """Return the stored baseline, or None if none was saved."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(results: list[dict], rtt_ms: float, path: str = BASELINE_PATH) -> None:
+    """Store results as the baseline, with the environment they were measured in."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    baseline = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "rtt_ms": rtt_ms,
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2)
+        f.write("\n")
+
+
+def regressions(results: list[dict], baseline: dict) -> list[str]:
+    """Return descriptions of round trip or byte counts above the baseline."""
+    expected = {(entry["modules"], entry["scenario"]): entry for entry in baseline["results"]}
+    found = []
+    for result in results:
+        reference = expected.get((result["modules"], result["scenario"]))
+        if reference is None:
+            continue
+        for metric in CHECKED_METRICS:
+            if result[metric] > reference[metric]:
+                found.append(
+                    f"{result['modules']} modules {result['scenario']}: {metric} {result[metric]} > baseline {reference[metric]}"
+                )
+    return found
+
+
+def report(results: list[dict], baseline: dict | None) -> str:
+    """Render results as a markdown table, with the baseline time when one exists."""
+    expected = {(entry["modules"], entry["scenario"]): entry for entry in (baseline or {}).get("results", [])}
+    lines = [
+        "| modules | start | ms | baseline ms | round trips | bytes | bytecode cache hits |",
+        "|---:|---|---:|---:|---:|---:|---:|",
+    ]
+    for result in results:
+        reference = expected.get((result["modules"], result["scenario"]))
+        baseline_ms = f"{reference['ms']:.1f}" if reference else "-"
+        lines.append(
+            f"| {result['modules']} | {result['scenario']} | {result['ms']:.1f} | {baseline_ms} | "
+            f"{result['round_trips']} | {result['bytes']} | {result['cache_hits']} |"
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    """Run the benchmark, print it against the baseline and optionally check or save it."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modules", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--rtt-ms", type=float, default=1.0, help="Simulated Mongo round-trip time")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--check", action="store_true", help="Exit non-zero if round trips or bytes exceed the baseline")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Store the results in {BASELINE_PATH}")
+    args = parser.parse_args()
+
+    results = run(tuple(args.modules), args.rtt_ms, args.repeat)
+    baseline = load_baseline()
+    print(f"Simulated round trip: {args.rtt_ms} ms, best of {args.repeat}\n")
+    print(report(results, baseline))
+
+    if args.save_baseline:
+        save_baseline(results, args.rtt_ms)
+        print(f"\nSaved baseline to {BASELINE_PATH}")
+    elif args.check:
+        if baseline is None:
+            sys.exit("No baseline saved, run with --save-baseline first")
+        found = regressions(results, baseline)
+        for regression in found:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if found else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""Compiled bytecode cache for Mongo-loaded modules.
+
+Module sources fetched from MongoDB are compiled on every process start, and the
+runtime image disables ``.pyc`` writing. This module keeps marshalled code objects
+on disk keyed by a hash of the source, the filename and the interpreter version,
+so an entry can never be served to a different source or Python build.
+
+Entries are written through a temporary file and an atomic rename, and eviction
+runs under an advisory lock, which keeps the cache safe when several runner
+processes share one mounted volume.
+"""
+
+__author__ = "David Dawson"
+__copyright__ = "Copyright 2025, David Dawson"
+__credits__ = ["David Dawson"]
+__license__ = "GPL"
+__version__ = "1.0.1"
+__maintainer__ = "Dave Dawson"
+__email__ = "davedawson.co@gmail.com"
+__status__ = "Production"
+
+import contextlib
+import hashlib
+import importlib.util
+import logging
+import marshal
+import os
+import sys
+import tempfile
+import time
+from types import CodeType
+
+try:
+    import fcntl
+except ImportError:  # Windows, eviction then runs without the shared lock
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR_ENV = "MICAP_BYTECODE_CACHE_DIR"
+CACHE_MAX_MB_ENV = "MICAP_BYTECODE_CACHE_MAX_MB"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_ENTRY_SUFFIX = ".code"
+_TMP_PREFIX = ".tmp-"
+_STALE_TMP_SECONDS = 60  # Older temporary files were left by writers that died before renaming them
+_LOCK_NAME = ".evict.lock"
+_EVICT_TO_RATIO = 0.9  # Evict below the bound so every write does not trigger a sweep
+_RESCAN_EVERY_WRITES = 256  # Other processes sharing the directory are only seen when it is rescanned
+
+
+class BytecodeCache:
+    """Size-bounded, content-addressed store of marshalled code objects."""
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        """Initialize the cache, creating the directory if needed.
+
+        Args:
+            directory: Directory holding the cache entries, may be shared between processes.
+            max_bytes: Upper bound on the total size of the entries.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._estimated_bytes: int | None = None
+        self._writes_since_scan = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_environment(cls) -> "BytecodeCache | None":
+        """Build a cache from MICAP_BYTECODE_CACHE_DIR, or return None if it is not set."""
+        directory = os.environ.get(CACHE_DIR_ENV)
+        if not directory:
+            return None
+        max_mb = os.environ.get(CACHE_MAX_MB_ENV)
+        max_bytes = int(float(max_mb) * 1024 * 1024) if max_mb else DEFAULT_MAX_BYTES
+        try:
+            return cls(directory, max_bytes=max_bytes)
+        except OSError as e:
+            logger.warning(f"Bytecode cache disabled, unable to use {directory}: {e}")
+            return None
+
+    @staticmethod
+    def cache_key(source: str, filename: str) -> str:
+        """Return the cache key for a source compiled under the given filename."""
+        digest = hashlib.sha256()
+        digest.update(importlib.util.MAGIC_NUMBER)
+        digest.update(sys.implementation.cache_tag.encode())
+        digest.update(filename.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(source.encode("utf-8"))
+        return digest.hexdigest()
+
+    def entry_path(self, key: str) -> str:
+        """Return the path of the entry for a cache key."""
+        return os.path.join(self.directory, key + _ENTRY_SUFFIX)
+
+    def get_code(self, source: str, filename: str) -> CodeType:
+        """Return the code object for a source, compiling and storing it on a miss.
+
+        Args:
+            source: Python source text.
+            filename: Filename recorded in the code object, used in tracebacks.
+
+        Returns:
+            The compiled code object.
+        """
+        path = self.entry_path(self.cache_key(source, filename))
+        code = self._read(path)
+        if code is not None:
+            self.hits += 1
+            return code
+
+        self.misses += 1
+        code = compile(source, filename, "exec", dont_inherit=True)
+        self._write(path, marshal.dumps(code))
+        return code
+
+    def _read(self, path: str) -> CodeType | None:
+        try:
+            with open(path, "rb") as f:
+                code = marshal.loads(f.read())
+        except FileNotFoundError:
+            return None
+        except (EOFError, ValueError, TypeError, OSError) as e:
+            # A truncated or foreign entry is replaced by the next write
+            logger.debug(f"Discarding unreadable bytecode cache entry {path}: {e}")
+            with contextlib.suppress(OSError):
+                os.remove(path)
+            return None
+
+        if not isinstance(code, CodeType):
+            return None
+        # Mark the entry as recently used for eviction
+        with contextlib.suppress(OSError):
+            os.utime(path)
+        return code
+
+    def _write(self, path: str, data: bytes) -> None:
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=_TMP_PREFIX)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                # Atomic on POSIX, readers see either no entry or a complete one
+                os.replace(tmp_path, path)
+            except BaseException:
+                with contextlib.suppress(OSError):
+                    os.remove(tmp_path)
+                raise
+        except OSError as e:
+            logger.debug(f"Unable to write bytecode cache entry {path}: {e}")
+            return
+
+        # Track the size from our own writes instead of scanning the directory after every one
+        self._writes_since_scan += 1
+        if self._estimated_bytes is None or self._writes_since_scan >= _RESCAN_EVERY_WRITES:
+            self._estimated_bytes = self.size()
+            self._writes_since_scan = 0
+        else:
+            self._estimated_bytes += len(data)
+        if self._estimated_bytes <= self.max_bytes:
+            return
+
+        try:
+            self.evict()
+        except OSError as e:
+            logger.debug(f"Bytecode cache eviction failed in {self.directory}: {e}")
+        self._estimated_bytes = None
+
+    def size(self) -> int:
+        """Return the total size in bytes of the cache entries and stale temporary files."""
+        return sum(size for _, size, _ in self._entries())
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        entries = []
+        stale_before = time.time() - _STALE_TMP_SECONDS
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                is_tmp = entry.name.startswith(_TMP_PREFIX)
+                if not is_tmp and not entry.name.endswith(_ENTRY_SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:  # Removed by another process
+                    continue
+                # A recent temporary file may still be written and renamed by its writer
+                if is_tmp and stat.st_mtime >= stale_before:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self) -> int:
+        """Remove stale temporary files, then least recently used entries until the cache is within its bound.
+
+        Only one process sweeps at a time, others skip eviction while the lock is held.
+
+        Returns:
+            Number of files removed.
+        """
+        with self._evict_lock() as acquired:
+            if not acquired:
+                return 0
+            entries = []
+            removed = 0
+            for entry in self._entries():
+                if not os.path.basename(entry[2]).startswith(_TMP_PREFIX):
+                    entries.append(entry)
+                    continue
+                # Left by a writer that died, no one will rename it into an entry
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(entry[2])
+                    removed += 1
+            total = sum(size for _, size, _ in entries)
+            if total <= self.max_bytes:
+                return removed
+
+            target = self.max_bytes * _EVICT_TO_RATIO
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+                    removed += 1
+                total -= size
+            logger.debug(f"Evicted {removed} bytecode cache entries from {self.directory}")
+            return removed
+
+    @contextlib.contextmanager
+    def _evict_lock(self):  # noqa: ANN202
+        if fcntl is None:
+            yield True
+            return
+        with open(os.path.join(self.directory, _LOCK_NAME), "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,130 @@
+"""Fast-fail circuit breaker for calls to MongoDB.
+
+When Mongo is unreachable every import that reaches the Mongo importer would
+otherwise wait for a server-selection timeout. The breaker opens after the first
+connection failure, rejects calls immediately while open, and lets a single trial
+call through once the reset timeout has elapsed.
+"""
+
+__author__ = "David Dawson"
+__copyright__ = "Copyright 2025, David Dawson"
+__credits__ = ["David Dawson"]
+__license__ = "GPL"
+__version__ = "1.0.1"
+__maintainer__ = "Dave Dawson"
+__email__ = "davedawson.co@gmail.com"
+__status__ = "Production"
+
+import logging
+import threading
+import time
+from collections.abc import Callable
+from typing import TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of calling MongoDB while the circuit is open."""
+
+
+class CircuitBreaker:
+    """Circuit breaker that trips on a configurable set of exception types."""
+
+    def __init__(
+        self,
+        trip_on: tuple[type[BaseException], ...],
+        failure_threshold: int = 1,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize a closed breaker.
+
+        Args:
+            trip_on: Exception types counted as failures, others pass through untouched.
+            failure_threshold: Consecutive failures that open the circuit.
+            reset_timeout: Seconds the circuit stays open before a trial call is allowed.
+            clock: Monotonic clock, replaceable in tests.
+        """
+        self.trip_on = trip_on
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.failures = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def _before_call(self) -> None:
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                logger.info("Mongo circuit half open, allowing a trial call")
+                return
+            self.rejected += 1
+            raise CircuitOpenError(f"MongoDB circuit is {self.state}, failing fast")
+
+    def _on_success(self) -> None:
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info("Mongo circuit closed")
+            self.state = CLOSED
+            self.consecutive_failures = 0
+
+    def _on_failure(self, error: BaseException) -> None:
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logger.warning(f"Mongo circuit opened for {self.reset_timeout}s after: {error}")
+                self.state = OPEN
+                self.opened_at = self.clock()
+
+    def _abandon_trial(self) -> None:
+        with self._lock:
+            # An interrupted trial says nothing about Mongo, the next call may try again
+            if self.state == HALF_OPEN:
+                self.state = OPEN
+
+    def call(self, operation: Callable[[], T]) -> T:
+        """Run an operation unless the circuit is open.
+
+        Args:
+            operation: Zero-argument callable performing the Mongo call.
+
+        Returns:
+            The operation's result.
+
+        Raises:
+            CircuitOpenError: If the circuit is open.
+        """
+        self._before_call()
+        try:
+            result = operation()
+        except self.trip_on as e:
+            self._on_failure(e)
+            raise
+        except Exception:
+            # Mongo answered and the caller failed on its own terms, the connection is healthy
+            self._on_success()
+            raise
+        except BaseException:
+            self._abandon_trial()
+            raise
+        self._on_success()
+        return result
+
+    def stats(self) -> dict:
+        """Return the breaker state and counters."""
+        return {"state": self.state, "failures": self.failures, "rejected": self.rejected}
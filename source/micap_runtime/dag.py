@@ -0,0 +1,231 @@
+"""Chains of jobs run by one runner, passing results in-process.
+
+A DAG spec lists job modules as steps and the steps each one runs after, for
+example the net worth report::
+
+    {
+        "concurrency": 2,
+        "steps": [
+            {"name": "fx", "jobModule": "jobs.market_data.ecb.fx_api"},
+            {"name": "positions", "jobModule": "jobs.brokers.ibkr.positions"},
+            {"name": "net_worth", "jobModule": "jobs.reports.net_worth.compute", "after": ["fx", "positions"]},
+            {"name": "email", "jobModule": "jobs.reports.net_worth.email_current_net_worth", "after": ["net_worth"]}
+        ]
+    }
+
+``name`` defaults to the last part of the module, other keys of a step override
+runner arguments for that step, e.g. ``"forceRerun": true`` or ``"profile": "cpu"``. Every step module is prefetched and imported
+before the first step starts. Steps then run in topological order on threads of
+this process, at most ``concurrency`` at a time, so independent branches (fx and
+positions above) overlap.
+
+A step reads what the steps it runs after returned from ``args.upstream``, by
+step name, without any serialization or external storage::
+
+    def main(args):
+        rates, positions = args.upstream["fx"], args.upstream["positions"]
+
+A failed step fails the DAG and its descendants are skipped; steps that do not
+depend on it still run. Each step is memoized, keyed also by its upstream
+results, and written to telemetry like a runner job; the CPU, memory and Mongo
+figures of steps that overlap include each other's.
+
+Usage (from source/micap_runtime/):
+    python -u runner.py --dag net_worth.json --runDate 2025-03-20
+"""
+
+__author__ = "David Dawson"
+__copyright__ = "Copyright 2025, David Dawson"
+__credits__ = ["David Dawson"]
+__license__ = "GPL"
+__version__ = "1.0.1"
+__maintainer__ = "Dave Dawson"
+__email__ = "davedawson.co@gmail.com"
+__status__ = "Production"
+
+import argparse
+import contextlib
+import graphlib
+import importlib
+import json
+import logging
+import sys
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from types import ModuleType
+
+try:
+    from .dynamic_import_lib import prefetch_module_closure
+    from .job_profiler import JobProfiler
+    from .memoize import call_main
+    from .telemetry import JobTelemetry
+except ImportError:
+    from dynamic_import_lib import prefetch_module_closure
+    from job_profiler import JobProfiler
+    from memoize import call_main
+    from telemetry import JobTelemetry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 4
+
+_step_keys = ("name", "jobModule", "after")
+
+# tracemalloc and the stack sampler are process-wide, so profiled steps run one at a time
+_profile_lock = threading.Lock()
+
+
+@dataclass
+class DagStep:
+    """A job of the DAG and, once it ran, its outcome."""
+
+    name: str
+    module: str
+    after: tuple[str, ...] = ()
+    arguments: dict = field(default_factory=dict)
+    status: str = "pending"
+    result: object = field(default=None, repr=False)
+    error: BaseException | None = field(default=None, repr=False)
+    seconds: float = 0.0
+
+
+def parse_dag(spec: dict | list) -> tuple[list[DagStep], int | None]:
+    """Build the steps of a DAG spec and check its dependencies.
+
+    Args:
+        spec: ``{"concurrency", "steps"}``, or a plain list of steps.
+
+    Returns:
+        The steps, and the spec's concurrency, None if it sets none.
+
+    Raises:
+        ValueError: If step names repeat, a step runs after an unknown step, or the steps form a cycle.
+    """
+    entries, concurrency = (spec, None) if isinstance(spec, list) else (spec["steps"], spec.get("concurrency"))
+    steps = []
+    for entry in entries:
+        after = entry.get("after", ())
+        steps.append(
+            DagStep(
+                name=entry.get("name") or entry["jobModule"].rpartition(".")[2],
+                module=entry["jobModule"],
+                after=(after,) if isinstance(after, str) else tuple(after),
+                arguments={key: value for key, value in entry.items() if key not in _step_keys},
+            )
+        )
+    names = [step.name for step in steps]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Step names must be unique, got {names}")
+    for step in steps:
+        unknown = set(step.after) - set(names)
+        if unknown:
+            raise ValueError(f"Step {step.name} runs after unknown steps {sorted(unknown)}")
+    try:
+        graphlib.TopologicalSorter({step.name: step.after for step in steps}).prepare()
+    except graphlib.CycleError as e:
+        raise ValueError(f"Steps form a cycle: {' -> '.join(e.args[1])}") from e
+    return steps, concurrency
+
+
+def load_dag(path: str) -> tuple[list[DagStep], int | None]:
+    """Read a DAG spec from a JSON file, ``-`` for stdin, see parse_dag."""
+    with contextlib.nullcontext(sys.stdin) if path == "-" else open(path) as f:
+        return parse_dag(json.load(f))
+
+
+def import_steps(steps: list[DagStep]) -> dict[str, ModuleType]:
+    """Prefetch and import every step module, so a missing module fails the DAG before any step runs."""
+    modules = {}
+    for step in steps:
+        if step.module not in modules:
+            prefetched = prefetch_module_closure(step.module)
+            logger.info(f"Prefetched {prefetched} modules imported by {step.module}")
+            modules[step.module] = importlib.import_module(step.module)
+    return modules
+
+
+def run_step(module: ModuleType, args: argparse.Namespace) -> object:
+    """Run one step as the runner runs a job, memoized, measured and profiled if ``args.profile`` is set."""
+    profile = getattr(args, "profile", None)
+    # A profiled step must execute the job, not replay a memoized output
+    force = getattr(args, "forceRerun", False) or bool(profile)
+    with JobTelemetry(module.__name__, args.runDate, getattr(args, "codeVersion", None)):
+        if not profile:
+            return call_main(module, args, force=force)
+        with _profile_lock, JobProfiler(profile, module.__name__, args.runDate, getattr(args, "profileDir", None)):
+            return call_main(module, args, force=force)
+
+
+def run_dag(
+    steps: list[DagStep],
+    arguments: dict,
+    concurrency: int | None = None,
+    execute: Callable[[ModuleType, argparse.Namespace], object] | None = None,
+) -> list[DagStep]:
+    """Run the steps of a DAG in dependency order.
+
+    Args:
+        steps: Steps from parse_dag.
+        arguments: Runner arguments by name, a step's own arguments override them.
+        concurrency: Maximum number of steps running at once, defaults to 4.
+        execute: Runs a step from its module and arguments and returns its result, defaults to run_step.
+
+    Returns:
+        The steps with their status, ``ok``, ``failed`` or ``skipped``, and results.
+    """
+    execute = execute or run_step
+    by_name = {step.name: step for step in steps}
+    modules = import_steps(steps)
+    sorter = graphlib.TopologicalSorter({step.name: step.after for step in steps})
+    sorter.prepare()
+    running: dict[Future, DagStep] = {}
+    started = time.perf_counter()
+
+    def call(step: DagStep, args: argparse.Namespace) -> object:
+        step_started = time.perf_counter()
+        try:
+            return execute(modules[step.module], args)
+        finally:
+            step.seconds = time.perf_counter() - step_started
+
+    with ThreadPoolExecutor(max_workers=concurrency or DEFAULT_CONCURRENCY, thread_name_prefix="micap-dag") as pool:
+        while sorter.is_active():
+            for name in sorter.get_ready():
+                step = by_name[name]
+                failed = [dependency for dependency in step.after if by_name[dependency].status != "ok"]
+                if failed:
+                    step.status = "skipped"
+                    logger.warning(f"Skipping step {name}, {', '.join(failed)} did not succeed")
+                    sorter.done(name)
+                    continue
+                upstream = {dependency: by_name[dependency].result for dependency in step.after}
+                args = argparse.Namespace(**{**arguments, "jobModule": step.module, **step.arguments, "upstream": upstream})
+                logger.info(f"Starting step {name}: {step.module} for {args.runDate}")
+                step.status = "running"
+                running[pool.submit(call, step, args)] = step
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                step = running.pop(future)
+                step.error = future.exception()
+                if step.error is None:
+                    step.status, step.result = "ok", future.result()
+                else:
+                    step.status = "failed"
+                    logger.error(f"Step {step.name} failed after {step.seconds:.1f}s", exc_info=step.error)
+                sorter.done(step.name)
+
+    logger.info(f"DAG finished in {time.perf_counter() - started:.1f}s")
+    return steps
+
+
+def summary(steps: list[DagStep]) -> str:
+    """Return one line per step with its status and duration."""
+    lines = [f"DAG summary: {sum(step.status == 'ok' for step in steps)}/{len(steps)} steps succeeded"]
+    for step in steps:
+        lines.append(f"  {step.status.upper():8} {step.seconds:8.1f}s  {step.name} ({step.module})")
+    return "\n".join(lines)
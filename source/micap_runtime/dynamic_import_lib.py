@@ -13,15 +13,48 @@ __email__ = "davedawson.co@gmail.com"
 __status__ = "Production"
 
 import _frozen_importlib
+import hashlib
 import importlib.util
+import io
+import json
 import logging
 import os
-import re
 import sys
+import threading
+import time
+import zipfile
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from types import CodeType
+from typing import TypeVar
 from urllib.parse import quote_plus
 
+import gridfs
 import pymongo
 
+try:
+    from . import import_profiler
+    from .bytecode_cache import BytecodeCache
+    from .circuit_breaker import CircuitBreaker
+    from .import_graph import dependency_closure
+    from .mongo_monitoring import CommandStats, PoolStats
+    from .negative_cache import NegativeLookupCache
+    from .redis_cache import RedisSourceCache
+    from .resource_reader import MongoResourceReader
+    from .single_flight import SingleFlight
+except ImportError:  # Loaded as a top level module by runner.py or sitecustomize.py
+    import import_profiler
+    from bytecode_cache import BytecodeCache
+    from circuit_breaker import CircuitBreaker
+    from import_graph import dependency_closure
+    from mongo_monitoring import CommandStats, PoolStats
+    from negative_cache import NegativeLookupCache
+    from redis_cache import RedisSourceCache
+    from resource_reader import MongoResourceReader
+    from single_flight import SingleFlight
+
+T = TypeVar("T")
+
 
 def is_running_in_docker() -> bool:
     """Check if the current environment is running inside a Docker container."""
@@ -37,41 +70,416 @@ logger.info(f"is_running_in_docker: {is_running_in_docker()} as {_hostname}")
 _db_uri = f"mongodb://{quote_plus(_username)}:{quote_plus(_password)}@{_hostname}:27017/"
 _db_name = "dwdrun"
 _collection_name = "codebase"
+# Client tuning, an unreachable server must fail an import within seconds rather than pymongo's 30s default
+_server_selection_timeout_ms = int(os.environ.get("MICAP_MONGO_SERVER_SELECTION_TIMEOUT_MS", "2000"))
+_socket_timeout_ms = int(os.environ.get("MICAP_MONGO_SOCKET_TIMEOUT_MS", "10000"))
+_max_pool_size = int(os.environ.get("MICAP_MONGO_MAX_POOL_SIZE", "8"))
+_circuit_reset_seconds = float(os.environ.get("MICAP_MONGO_CIRCUIT_RESET_SECONDS", "30"))
+# Dependency closures are fetched in batches of this many modules, concurrently if there are several
+_prefetch_batch_size = 200
+_prefetch_max_workers = 4
+# Immutable releases written by release_codebase.publish_release
+_blob_collection_name = "codebase_blobs"
+_release_collection_name = "codebase_releases"
+_current_release_id = "current"
+# GridFS bucket and file name of the single-fetch release bundle, see release_codebase.publish_bundle
+_bundle_bucket = "codebase_bundles"
+_bundle_name = "codebase.zip"
+_bundle_manifest_name = "manifest.json"
+# Non-Python files released with the codebase, see release_codebase.publish_resources
+_resource_bucket = "codebase_resources"
+_resource_index_collection_name = "codebase_resource_index"
+# Seconds between checks of the collection fingerprint, a changed fingerprint reloads the manifest
+_manifest_ttl_seconds = float(os.environ.get("MICAP_MANIFEST_TTL_SECONDS", "300"))
+# Single-flight key of the manifest load, module sources are keyed by their name
+_manifest_flight_key = ("manifest",)
+_resource_index_flight_key = ("resource_index",)
+
+
+# __init__ code synthesized for packages without one, see MongoDBModuleLoader.get_sub_module_data
+_LAZY_PACKAGE_TEMPLATE = """\
+import importlib as _importlib
+
+_SUBMODULES = frozenset({children!r})
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return _importlib.import_module(__name__ + "." + name)
+    raise AttributeError(f"module {{__name__!r}} has no attribute {{name!r}}")
+
+
+def __dir__():
+    return sorted(set(globals()) | _SUBMODULES)
+"""
+
+
+# Process-wide Mongo statistics and circuit breaker, shared by every client the importer creates
+command_stats = CommandStats()
+pool_stats = PoolStats()
+circuit_breaker = CircuitBreaker(
+    trip_on=(pymongo.errors.ConnectionFailure, pymongo.errors.ExecutionTimeout),
+    reset_timeout=_circuit_reset_seconds,
+)
+
+
+def create_mongo_client() -> pymongo.MongoClient:
+    """Create a Mongo client tuned for import latency with monitoring listeners attached."""
+    return pymongo.MongoClient(
+        _db_uri,
+        appname="micap_runtime",
+        serverSelectionTimeoutMS=_server_selection_timeout_ms,
+        connectTimeoutMS=_server_selection_timeout_ms,
+        socketTimeoutMS=_socket_timeout_ms,
+        waitQueueTimeoutMS=1000,
+        maxPoolSize=_max_pool_size,
+        event_listeners=[command_stats, pool_stats],
+    )
+
+
+def manifest_fingerprint(entries: Iterable[dict]) -> str:
+    """Return a hash of the name and content hash of every module entry, independent of their order."""
+    digest = hashlib.sha256()
+    for name, content_hash in sorted((doc["_id"], doc.get("content_hash") or "") for doc in entries):
+        digest.update(f"{name}\0{content_hash}\n".encode())
+    return digest.hexdigest()
 
 
 class MongoDBModuleLoader:
+    # The codebase collection is mutable, so a change stream can keep this loader's manifest current
+    supports_live_reload = True
 
     def __init__(self) -> None:
-        """Initialize the MongoDBModuleLoader with a connection to the codebase collection."""
-        self.client = pymongo.MongoClient(_db_uri, waitQueueTimeoutMS=1000)
-        self.db = self.client[_db_name]
-        self.collection = self.db[_collection_name]
-        logger.debug("Connected successfully to python codebase in mongo")
+        """Initialize the MongoDBModuleLoader, the Mongo client is created on first use."""
+        self._client: pymongo.MongoClient | None = None
+        self._collection = None
+        self.circuit_breaker = circuit_breaker
+        self.manifest: dict[str, bool] | None = None
+        self.stored_modules: set[str] = set()
+        self.children: dict[str, set[str]] = {}
+        self.imports: dict[str, list[str]] = {}
+        self.content_hashes: dict[str, str] = {}
+        self.runtime_imports: dict[str, set[str]] = {}
+        self._executing = threading.local()
+        self._module_locks: dict[str, threading.RLock] = {}
+        self._module_locks_lock = threading.Lock()
+        self.prefetched: dict[str, str] = {}
+        self.single_flight = SingleFlight()
+        self.code_version: str | None = None
+        self.negative_cache: NegativeLookupCache | None = None
+        self.resource_index: tuple[dict[str, dict], dict[str, set[str]]] | None = None
+        self.manifest_checked_at = 0.0
+        self.bytecode_cache = BytecodeCache.from_environment()
+        self.source_cache = RedisSourceCache.from_environment()
+
+    @property
+    def client(self) -> pymongo.MongoClient:
+        """Return the Mongo client, creating it on first use."""
+        if self._client is None:
+            self._client = create_mongo_client()
+            logger.debug("Created Mongo client for the python codebase")
+        return self._client
+
+    @property
+    def db(self) -> pymongo.database.Database:
+        """Return the codebase database."""
+        return self.client[_db_name]
+
+    @property
+    def collection(self) -> pymongo.collection.Collection:
+        """Return the codebase collection."""
+        if self._collection is None:
+            self._collection = self.db[_collection_name]
+        return self._collection
+
+    @collection.setter
+    def collection(self, collection: pymongo.collection.Collection) -> None:
+        self._collection = collection
+
+    def reset_connection(self) -> None:
+        """Drop the Mongo client so the next query connects afresh.
+
+        Called in forked children: a MongoClient must not be used across a fork, its
+        sockets and monitor threads belong to the parent. Manifest and caches are kept.
+        """
+        self._client = None
+        self._collection = None
+
+    def query(self, operation: Callable[[], T]) -> T:
+        """Run a Mongo operation through the process-wide circuit breaker.
+
+        Args:
+            operation: Zero-argument callable performing the query, cursors must be consumed inside it.
+
+        Returns:
+            The operation's result.
+        """
+        return self.circuit_breaker.call(operation)
+
+    def load_manifest(self) -> dict[str, bool]:
+        """Load every module name and its package flag from the collection in one query.
+
+        Uses the ``parent`` and ``is_package`` fields written by release_codebase, and
+        derives them from the dotted name for documents released before those existed.
+        Names that only exist as the parent of stored modules (packages without an
+        ``__init__`` document of their own) are included as packages.
+
+        Returns:
+            Mapping of module name to ``True`` for packages and ``False`` for plain modules.
+        """
+        entries = self.query(lambda: list(self.collection.find({}, {"_id": 1, "parent": 1, "is_package": 1, "imports": 1, "content_hash": 1})))
+        return self.build_manifest(entries, manifest_fingerprint(entries))
+
+    def build_manifest(self, entries: Iterable[dict], fingerprint: object) -> dict[str, bool]:
+        """Build the manifest, children index and negative cache from module entries.
+
+        Args:
+            entries: Documents with an ``_id`` and optional ``parent``, ``is_package``, ``imports`` and
+                ``content_hash`` fields.
+            fingerprint: Fingerprint of the source the entries were read at.
+
+        Returns:
+            Mapping of module name to ``True`` for packages and ``False`` for plain modules.
+        """
+        manifest = {}
+        stored_modules = set()
+        children = {}
+        imports = {}
+        content_hashes = {}
+        for doc in entries:
+            name = doc["_id"]
+            stored_modules.add(name)
+            imports[name] = doc.get("imports") or []
+            if doc.get("content_hash"):
+                content_hashes[name] = doc["content_hash"]
+            manifest[name] = manifest.get(name, False) or bool(doc.get("is_package"))
+            parent = doc.get("parent") or name.rpartition(".")[0]
+            while parent and name not in children.get(parent, ()):
+                manifest[parent] = True
+                children.setdefault(parent, set()).add(name)
+                name, parent = parent, parent.rpartition(".")[0]
+
+        self.manifest = manifest
+        self.stored_modules = stored_modules
+        self.children = children
+        self.imports = imports
+        self.content_hashes = content_hashes
+        self.negative_cache = NegativeLookupCache(manifest, fingerprint=fingerprint)
+        self.resource_index = None  # Resources are released with the modules, reload them together
+        self.manifest_checked_at = time.monotonic()
+        logger.debug(f"Loaded codebase manifest with {len(manifest)} entries")
+        return manifest
+
+    def apply_changes(self, upserted: dict[str, dict], deleted: Iterable[str]) -> None:
+        """Update the manifest and mirrored sources in place from changed codebase documents.
+
+        Args:
+            upserted: Full documents of inserted, updated or replaced modules by name.
+            deleted: Names of removed modules.
+        """
+        manifest = self.get_manifest()
+        entries = {
+            name: {
+                "_id": name,
+                "is_package": manifest[name],
+                "imports": self.imports.get(name),
+                "content_hash": self.content_hashes.get(name),
+            }
+            for name in self.stored_modules
+        }
+        entries.update(upserted)
+        for name in deleted:
+            entries.pop(name, None)
+            self.prefetched.pop(name, None)
+        for name, doc in upserted.items():
+            if "content" in doc:
+                self.prefetched[name] = doc["content"]
+        # The mirror now holds what the collection holds, so its fingerprint matches the collection's
+        self.build_manifest(entries.values(), fingerprint=manifest_fingerprint(entries.values()))
+
+    def collection_fingerprint(self) -> object:
+        """Return a value that changes whenever a module is added, removed or rewritten.
+
+        Hashes the name and content hash of every document, read with a projection so no source
+        is transferred. A count would miss a module deleted and another added between two checks.
+        """
+        return manifest_fingerprint(self.query(lambda: list(self.collection.find({}, {"_id": 1, "content_hash": 1}))))
+
+    def manifest_is_stale(self) -> bool:
+        """Check, at most once per TTL, whether the collection changed since the manifest was loaded."""
+        if time.monotonic() - self.manifest_checked_at < _manifest_ttl_seconds:
+            return False
+        self.manifest_checked_at = time.monotonic()
+        try:
+            fingerprint = self.collection_fingerprint()
+        except Exception as e:
+            logger.debug(f"Unable to check codebase fingerprint, keeping current manifest: {e}")
+            return False
+        return self.negative_cache is None or fingerprint != self.negative_cache.fingerprint
+
+    def get_manifest(self) -> dict[str, bool]:
+        """Return the module manifest, loading it on first use and reloading it when stale."""
+        manifest = self.manifest
+        if manifest is None or self.manifest_is_stale():
+            # Threads importing at the same time share one manifest query, and a thread arriving
+            # after another already replaced the manifest it saw does not load it again
+            self.single_flight.do(_manifest_flight_key, lambda: self.manifest is not manifest or self.load_manifest())
+        return self.manifest
+
+    def is_package(self, fullname: str) -> bool:
+        """Return True if the manifest marks the name as a package."""
+        return self.get_manifest().get(fullname, False)
+
+    def get_children(self, fullname: str) -> list[str]:
+        """Return the full names of the direct children of a package."""
+        self.get_manifest()
+        return sorted(self.children.get(fullname, ()))
+
+    def import_graph(self) -> dict[str, set[str]]:
+        """Return the codebase modules each module imports, from release-time analysis and observed imports."""
+        manifest = self.get_manifest()
+        graph = {name: {dep for dep in deps if dep in manifest} for name, deps in self.imports.items()}
+        for name, deps in list(self.runtime_imports.items()):
+            graph.setdefault(name, set()).update(deps)
+        return graph
+
+    def dependency_closure(self, fullname: str) -> list[str]:
+        """Return the module and everything it transitively imports from the codebase."""
+        return dependency_closure([fullname], self.imports, self.get_manifest())
+
+    def code_hash(self, fullname: str) -> str:
+        """Return a sha256 over the sources of a module and everything it transitively imports.
+
+        Uses release-time and observed imports, so call it after the module was imported.
+        Modules without a stored content hash are hashed from their source.
+        """
+        digests = []
+        for name in sorted(dependency_closure([fullname], self.import_graph(), self.get_manifest())):
+            digest = self.content_hashes.get(name)
+            if digest is None and name in self.stored_modules:
+                digest = hashlib.sha256(self.fetch_source(name).encode()).hexdigest()
+            digests.append(f"{name}={digest}\n")
+        return hashlib.sha256("".join(digests).encode()).hexdigest()
+
+    def fetch_sources(self, names: list[str]) -> dict[str, str]:
+        """Fetch the sources of several modules in one query."""
+        documents = self.query(lambda: list(self.collection.find({"_id": {"$in": names}}, {"content": 1})))
+        return {doc["_id"]: doc["content"] for doc in documents}
+
+    def prefetch(self, fullname: str) -> list[str]:
+        """Fetch the whole dependency closure of a module before it is executed.
+
+        Sources are kept in memory and consumed by exec_module, so importing the
+        module afterwards issues no further queries for anything in the closure.
+
+        Args:
+            fullname: Module about to be imported, e.g. a job module.
+
+        Returns:
+            Names of the modules that were fetched.
+        """
+        names = [
+            name
+            for name in self.dependency_closure(fullname)
+            if name in self.stored_modules and name not in sys.modules and name not in self.prefetched
+        ]
+
+        def fetch(claimed: list[str]) -> dict[str, str]:
+            fetched = self.read_source_cache(claimed)
+            missing = [name for name in claimed if name not in fetched]
+            batches = [missing[i : i + _prefetch_batch_size] for i in range(0, len(missing), _prefetch_batch_size)]
+            if len(batches) > 1:
+                with ThreadPoolExecutor(max_workers=min(len(batches), _prefetch_max_workers)) as pool:
+                    results = list(pool.map(self.fetch_sources, batches))
+            else:
+                results = [self.fetch_sources(batch) for batch in batches]
+            for sources in results:
+                fetched.update(sources)
+                self.write_source_cache(sources)
+            self.prefetched.update(fetched)
+            logger.debug(f"Prefetched {len(claimed)} modules for {fullname} in {len(batches)} queries")
+            return fetched
+
+        # Modules already being fetched by another thread are left to that fetch
+        return self.single_flight.do_many(names, fetch)
+
+    def read_source_cache(self, names: list[str]) -> dict[str, str]:
+        """Return the sources the shared Redis tier holds for the given modules, by module name."""
+        if self.source_cache is None:
+            return {}
+        hashes = {name: self.content_hashes[name] for name in names if name in self.content_hashes}
+        cached = self.source_cache.get_many(hashes.values())
+        return {name: cached[digest] for name, digest in hashes.items() if digest in cached}
+
+    def write_source_cache(self, sources: dict[str, str]) -> None:
+        """Store sources fetched from Mongo in the shared Redis tier for other runners.
+
+        A source is only stored under its manifest hash if it still hashes to it: a module rewritten since the
+        manifest was loaded would otherwise poison the entry every runner reads for that hash.
+        """
+        if self.source_cache is None:
+            return
+        verified = {}
+        for name, source in sources.items():
+            digest = self.content_hashes.get(name)
+            if digest is None:
+                continue
+            if hashlib.sha256(source.encode()).hexdigest() != digest:
+                logger.debug(f"Not caching {name} in Redis, its source no longer matches the manifest hash")
+                continue
+            verified[digest] = source
+        self.source_cache.set_many(verified)
+
+    def fetch_source(self, fullname: str) -> str:
+        """Fetch one module's source from the shared Redis tier, or from Mongo on a miss."""
+        cached = self.read_source_cache([fullname])
+        if fullname in cached:
+            return cached[fullname]
+        source = self.get_data(fullname)
+        self.write_source_cache({fullname: source})
+        return source
+
+    def get_source(self, fullname: str) -> str:
+        """Return a module's source, from the prefetched sources if available.
+
+        Concurrent requests for the same module, including one covered by a prefetch
+        in flight on another thread, share a single fetch.
+        """
+        source = self.single_flight.do(fullname, lambda: self.prefetched.get(fullname) or self.fetch_source(fullname))
+        self.prefetched.pop(fullname, None)
+        if source is None:
+            # The prefetch this request waited for did not return the module
+            source = self.fetch_source(fullname)
+        return source
 
     def create_module(self, spec) -> object:
         """Create an uninitialized extension module"""
         new_module = _frozen_importlib._new_module(spec.name)
-        new_module.__path__ = self.get_filename(spec.name)
+        if spec.submodule_search_locations is not None:
+            new_module.__path__ = spec.submodule_search_locations
         return new_module
 
     def get_sub_module_data(self, fullname: str) -> dict:
-        """Given a full name assume package and return all underlying sub modules"""
-        pattern = f"^{re.escape(fullname)}\\."
-        modules = [doc["_id"] for doc in self.collection.find({"_id": {"$regex": pattern}})]
-
-        # Find direct children only
-        direct_children = set()
-        for module_name in modules:
-            # Remove the package prefix
-            relative_name = module_name[len(fullname)+1:]
-            # Get only the first segment (direct child)
-            first_segment = relative_name.split('.')[0]
-            direct_children.add(first_segment)
-
-        all_list = '", "'.join(sorted(direct_children))
-        module_data = {"content": f'__all__ = ["{all_list}"]' if all_list else '__all__ = []'}
+        """Given a full name assume package and return code exposing its direct sub modules lazily.
+
+        The synthesized package defines a module level ``__getattr__`` (PEP 562) that imports
+        only the child being accessed, and ``__dir__`` lists the children from the manifest.
+        There is no ``__all__``, so a star import or a tool walking ``__all__`` does not
+        import every sibling module.
+        """
+        direct_children = sorted({name.rpartition(".")[2] for name in self.get_children(fullname)})
+        module_data = {"content": _LAZY_PACKAGE_TEMPLATE.format(children=direct_children)}
         return module_data
 
+    def module_lock(self, fullname: str) -> threading.RLock:
+        """Return the lock held while a module executes, created on first use.
+
+        Reentrant, so a module re-executed from its own execution, e.g. reloaded while it runs,
+        executes again instead of deadlocking its thread.
+        """
+        with self._module_locks_lock:
+            return self._module_locks.setdefault(fullname, threading.RLock())
+
     def exec_module(self, module: object) -> None:
         """Initialize an extension module.
 
@@ -79,22 +487,36 @@ class MongoDBModuleLoader:
             module: The module to initialize.
         """
         fullname = module.__name__
+        # Serializes executions of one module, including direct calls such as hot reloads
+        with self.module_lock(fullname):
+            # Record which module's execution imported this one, completing the static import graph
+            stack = self._executing.__dict__.setdefault("stack", [])
+            if stack:
+                self.runtime_imports.setdefault(stack[-1], set()).add(fullname)
+            stack.append(fullname)
+            profiler = import_profiler.active_profiler
+            if profiler is not None:
+                profiler.begin(fullname)
+            try:
+                self._exec_module(module, fullname, profiler)
+            finally:
+                stack.pop()
+                if profiler is not None:
+                    profiler.end(fullname)
+
+    def _exec_module(self, module: object, fullname: str, profiler: import_profiler.ImportProfiler | None) -> None:
         sys.modules[fullname] = module  # Register module early to handle circular imports
 
-        try:
-            # Try to get module code directly
-            module_code = self.get_data(fullname)
-            is_package = False
-            code_content = module_code["content"] if isinstance(module_code, dict) else module_code
-        except FileNotFoundError:
-            # If not found, it might be a package
-            pattern = f"^{re.escape(fullname)}\\."
-            if self.collection.count_documents({"_id": {"$regex": pattern}}) > 0:
-                module_code = self.get_sub_module_data(fullname)
-                code_content = module_code["content"]
-                is_package = True
-            else:
-                raise ImportError(f"Module '{fullname}' not found in MongoDB collection.")
+        started = time.perf_counter()
+        is_package = self.is_package(fullname)
+        if fullname in self.stored_modules:
+            code_content = self.get_source(fullname)
+        elif is_package:
+            # Package without an __init__ document, synthesize one from its children
+            code_content = self.get_sub_module_data(fullname)["content"]
+        else:
+            raise ImportError(f"Module '{fullname}' not found in MongoDB collection.")
+        fetched = time.perf_counter()
 
         if not hasattr(module, "__file__"):
             module.__file__ = f"<mongodb>/{fullname.replace('.', '/')}"
@@ -108,38 +530,267 @@ class MongoDBModuleLoader:
             if not hasattr(module, "__package__"):
                 module.__package__ = fullname.rpartition('.')[0] or None
 
+        code = self.compile_source(code_content, module.__file__)
+        compiled = time.perf_counter()
+        if profiler is not None:
+            profiler.add(
+                fullname,
+                bytes=len(code_content.encode("utf-8")),
+                fetch_ms=(fetched - started) * 1000,
+                compile_ms=(compiled - fetched) * 1000,
+            )
+
         # Execute module code in the module's namespace
-        exec(code_content, module.__dict__)
+        try:
+            exec(code, module.__dict__)
+        finally:
+            if profiler is not None:
+                profiler.add(fullname, exec_ms=(time.perf_counter() - compiled) * 1000)
 
         # Ensure the module is in sys.modules
         sys.modules[fullname] = module
 
+    def compile_source(self, source: str, filename: str) -> CodeType:
+        """Compile module source, reusing the on-disk bytecode cache when configured.
+
+        Args:
+            source: Python source text of the module.
+            filename: Filename recorded in the code object.
+
+        Returns:
+            The compiled code object.
+        """
+        if self.bytecode_cache is None:
+            return compile(source, filename, "exec", dont_inherit=True)
+        return self.bytecode_cache.get_code(source, filename)
+
+    def get_resource_reader(self, fullname: str) -> MongoResourceReader | None:
+        """Return a reader serving the package's released resources to importlib.resources."""
+        return MongoResourceReader(self, fullname) if self.is_package(fullname) else None
+
+    def load_resource_entries(self) -> list[dict]:
+        """Return the path, content hash and length of every released resource."""
+        return self.query(lambda: list(self.db[_resource_index_collection_name].find({}, {"content_hash": 1, "length": 1})))
+
+    def get_resource_index(self) -> tuple[dict[str, dict], dict[str, set[str]]]:
+        """Return resource entries by path and the child names of every directory, loading them on first use."""
+        if self.resource_index is None:
+            self.single_flight.do(_resource_index_flight_key, lambda: self.build_resource_index(self.load_resource_entries()))
+        return self.resource_index
+
+    def build_resource_index(self, entries: Iterable[dict]) -> None:
+        """Index resource entries by path and record the directories that contain them.
+
+        Args:
+            entries: Documents with the resource path as ``_id`` and its ``content_hash``.
+        """
+        files = {}
+        directories = {}
+        for entry in entries:
+            path = entry["_id"]
+            files[path] = entry
+            while "/" in path:
+                path, _, child = path.rpartition("/")
+                directories.setdefault(path, set()).add(child)
+        self.resource_index = (files, directories)
+        logger.debug(f"Loaded resource index with {len(files)} files")
+
+    def open_resource(self, entry: dict) -> gridfs.GridOut:
+        """Open a streaming download of a resource, chunks are fetched as it is read."""
+        bucket = gridfs.GridFSBucket(self.db, bucket_name=_resource_bucket)
+        return self.query(lambda: bucket.open_download_stream(entry["content_hash"]))
+
     def load_module(self, fullname: str) -> None:
         """Legacy method for backward compatibility."""
         pass
 
     def get_data(self, fullname: str) -> str:
-        record = self.collection.find_one({"_id": fullname}, max_time_ms=1000)
+        record = self.query(lambda: self.collection.find_one({"_id": fullname}, max_time_ms=1000))
         if not record:
             raise FileNotFoundError(f"Module {fullname} not found")
         return record["content"]
 
     def get_filename(self, fullname: str) -> str:
         """Return the path to the source file as found by the finder."""
-        record = self.collection.find_one({"_id": fullname}, max_time_ms=1000)
+        if fullname not in self.get_manifest():
+            raise FileNotFoundError(f"Module {fullname} not found")
+        return fullname
+
+
+class MongoDBBundleLoader(MongoDBModuleLoader):
+    """Serve every module from a release bundle fetched from GridFS in one streamed read.
+
+    The bundle is a deflated zip of the source tree with a manifest, published by
+    ``release_codebase.publish_bundle``. Sources are decompressed from memory on
+    import, so a cold start costs one round trip regardless of the number of modules.
+    """
+
+    supports_live_reload = False
+
+    def __init__(self, code_version: str | None = None) -> None:
+        """Initialize the loader for the latest bundle, or the immutable bundle of a pinned release.
+
+        Args:
+            code_version: Release version to pin to, see release_codebase.publish_release.
+        """
+        super().__init__()
+        self.pinned_version = code_version
+        self.release_resources: list[dict] = []
+        self.bundle_name = f"codebase-{code_version}.zip" if code_version else _bundle_name
+        self.bundle: zipfile.ZipFile | None = None
+        self.bundle_paths: dict[str, str] = {}
+        self.source_cache = None  # Every source is already in memory once the bundle is fetched
+
+    def manifest_is_stale(self) -> bool:
+        """Return False for pinned bundles, which are immutable and never need revalidation."""
+        return self.pinned_version is None and super().manifest_is_stale()
+
+    def collection_fingerprint(self) -> object:
+        """Return the id of the latest revision of the bundle."""
+        if self.pinned_version is not None:
+            return self.pinned_version
+        record = self.query(
+            lambda: self.db[f"{_bundle_bucket}.files"].find_one({"filename": self.bundle_name}, {"_id": 1}, sort=[("uploadDate", pymongo.DESCENDING)])
+        )
+        return record["_id"] if record else None
+
+    def fetch_bundle(self) -> dict:
+        """Download the latest bundle revision and return its manifest."""
+        bucket = gridfs.GridFSBucket(self.db, bucket_name=_bundle_bucket)
+
+        def download() -> bytes:
+            with bucket.open_download_stream_by_name(self.bundle_name) as stream:
+                return stream.read()
+
+        data = self.query(download)
+        self.bundle = zipfile.ZipFile(io.BytesIO(data))
+        bundle_manifest = json.loads(self.bundle.read(_bundle_manifest_name))
+        logger.info(f"Fetched codebase bundle {self.bundle_name} ({len(data)} bytes, {len(bundle_manifest['modules'])} modules)")
+        return bundle_manifest
+
+    def load_manifest(self) -> dict[str, bool]:
+        """Fetch the bundle and build the manifest from the module list it carries."""
+        fingerprint = self.collection_fingerprint()
+        bundle_manifest = self.fetch_bundle()
+        self.bundle_paths = {entry["_id"]: entry["path"] for entry in bundle_manifest["modules"]}
+        self.code_version = bundle_manifest.get("version")
+        return self.build_manifest(bundle_manifest["modules"], fingerprint)
+
+    def fetch_sources(self, names: list[str]) -> dict[str, str]:
+        """Return the sources of several modules from the in-memory bundle, never the mutable collection."""
+        return {name: self.get_data(name) for name in names if name in self.bundle_paths}
+
+    def get_data(self, fullname: str) -> str:
+        """Return a module's source from the in-memory bundle."""
+        path = self.bundle_paths.get(fullname)
+        if self.bundle is None or path is None:
+            raise FileNotFoundError(f"Module {fullname} not found")
+        return self.bundle.read(path).decode("utf-8")
+
+
+class MongoDBReleaseLoader(MongoDBModuleLoader):
+    """Serve modules from one immutable release snapshot.
+
+    The release version is either pinned by the caller or resolved once from the
+    ``current`` pointer at setup, so a release published mid-run never mixes old and
+    new modules in one process. Sources are fetched by content hash from the blob
+    collection, which never changes for a given hash.
+    """
+
+    supports_live_reload = False
+
+    def __init__(self, code_version: str | None = None) -> None:
+        """Initialize the loader.
+
+        Args:
+            code_version: Release version to pin to, defaults to the current release at setup.
+        """
+        super().__init__()
+        self.pinned_version = code_version
+        self.release_resources: list[dict] = []
+
+    def resolve_version(self) -> str:
+        """Return the pinned version, or the version the ``current`` pointer refers to."""
+        if self.pinned_version is not None:
+            return self.pinned_version
+        pointer = self.query(lambda: self.db[_release_collection_name].find_one({"_id": _current_release_id}, max_time_ms=1000))
+        if not pointer:
+            raise FileNotFoundError("No current codebase release has been published")
+        return pointer["version"]
+
+    def collection_fingerprint(self) -> object:
+        """Return the loaded release version, releases are immutable."""
+        return self.code_version
+
+    def manifest_is_stale(self) -> bool:
+        """Return False, the process stays on the release it resolved at setup."""
+        return False
+
+    def load_manifest(self) -> dict[str, bool]:
+        """Load the module listing of the release snapshot in one query."""
+        version = self.code_version or self.resolve_version()
+        release = self.query(lambda: self.db[_release_collection_name].find_one({"_id": version}, max_time_ms=1000))
+        if not release:
+            raise FileNotFoundError(f"Codebase release {version} not found")
+
+        self.code_version = version
+        logger.info(f"Loading modules from codebase release {version}")
+        manifest = self.build_manifest(release["modules"], version)
+        self.release_resources = release.get("resources", [])
+        self.build_resource_index(self.release_resources)
+        return manifest
+
+    def load_resource_entries(self) -> list[dict]:
+        """Return the resources listed in the release snapshot, read with the manifest already held."""
+        self.get_manifest()
+        return self.release_resources
+
+    def fetch_sources(self, names: list[str]) -> dict[str, str]:
+        """Fetch the sources of several modules from the blob collection in one query."""
+        names_by_hash = {}
+        for name in names:
+            if name in self.content_hashes:
+                names_by_hash.setdefault(self.content_hashes[name], []).append(name)
+        sources = {}
+        documents = self.query(lambda: list(self.db[_blob_collection_name].find({"_id": {"$in": list(names_by_hash)}})))
+        for doc in documents:
+            for name in names_by_hash[doc["_id"]]:
+                sources[name] = doc["content"]
+        return sources
+
+    def get_data(self, fullname: str) -> str:
+        """Fetch a module's source from the blob collection by its content hash."""
+        self.get_manifest()
+        digest = self.content_hashes.get(fullname)
+        record = self.query(lambda: self.db[_blob_collection_name].find_one({"_id": digest}, max_time_ms=1000)) if digest else None
         if not record:
             raise FileNotFoundError(f"Module {fullname} not found")
-        return record["_id"]
+        return record["content"]
 
 
 class MongoDBImporter:
-    def __init__(self) -> None:
-        """Initialize the MongoDB importer."""
-        self.loader = MongoDBModuleLoader()
+    # Marks the importer in sys.meta_path even when this module was imported under another name
+    is_micap_importer = True
+
+    def __init__(self, loader: MongoDBModuleLoader | None = None) -> None:
+        """Initialize the MongoDB importer and load the codebase manifest.
+
+        Args:
+            loader: Loader to resolve modules with, defaults to one reading the codebase collection.
+        """
+        self.loader = loader or MongoDBModuleLoader()
+        try:
+            self.loader.load_manifest()
+        except Exception as e:
+            # The manifest is loaded lazily on the first lookup instead
+            logger.warning(f"Unable to load codebase manifest from Mongo: {e}")
 
     def find_spec(self, fullname: str, path=None, target=None) -> object | None:
         """Find the spec for a module.
 
+        Resolution is a lookup in the loader's manifest, no query is issued per import.
+        Names absent from the codebase are rejected by the negative lookup cache.
+
         Args:
             fullname: The full name of the module to find.
             path: Optional path to search within.
@@ -148,32 +799,137 @@ class MongoDBImporter:
         Returns:
             ModuleSpec object if found, None otherwise.
         """
+        profiler = import_profiler.active_profiler
+        if profiler is None:
+            return self._find_spec(fullname)
+        started = time.perf_counter()
+        spec = self._find_spec(fullname)
+        profiler.record_lookup(fullname, time.perf_counter() - started, found=spec is not None)
+        return spec
+
+    def _find_spec(self, fullname: str) -> object | None:
         if fullname in sys.modules:  # Skip if already imported
             return None
 
         try:
-            # First try to find it as a direct module
-            try:
-                self.loader.get_data(fullname)
-                return importlib.util.spec_from_loader(fullname, self.loader, is_package=False)
-            except FileNotFoundError:
-                # Not a direct module, check if it's a package
-                pattern = f"^{re.escape(fullname)}\\."
-                if self.loader.collection.count_documents({"_id": {"$regex": pattern}}) > 0:
-                    spec = importlib.util.spec_from_loader(fullname, self.loader, is_package=True)
-                    spec.submodule_search_locations = [fullname]
-                    return spec
-                return None
+            manifest = self.loader.get_manifest()
         except Exception as e:
             logger.debug(f"Failed importing from Mongo: {fullname}, error: {e}")
             return None
 
+        negative_cache = self.loader.negative_cache
+        if negative_cache is not None and negative_cache.is_known_absent(fullname):
+            return None
+
+        if fullname not in manifest:
+            return None
+
+        is_package = manifest[fullname]
+        spec = importlib.util.spec_from_loader(fullname, self.loader, is_package=is_package)
+        if is_package:
+            spec.submodule_search_locations = [fullname]
+        return spec
+
+
+def prefetch_module_closure(fullname: str) -> int:
+    """Prefetch a module's dependency closure through the installed Mongo importer.
+
+    Prefetching is an optimization only, failures are logged and imports then
+    fall back to fetching modules one at a time.
+
+    Args:
+        fullname: Module about to be imported.
+
+    Returns:
+        Number of modules fetched.
+    """
+    importer = get_micap_importer()
+    if importer is None:
+        return 0
+    try:
+        return len(importer.loader.prefetch(fullname))
+    except Exception as e:
+        logger.warning(f"Unable to prefetch dependencies of {fullname}: {e}")
+        return 0
+
+
+def get_micap_importer() -> MongoDBImporter | None:
+    """Return the Mongo importer installed in sys.meta_path, if any."""
+    for finder in sys.meta_path:
+        if getattr(finder, "is_micap_importer", False):
+            return finder
+    return None
+
+
+def importer_stats() -> dict:
+    """Return round trip, latency, connection pool, circuit breaker, cache and single-flight statistics."""
+    importer = get_micap_importer()
+    negative_cache = importer.loader.negative_cache if importer is not None else None
+    return {
+        "commands": command_stats.stats(),
+        "pool": pool_stats.stats(),
+        "circuit": circuit_breaker.stats(),
+        "negative_cache": negative_cache.stats() if negative_cache is not None else None,
+        "single_flight": importer.loader.single_flight.stats() if importer is not None else None,
+        "redis": importer.loader.source_cache.stats() if importer is not None and importer.loader.source_cache else None,
+    }
+
+
+def _reset_connection_after_fork() -> None:
+    importer = get_micap_importer()
+    if importer is not None:
+        importer.loader.reset_connection()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_connection_after_fork)
+
+
+def setup_micap_importing(
+    mode: str | None = None, code_version: str | None = None, import_profile: str | None = None
+) -> MongoDBImporter:
+    """Setup the MongoDB importer for dynamic module loading.
+
+    Idempotent: sitecustomize.py, runner.py and Jupyter may all call this, only the
+    first call installs an importer and later calls return it.
+
+    Args:
+        mode: ``"collection"`` to fetch modules one by one from the codebase collection,
+            ``"release"`` to load from an immutable release snapshot, or ``"bundle"`` to load
+            the whole codebase from the released GridFS bundle.
+            Defaults to the MICAP_IMPORT_MODE environment variable, then ``"collection"``,
+            or ``"release"`` when a code version is pinned.
+        code_version: Release version to pin to. Defaults to the MICAP_CODE_VERSION
+            environment variable.
+        import_profile: Path to write an import-time profile of Mongo-sourced modules to
+            at exit. Defaults to the MICAP_IMPORT_PROFILE environment variable, profiling
+            is off when neither is set.
+
+    Returns:
+        The process-wide importer.
+    """
+    if import_profile or os.environ.get(import_profiler.PROFILE_ENV):
+        import_profiler.enable(import_profile)
+
+    importer = get_micap_importer()
+    if importer is not None:
+        logger.debug("Mongo importer already installed")
+        return importer
+
+    code_version = code_version or os.environ.get("MICAP_CODE_VERSION") or None
+    mode = mode or os.environ.get("MICAP_IMPORT_MODE") or ("release" if code_version else "collection")
+    if mode == "bundle":
+        loader = MongoDBBundleLoader(code_version)
+    elif mode == "release" or code_version:
+        loader = MongoDBReleaseLoader(code_version)
+    else:
+        loader = MongoDBModuleLoader()
 
-def setup_micap_importing() -> None:
-    """Setup the MongoDB importer for dynamic module loading."""
     # Insert our MongoDBImporter into sys.meta_path
-    sys.meta_path.insert(3, MongoDBImporter())
-    logger.info("Added Dynamic libary to positon 3")
+    importer = MongoDBImporter(loader)
+    sys.meta_path.insert(3, importer)
+    logger.info(f"Added Dynamic libary to positon 3 in {mode} mode")
+    return importer
 
 
 if __name__ == "__main__":
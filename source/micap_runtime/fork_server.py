@@ -0,0 +1,445 @@
+"""Pre-warmed fork server for runner jobs.
+
+Every ``micap_run.sh`` job starts a container, an interpreter, the Mongo importer
+and the heavy scientific imports before the job's ``main`` runs. The fork server
+pays those costs once: it installs the importer, loads the manifest, imports
+runner.py and a configurable set of modules (MICAP_PRELOAD_MODULES), then waits on
+a Unix socket. Each job request forks a child from the warm process, so a small
+job starts in milliseconds.
+
+Protocol, one connection per job:
+    client -> server  one JSON line ``{"argv": [...], "env": {...}}`` sent together
+                      with the client's stdin, stdout and stderr file descriptors
+    server -> client  ``{"pid": n}`` once the child runs, ``{"exit_code": n}`` when it ends,
+                      or ``{"error": "..."}`` if the request was rejected
+    client -> server  ``{"signal": n}`` to forward a signal to the child
+
+The child writes straight to the client's descriptors, so output is never copied
+through the server. A child killed by a signal reports ``128 + signal`` as a shell
+would, and closing the connection terminates the child.
+
+Usage (from source/micap_runtime/):
+    python -u fork_server.py serve
+    python -u fork_server.py run -- --jobModule=jobs.market_data.ecb.fx_api --runDate=2024-01-01
+"""
+
+__author__ = "David Dawson"
+__copyright__ = "Copyright 2025, David Dawson"
+__credits__ = ["David Dawson"]
+__license__ = "GPL"
+__version__ = "1.0.1"
+__maintainer__ = "Dave Dawson"
+__email__ = "davedawson.co@gmail.com"
+__status__ = "Production"
+
+import argparse
+import atexit
+import contextlib
+import importlib
+import json
+import logging
+import os
+import selectors
+import signal
+import socket
+import sys
+import threading
+import traceback
+from collections.abc import Callable, Iterable
+from typing import NoReturn
+
+try:
+    from . import import_profiler
+    from .dynamic_import_lib import get_micap_importer, setup_micap_importing
+    from .run_dates import expand_run_dates
+except ImportError:
+    import import_profiler
+    from dynamic_import_lib import get_micap_importer, setup_micap_importing
+    from run_dates import expand_run_dates
+
+logger = logging.getLogger(__name__)
+
+SOCKET_ENV = "MICAP_FORK_SERVER_SOCKET"
+PRELOAD_ENV = "MICAP_PRELOAD_MODULES"
+DEFAULT_SOCKET_PATH = "/tmp/micap_fork_server.sock"
+DEFAULT_PRELOAD_MODULES = ("numpy", "pandas", "pymongo", "lib.logging.utils")
+# Environment variables the client forwards to the job
+FORWARDED_ENV_PREFIX = "MICAP_"
+
+_max_request_bytes = 1024 * 1024
+_reap_interval_seconds = 0.005
+
+
+def socket_path_from_environment() -> str:
+    """Return the server socket path, MICAP_FORK_SERVER_SOCKET or the default."""
+    return os.environ.get(SOCKET_ENV) or DEFAULT_SOCKET_PATH
+
+
+def preload_modules(names: Iterable[str]) -> list[str]:
+    """Import modules so forked children inherit them, skipping those that fail.
+
+    Args:
+        names: Dotted module names, from disk or from Mongo.
+
+    Returns:
+        The names imported.
+    """
+    loaded = []
+    for name in names:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            logger.warning(f"Fork server could not preload {name}: {e}")
+            continue
+        loaded.append(name)
+    return loaded
+
+
+def warm_up(preload: Iterable[str]) -> list[str]:
+    """Install the importer, load the manifest and import runner.py and the preload modules.
+
+    Args:
+        preload: Modules to import before serving.
+
+    Returns:
+        The modules imported.
+    """
+    # runner.py parses --codeVersion only when run as a script, so the importer must be installed before it is imported
+    importer = setup_micap_importing()
+    importer.loader.get_manifest()
+    return preload_modules(["runner", *preload])
+
+
+def run_job(argv: list[str]) -> int:
+    """Run a job in a forked child as runner.py would, a run date range runs its dates in order.
+
+    Args:
+        argv: runner.py command line arguments.
+
+    Returns:
+        The exit code.
+    """
+    import runner
+
+    args = runner.parse_args(argv)
+    if args.batch:
+        print("Batch manifests run in their own runner, not on the fork server.", file=sys.stderr)
+        return 2
+    loaded_version = get_micap_importer().loader.code_version
+    if args.codeVersion and args.codeVersion != loaded_version:
+        print(
+            f"Fork server serves codebase release {loaded_version or 'current'}, not {args.codeVersion}. "
+            "Run the job without the fork server or restart the server pinned to that release.",
+            file=sys.stderr,
+        )
+        return 2
+    if args.importProfile:
+        import_profiler.enable(args.importProfile)
+    if args.dag:
+        return runner.run_dag(args)
+    for run_date in expand_run_dates(args.runDate):
+        args.runDate = run_date
+        runner.main(args)
+    return 0
+
+
+def exit_code_from_status(status: int) -> int:
+    """Return a shell-style exit code for a wait status, ``128 + signal`` if the child was killed."""
+    code = os.waitstatus_to_exitcode(status)
+    return 128 - code if code < 0 else code
+
+
+def _reopen_stdio() -> None:
+    # Rebind the Python streams to the client's descriptors, line buffered for terminals as at startup
+    unbuffered = bool(os.environ.get("PYTHONUNBUFFERED"))
+    sys.stdin = open(0, closefd=False)  # noqa: SIM115
+    sys.stdout = open(1, "w", buffering=1 if unbuffered or os.isatty(1) else -1, closefd=False)  # noqa: SIM115
+    sys.stderr = open(2, "w", buffering=1, closefd=False)  # noqa: SIM115
+
+
+def run_forked_job(
+    execute: Callable[[list[str]], int],
+    argv: list[str],
+    stdio: list[int],
+    env: dict[str, str] | None = None,
+    inherited: Iterable = (),
+) -> NoReturn:
+    """Run a job in a freshly forked child and exit with its code, never returns.
+
+    Args:
+        execute: Runs the job from its argv and returns the exit code.
+        argv: runner.py command line arguments.
+        stdio: Descriptors to use as stdin, stdout and stderr, closed once adopted.
+        env: Environment variables to set for the job.
+        inherited: Sockets, selectors or files of the parent to close first.
+    """
+    code = 1
+    try:
+        for resource in inherited:
+            resource.close()
+        for target, fd in enumerate(stdio):
+            os.dup2(fd, target)
+        for fd in set(stdio) - {0, 1, 2}:
+            os.close(fd)
+        _reopen_stdio()
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        # Exit handlers registered by the parent belong to its resources, the job registers its own
+        atexit._clear()
+        os.environ.update(env or {})
+        sys.argv = ["runner.py", *argv]
+        code = execute(argv)
+    except SystemExit as e:
+        if isinstance(e.code, int) or e.code is None:
+            code = e.code or 0
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        with contextlib.suppress(BaseException):
+            atexit._run_exitfuncs()
+            logging.shutdown()
+            sys.stdout.flush()
+            sys.stderr.flush()
+        os._exit(code)
+
+
+class _Job:
+    """A running child and the client connection waiting for it."""
+
+    def __init__(self, pid: int, conn: socket.socket) -> None:
+        self.pid = pid
+        self.conn = conn
+
+
+class ForkServer:
+    """Accepts job requests on a Unix socket and runs each in a forked child."""
+
+    def __init__(self, socket_path: str, execute: Callable[[list[str]], int] = run_job) -> None:
+        """Initialize the server, call ``bind`` then ``serve_forever``.
+
+        Args:
+            socket_path: Path of the Unix socket to listen on.
+            execute: Runs a job in the child from its argv and returns the exit code.
+        """
+        self.socket_path = socket_path
+        self.execute = execute
+        self.listener: socket.socket | None = None
+        self.selector = selectors.DefaultSelector()
+        self.jobs: dict[int, _Job] = {}
+        self.jobs_started = 0
+        self._stopping = threading.Event()
+
+    def bind(self) -> None:
+        """Listen on the socket path, replacing a stale socket left by a previous server."""
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.socket_path)
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        self.listener.listen(64)
+        self.selector.register(self.listener, selectors.EVENT_READ)
+        logger.info(f"Fork server listening on {self.socket_path}")
+
+    def stop(self) -> None:
+        """Ask ``serve_forever`` to return, running children are left to finish."""
+        self._stopping.set()
+
+    def serve_forever(self) -> None:
+        """Accept requests until ``stop`` is called."""
+        try:
+            while not self._stopping.is_set():
+                # Poll for finished children while any run, signal handlers are unavailable off the main thread
+                timeout = _reap_interval_seconds if self.jobs else 0.5
+                for key, _ in self.selector.select(timeout):
+                    if key.fileobj is self.listener:
+                        self.accept()
+                    else:
+                        self.handle_message(key.data)
+                self.reap()
+        finally:
+            self.selector.close()
+            self.listener.close()
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.socket_path)
+
+    def accept(self) -> None:
+        """Read a job request from a new connection and fork its child."""
+        conn, _ = self.listener.accept()
+        fds: list[int] = []
+        try:
+            conn.settimeout(5.0)
+            data, fds, _, _ = socket.recv_fds(conn, _max_request_bytes, 3)
+            while data and not data.endswith(b"\n") and len(data) < _max_request_bytes:
+                chunk = conn.recv(_max_request_bytes)
+                if not chunk:
+                    break
+                data += chunk
+            request = json.loads(data)
+            if len(fds) != 3:
+                raise ValueError(f"Expected stdin, stdout and stderr descriptors, received {len(fds)}")
+            conn.settimeout(None)
+            pid = self.fork(request, fds, conn)
+        except Exception as e:
+            logger.warning(f"Rejected fork server request: {e}")
+            with contextlib.suppress(OSError):
+                self._send(conn, {"error": str(e)})
+            conn.close()
+            return
+        finally:
+            for fd in fds:
+                os.close(fd)
+
+        self.jobs[pid] = _Job(pid, conn)
+        self.jobs_started += 1
+        self.selector.register(conn, selectors.EVENT_READ, pid)
+        with contextlib.suppress(OSError):
+            self._send(conn, {"pid": pid})
+        logger.info(f"Started job {request.get('argv')} as pid {pid}")
+
+    def fork(self, request: dict, fds: list[int], conn: socket.socket) -> int:
+        """Fork a child running the request, return its pid in the parent."""
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            self._run_child(request, fds, conn)
+        return pid
+
+    def _run_child(self, request: dict, fds: list[int], conn: socket.socket) -> NoReturn:
+        # The child must not hold the server's sockets, or clients would wait on it
+        inherited = [self.listener, conn, self.selector, *(job.conn for job in self.jobs.values())]
+        run_forked_job(self.execute, list(request.get("argv") or []), fds, request.get("env"), inherited)
+
+    def handle_message(self, pid: int) -> None:
+        """Forward a client's signal to its child, or terminate the child if the client went away."""
+        job = self.jobs.get(pid)
+        if job is None:
+            return
+        try:
+            data = job.conn.recv(4096)
+        except OSError:
+            data = b""
+        if not data:
+            self.selector.unregister(job.conn)
+            with contextlib.suppress(ProcessLookupError):
+                os.kill(pid, signal.SIGTERM)
+            return
+        for line in data.splitlines():
+            with contextlib.suppress(ValueError, ProcessLookupError):
+                os.kill(pid, int(json.loads(line)["signal"]))
+
+    def reap(self) -> None:
+        """Report the exit codes of finished children to their clients."""
+        while self.jobs:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            job = self.jobs.pop(pid, None)
+            if job is None:
+                continue
+            code = exit_code_from_status(status)
+            logger.info(f"Job pid {pid} exited with {code}")
+            with contextlib.suppress(KeyError, ValueError):
+                self.selector.unregister(job.conn)
+            with contextlib.suppress(OSError):
+                self._send(job.conn, {"exit_code": code})
+            job.conn.close()
+
+    @staticmethod
+    def _send(conn: socket.socket, message: dict) -> None:
+        conn.sendall(json.dumps(message).encode() + b"\n")
+
+
+def submit(
+    argv: list[str],
+    socket_path: str | None = None,
+    env: dict[str, str] | None = None,
+    stdio: tuple[int, int, int] = (0, 1, 2),
+) -> int:
+    """Run a job on the fork server and wait for it.
+
+    SIGINT and SIGTERM received while waiting are forwarded to the job.
+
+    Args:
+        argv: runner.py command line arguments.
+        socket_path: Server socket, defaults to MICAP_FORK_SERVER_SOCKET.
+        env: Environment variables for the job, defaults to this process's MICAP_* variables.
+        stdio: Descriptors the job uses as stdin, stdout and stderr.
+
+    Returns:
+        The job's exit code.
+
+    Raises:
+        ConnectionError: If the server is unreachable or went away before the job ended.
+        RuntimeError: If the server rejected the request.
+    """
+    if env is None:
+        env = {key: value for key, value in os.environ.items() if key.startswith(FORWARDED_ENV_PREFIX)}
+    request = json.dumps({"argv": argv, "env": env}).encode() + b"\n"
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.connect(socket_path or socket_path_from_environment())
+        socket.send_fds(conn, [request], list(stdio))
+
+        def forward(signum: int, frame: object) -> None:
+            conn.sendall(json.dumps({"signal": signum}).encode() + b"\n")
+
+        handlers = {}
+        if threading.current_thread() is threading.main_thread():
+            handlers = {signum: signal.signal(signum, forward) for signum in (signal.SIGINT, signal.SIGTERM)}
+        try:
+            with conn.makefile("r") as replies:
+                for line in replies:
+                    message = json.loads(line)
+                    if "exit_code" in message:
+                        return message["exit_code"]
+                    if "error" in message:
+                        raise RuntimeError(f"Fork server rejected the job: {message['error']}")
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+    raise ConnectionError("Fork server closed the connection before the job finished")
+
+
+def main() -> None:
+    """Serve jobs, or submit one to a running server."""
+    parser = argparse.ArgumentParser(description="Pre-warmed fork server for runner jobs")
+    parser.add_argument("--socket", default=socket_path_from_environment(), help="Unix socket path")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="Warm up and serve job requests")
+    serve.add_argument(
+        "--preload",
+        nargs="*",
+        default=os.environ.get(PRELOAD_ENV, ",".join(DEFAULT_PRELOAD_MODULES)).split(","),
+        help=f"Modules to import before serving, defaults to {PRELOAD_ENV}",
+    )
+    run = commands.add_parser("run", help="Run a job on the server, arguments as for runner.py")
+    run.add_argument("argv", nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    if args.command == "run":
+        argv = args.argv[1:] if args.argv[:1] == ["--"] else args.argv
+        try:
+            sys.exit(submit(argv, args.socket))
+        except (ConnectionError, FileNotFoundError, RuntimeError) as e:
+            sys.exit(f"Fork server unavailable: {e}")
+
+    logging.basicConfig(level=logging.INFO)
+    loaded = warm_up([name for name in args.preload if name])
+    logger.info(f"Fork server preloaded {loaded}")
+    server = ForkServer(args.socket)
+    server.bind()
+    signal.signal(signal.SIGTERM, lambda signum, frame: server.stop())
+    with contextlib.suppress(KeyboardInterrupt):
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
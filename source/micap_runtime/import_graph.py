@@ -0,0 +1,132 @@
+"""Static import graph of codebase modules.
+
+The release step records, for each module, the absolute names its source may
+import. The importer uses those lists to compute a job's transitive dependency
+closure and fetch it in bulk before executing anything, instead of discovering
+imports one round trip at a time.
+"""
+
+__author__ = "David Dawson"
+__copyright__ = "Copyright 2025, David Dawson"
+__credits__ = ["David Dawson"]
+__license__ = "GPL"
+__version__ = "1.0.1"
+__maintainer__ = "Dave Dawson"
+__email__ = "davedawson.co@gmail.com"
+__status__ = "Production"
+
+import ast
+from collections.abc import Container, Iterable, Mapping
+
+
+def static_imports(source: str, module_name: str, is_package: bool = False) -> list[str]:
+    """Return the absolute names a module may import, found statically with ast.
+
+    ``from a.b import c`` yields both ``a.b`` and ``a.b.c`` since ``c`` may be a
+    submodule; callers filter the candidates against the names that exist.
+    Relative imports are resolved against the module's package.
+
+    Args:
+        source: Python source of the module.
+        module_name: Full dotted name of the module.
+        is_package: True if the source is a package ``__init__``.
+
+    Returns:
+        Sorted candidate module names, empty if the source does not parse.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return []
+
+    package = module_name if is_package else module_name.rpartition(".")[0]
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                parts = package.split(".") if package else []
+                if node.level - 1 > len(parts):
+                    continue  # Relative import beyond the top level package
+                base_parts = parts[: len(parts) - (node.level - 1)]
+                if node.module:
+                    base_parts.append(node.module)
+                base = ".".join(base_parts)
+            else:
+                base = node.module
+            if not base:
+                continue
+            names.add(base)
+            names.update(f"{base}.{alias.name}" for alias in node.names if alias.name != "*")
+    return sorted(names)
+
+
+def dependency_closure(roots: Iterable[str], imports: Mapping[str, Iterable[str]], known: Container[str]) -> list[str]:
+    """Return the transitive closure of modules reachable from the roots.
+
+    Importing a module also imports its parent packages, so every ancestor of a
+    reached module is part of the closure too.
+
+    Args:
+        roots: Module names to start from.
+        imports: Static import candidates per module name.
+        known: Names that exist in the codebase, other candidates are ignored.
+
+    Returns:
+        Names in the closure, in discovery order.
+    """
+    closure = {}
+    pending = list(roots)
+    while pending:
+        name = pending.pop()
+        while name and name not in closure and name in known:
+            closure[name] = None
+            pending.extend(imports.get(name, ()))
+            name = name.rpartition(".")[0]
+    return list(closure)
+
+
+def reload_order(changed: Iterable[str], imports: Mapping[str, Iterable[str]], loaded: Container[str]) -> list[str]:
+    """Return the loaded modules to re-execute after a change, dependencies before dependents.
+
+    A module must be re-executed if it changed or if it imports, directly or
+    transitively, a module that did. Modules that are not loaded are skipped.
+    Import cycles are broken at the first module visited.
+
+    Args:
+        changed: Names of modules whose source changed.
+        imports: Codebase modules each module imports.
+        loaded: Names of the modules currently imported.
+
+    Returns:
+        Names to re-execute, in order.
+    """
+    dependents = {}
+    for name, deps in imports.items():
+        for dep in deps:
+            dependents.setdefault(dep, set()).add(name)
+
+    affected = set()
+    pending = list(changed)
+    while pending:
+        name = pending.pop()
+        if name in affected or name not in loaded:
+            continue
+        affected.add(name)
+        pending.extend(dependents.get(name, ()))
+
+    order = []
+    visited = set()
+
+    def visit(name: str) -> None:
+        visited.add(name)
+        for dep in sorted(imports.get(name, ())):
+            if dep in affected and dep not in visited:
+                visit(dep)
+        order.append(name)
+
+    for name in sorted(affected):
+        if name not in visited:
+            visit(name)
+    return order
@@ -0,0 +1,183 @@
+"""Import-time profiler for Mongo-sourced modules.
+
+``python -X importtime`` cannot see inside ``MongoDBModuleLoader``: it reports a
+single opaque figure per module. The profiler records, for every module loaded
+from Mongo, the spec lookup latency, bytes fetched, fetch, compile and exec time,
+and the cumulative time including the modules it imported, then renders an
+``importtime``-style tree and writes a JSON artifact.
+
+Enable it with ``--importProfile=<path>`` on the runner or the
+MICAP_IMPORT_PROFILE environment variable.
+"""
+
+__author__ = "David Dawson"
+__copyright__ = "Copyright 2025, David Dawson"
+__credits__ = ["David Dawson"]
+__license__ = "GPL"
+__version__ = "1.0.1"
+__maintainer__ = "Dave Dawson"
+__email__ = "davedawson.co@gmail.com"
+__status__ = "Production"
+
+import atexit
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ENV = "MICAP_IMPORT_PROFILE"
+
+
+@dataclass
+class ModuleRecord:
+    """Timings of one module loaded through the Mongo importer, in milliseconds.
+
+    ``exec_ms`` and ``cumulative_ms`` include the modules imported while executing,
+    ``children_ms`` is their share and ``self_ms`` the remainder.
+    """
+
+    name: str
+    lookup_ms: float = 0.0
+    bytes: int = 0
+    fetch_ms: float = 0.0
+    compile_ms: float = 0.0
+    exec_ms: float = 0.0
+    self_ms: float = 0.0
+    cumulative_ms: float = 0.0
+    children_ms: float = 0.0
+    parent: str | None = None
+    children: list[str] = field(default_factory=list)
+    started: float = field(default=0.0, repr=False)
+
+
+class ImportProfiler:
+    """Collects per-module import timings as a tree."""
+
+    def __init__(self) -> None:
+        """Initialize an empty profile."""
+        self.records: dict[str, ModuleRecord] = {}
+        self.roots: list[str] = []
+        self.miss_count = 0
+        self.miss_ms = 0.0
+        self._local = threading.local()
+
+    def _stack(self) -> list[str]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _record(self, fullname: str) -> ModuleRecord:
+        record = self.records.get(fullname)
+        if record is None:
+            record = self.records[fullname] = ModuleRecord(fullname)
+        return record
+
+    def record_lookup(self, fullname: str, seconds: float, found: bool) -> None:
+        """Record the latency of a find_spec call."""
+        if found:
+            self._record(fullname).lookup_ms += seconds * 1000
+        else:
+            self.miss_count += 1
+            self.miss_ms += seconds * 1000
+
+    def begin(self, fullname: str) -> None:
+        """Mark the start of a module's exec_module, nested under the module being executed."""
+        record = self._record(fullname)
+        stack = self._stack()
+        record.parent = stack[-1] if stack else None
+        if record.parent is None:
+            self.roots.append(fullname)
+        else:
+            self.records[record.parent].children.append(fullname)
+        stack.append(fullname)
+        record.started = time.perf_counter()
+
+    def add(self, fullname: str, **values: float) -> None:
+        """Add measured values, e.g. ``fetch_ms`` or ``bytes``, to a module's record."""
+        record = self._record(fullname)
+        for name, value in values.items():
+            setattr(record, name, getattr(record, name) + value)
+
+    def end(self, fullname: str) -> None:
+        """Mark the end of a module's exec_module and derive its cumulative and self times."""
+        record = self.records[fullname]
+        stack = self._stack()
+        if stack and stack[-1] == fullname:
+            stack.pop()
+        record.cumulative_ms = (time.perf_counter() - record.started) * 1000 + record.lookup_ms
+        record.children_ms = sum(self.records[child].cumulative_ms for child in record.children)
+        record.self_ms = max(record.cumulative_ms - record.children_ms, 0.0)
+
+    def report(self) -> str:
+        """Render the profile as an ``importtime``-style tree, children before their parent."""
+        lines = ["import time:  self [us] | cumulative |    bytes | lookup | fetch | compile |  exec | imported package"]
+
+        def visit(name: str, depth: int) -> None:
+            record = self.records[name]
+            for child in record.children:
+                visit(child, depth + 1)
+            lines.append(
+                f"import time: {record.self_ms * 1000:10.0f} | {record.cumulative_ms * 1000:10.0f} | {record.bytes:8d} | "
+                f"{record.lookup_ms:6.1f} | {record.fetch_ms:5.1f} | {record.compile_ms:7.1f} | {record.exec_ms:5.1f} | "
+                f"{'  ' * depth}{name}"
+            )
+
+        for root in self.roots:
+            visit(root, 0)
+        lines.append(f"import time: {self.miss_count} lookups for names not in the codebase took {self.miss_ms:.1f} ms")
+        return "\n".join(lines)
+
+    def to_dict(self) -> dict:
+        """Return the profile as JSON-serialisable data."""
+        modules = []
+        for record in self.records.values():
+            data = asdict(record)
+            data.pop("started")
+            modules.append(data)
+        return {
+            "roots": list(self.roots),
+            "total_ms": sum(self.records[root].cumulative_ms for root in self.roots),
+            "bytes": sum(record.bytes for record in self.records.values()),
+            "misses": {"count": self.miss_count, "ms": self.miss_ms},
+            "modules": modules,
+        }
+
+    def write(self, path: str) -> None:
+        """Write the JSON artifact to ``path`` and the tree report next to it with a ``.txt`` suffix."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        with open(os.path.splitext(path)[0] + ".txt", "w") as f:
+            f.write(self.report() + "\n")
+        logger.info(f"Wrote import profile of {len(self.records)} modules to {path}")
+
+
+active_profiler: ImportProfiler | None = None
+
+
+def enable(path: str | None = None) -> ImportProfiler:
+    """Start profiling Mongo imports, writing the profile to ``path`` at interpreter exit.
+
+    Args:
+        path: Destination of the JSON artifact, defaults to MICAP_IMPORT_PROFILE.
+
+    Returns:
+        The active profiler.
+    """
+    global active_profiler
+    if active_profiler is None:
+        active_profiler = ImportProfiler()
+        path = path or os.environ.get(PROFILE_ENV)
+        atexit.register(_write_at_exit, active_profiler, path)
+    return active_profiler
+
+
+def _write_at_exit(profiler: ImportProfiler, path: str | None) -> None:
+    print(profiler.report(), file=sys.stderr)
+    if path:
+        profiler.write(path)
@@ -0,0 +1,210 @@
+"""CPU and memory profiling of a job's ``main``.
+
+``--profile=cpu|mem|both`` on the runner wraps the job's ``main`` in a profiler
+and writes its artifacts, named ``<job>_<runDate>_<timestamp>.<suffix>``:
+
+* ``cpu``: ``.pstats``, a cProfile dump for ``pstats`` or snakeviz, and
+  ``.collapsed``, stacks of the job's thread sampled every few milliseconds in
+  the collapsed format of flamegraph.pl and speedscope.
+* ``mem``: ``.alloc.txt``, the peak traced memory and the top allocation sites
+  from tracemalloc, with the tracebacks of the largest.
+
+Artifacts are written to MICAP_PROFILE_DIR (``--profileDir``), a mounted volume in
+the runtime container, or to the ``job_profiles`` GridFS bucket when no directory
+is set.
+"""
+
+__author__ = "David Dawson"
+__copyright__ = "Copyright 2025, David Dawson"
+__credits__ = ["David Dawson"]
+__license__ = "GPL"
+__version__ = "1.0.1"
+__maintainer__ = "Dave Dawson"
+__email__ = "davedawson.co@gmail.com"
+__status__ = "Production"
+
+import cProfile
+import datetime
+import io
+import logging
+import marshal
+import os
+import pstats
+import re
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from types import FrameType
+
+import gridfs
+
+try:
+    from .dynamic_import_lib import get_micap_importer
+except ImportError:
+    from dynamic_import_lib import get_micap_importer
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR_ENV = "MICAP_PROFILE_DIR"
+MODES = ("cpu", "mem", "both")
+
+_profile_bucket = "job_profiles"
+_sample_interval_seconds = 0.005
+_traceback_frames = 25
+_top_allocations = 30
+_top_tracebacks = 5
+
+
+class StackSampler:
+    """Samples the stack of one thread on a background thread and counts collapsed stacks."""
+
+    def __init__(self, thread_id: int, interval: float = _sample_interval_seconds) -> None:
+        """Initialize the sampler.
+
+        Args:
+            thread_id: Identifier of the thread to sample, from ``threading.get_ident``.
+            interval: Seconds between samples.
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="micap-stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        """Start sampling."""
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the sampler thread."""
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self.collapse(frame)] += 1
+
+    @staticmethod
+    def collapse(frame: FrameType) -> str:
+        """Return a stack as ``outermost;...;innermost`` with one ``function (file:line)`` per frame."""
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def collapsed(self) -> str:
+        """Return the samples in collapsed format, one ``stack count`` line per distinct stack."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def allocation_report(snapshot: tracemalloc.Snapshot, peak_bytes: int) -> str:
+    """Render the peak and the top allocation sites of a tracemalloc snapshot."""
+    snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+    by_line = snapshot.statistics("lineno")
+    lines = [
+        f"Peak traced memory: {peak_bytes / 1024 / 1024:.1f} MiB",
+        f"Allocated at exit: {sum(stat.size for stat in by_line) / 1024 / 1024:.1f} MiB in {len(by_line)} sites",
+        "",
+        f"Top {_top_allocations} allocation sites:",
+    ]
+    for stat in by_line[:_top_allocations]:
+        frame = stat.traceback[0]
+        lines.append(f"{stat.size / 1024:12.1f} KiB {stat.count:9d} blocks  {frame.filename}:{frame.lineno}")
+    for stat in snapshot.statistics("traceback")[:_top_tracebacks]:
+        lines.extend(["", f"{stat.size / 1024:.1f} KiB in {stat.count} blocks allocated at:"])
+        lines.extend(stat.traceback.format())
+    return "\n".join(lines) + "\n"
+
+
+class JobProfiler:
+    """Profiles a job's ``main`` with cProfile, a stack sampler and tracemalloc."""
+
+    def __init__(self, mode: str, job_module: str, run_date: str | None, output_dir: str | None = None) -> None:
+        """Initialize the profiler.
+
+        Args:
+            mode: ``cpu``, ``mem`` or ``both``.
+            job_module: Profiled job, names the artifacts.
+            run_date: Run date of the job, names the artifacts.
+            output_dir: Directory to write artifacts to, GridFS is used if None.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode {mode!r}, expected one of {', '.join(MODES)}")
+        self.mode = mode
+        self.job_module = job_module
+        self.run_date = run_date
+        self.output_dir = output_dir
+        self.cpu = mode in ("cpu", "both")
+        self.mem = mode in ("mem", "both")
+        self.profile: cProfile.Profile | None = None
+        self.sampler: StackSampler | None = None
+        self.artifacts: dict[str, bytes] = {}
+
+    def __enter__(self) -> "JobProfiler":
+        """Start the CPU and memory profilers of the selected mode."""
+        if self.mem:
+            tracemalloc.start(_traceback_frames)
+        if self.cpu:
+            self.sampler = StackSampler(threading.get_ident())
+            self.sampler.start()
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Stop the profilers, log the CPU profile and save the artifacts."""
+        if self.cpu:
+            self.profile.disable()
+            self.sampler.stop()
+            stream = io.StringIO()
+            pstats.Stats(self.profile, stream=stream).sort_stats("cumulative").print_stats(30)
+            logger.info(f"CPU profile of {self.job_module}:\n{stream.getvalue()}")
+            self.artifacts["pstats"] = self._pstats_bytes()
+            self.artifacts["collapsed"] = self.sampler.collapsed().encode()
+        if self.mem:
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self.artifacts["alloc.txt"] = allocation_report(snapshot, peak).encode()
+        try:
+            self.save()
+        except Exception as e:
+            logger.warning(f"Could not save the profile of {self.job_module}: {e}")
+
+    def _pstats_bytes(self) -> bytes:
+        # The format of Profile.dump_stats, loadable with pstats.Stats(path)
+        self.profile.create_stats()
+        return marshal.dumps(self.profile.stats)
+
+    def base_name(self) -> str:
+        """Return the artifact name without suffix."""
+        stamp = datetime.datetime.now(datetime.UTC).strftime("%Y%m%dT%H%M%S")
+        return re.sub(r"[^\w.-]", "_", f"{self.job_module}_{self.run_date}_{stamp}")
+
+    def save(self) -> list[str]:
+        """Write the artifacts to the output directory, or to GridFS, and return where they went."""
+        base = self.base_name()
+        locations = []
+        if self.output_dir:
+            os.makedirs(self.output_dir, exist_ok=True)
+            for suffix, data in self.artifacts.items():
+                path = os.path.join(self.output_dir, f"{base}.{suffix}")
+                with open(path, "wb") as f:
+                    f.write(data)
+                locations.append(path)
+        else:
+            importer = get_micap_importer()
+            if importer is None:
+                raise RuntimeError(f"Set {PROFILE_DIR_ENV} to write profiles without a Mongo importer")
+            bucket = gridfs.GridFSBucket(importer.loader.db, bucket_name=_profile_bucket)
+            for suffix, data in self.artifacts.items():
+                metadata = {"job_module": self.job_module, "run_date": self.run_date, "kind": suffix}
+                bucket.upload_from_stream(f"{base}.{suffix}", data, metadata=metadata)
+                locations.append(f"gridfs://{_profile_bucket}/{base}.{suffix}")
+        logger.info(f"Wrote {self.mode} profile of {self.job_module} to {', '.join(locations)}")
+        return locations
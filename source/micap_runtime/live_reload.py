@@ -0,0 +1,237 @@
+"""Live mirror and hot reload of Mongo-loaded modules for long-lived processes.
+
+Jupyter kernels and other long-lived interpreters keep the module objects they
+imported from Mongo, so a release only reaches them after a restart that pays the
+full import cost again. ``CodebaseWatcher`` follows the codebase collection's change
+stream on a background thread, keeps the loader's manifest and sources current, and
+re-executes only the changed modules and the loaded modules that import them, in
+dependency order taken from the loader's import graph.
+
+Re-executing modules is left to the main thread: in IPython it happens before each
+cell runs, elsewhere ``apply_pending`` can be called explicitly or the watcher can be
+told to apply changes as they arrive.
+"""
+
+__author__ = "David Dawson"
+__copyright__ = "Copyright 2025, David Dawson"
+__credits__ = ["David Dawson"]
+__license__ = "GPL"
+__version__ = "1.0.1"
+__maintainer__ = "Dave Dawson"
+__email__ = "davedawson.co@gmail.com"
+__status__ = "Production"
+
+import logging
+import os
+import sys
+import threading
+import time
+
+import pymongo
+
+try:
+    from .dynamic_import_lib import MongoDBModuleLoader, get_micap_importer
+    from .import_graph import reload_order
+except ImportError:
+    from dynamic_import_lib import MongoDBModuleLoader, get_micap_importer
+    from import_graph import reload_order
+
+try:
+    from IPython import get_ipython
+except ImportError:
+    get_ipython = None
+
+logger = logging.getLogger(__name__)
+
+# Changes arriving within this window are applied together, a release touches many modules at once
+_debounce_seconds = float(os.environ.get("MICAP_LIVE_RELOAD_DEBOUNCE_SECONDS", "0.5"))
+_retry_seconds = 5.0
+_upsert_operations = ("insert", "update", "replace")
+
+_watcher: "CodebaseWatcher | None" = None
+
+
+class CodebaseWatcher:
+    """Mirrors codebase changes into a loader and reloads the affected modules."""
+
+    def __init__(
+        self, loader: MongoDBModuleLoader, debounce_seconds: float = _debounce_seconds, auto_apply: bool = False
+    ) -> None:
+        """Initialize a stopped watcher.
+
+        Args:
+            loader: Loader whose manifest and sources are kept current.
+            debounce_seconds: Time to collect changes before applying them together.
+            auto_apply: Reload modules on the watcher thread as soon as changes arrive.
+        """
+        self.loader = loader
+        self.debounce_seconds = debounce_seconds
+        self.auto_apply = auto_apply
+        self.resume_token = None
+        self.pending_reloads: set[str] = set()
+        self.changes_seen = 0
+        self.modules_reloaded = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Start following the change stream on a daemon thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="micap-codebase-watcher", daemon=True)
+        self._thread.start()
+        logger.info("Watching the codebase collection for changes")
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Stop the watcher thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.watch()
+            except pymongo.errors.OperationFailure as e:
+                # Change streams need a replica set, and resuming fails once the oplog has moved on
+                logger.warning(f"Codebase change stream unavailable, live reload disabled: {e}")
+                return
+            except pymongo.errors.PyMongoError as e:
+                logger.warning(f"Codebase change stream interrupted, resuming in {_retry_seconds}s: {e}")
+                self._stop.wait(_retry_seconds)
+
+    def watch(self) -> None:
+        """Follow the change stream until stopped, applying changes in debounced batches."""
+        with self.loader.collection.watch(
+            full_document="updateLookup",
+            resume_after=self.resume_token,
+            max_await_time_ms=int(self.debounce_seconds * 1000),
+        ) as stream:
+            batch = []
+            deadline = 0.0
+            while not self._stop.is_set() and stream.alive:
+                change = stream.try_next()
+                if change is not None:
+                    if not batch:
+                        deadline = time.monotonic() + self.debounce_seconds
+                    batch.append(change)
+                if batch and (change is None or time.monotonic() >= deadline):
+                    self.handle_changes(batch)
+                    batch = []
+                if not batch:
+                    # Only advance past changes once they are applied, so a resume replays the rest
+                    self.resume_token = stream.resume_token
+
+    def handle_changes(self, changes: list[dict]) -> None:
+        """Apply a batch of change events to the loader and queue the affected modules for reload.
+
+        Args:
+            changes: Change stream events on the codebase collection.
+        """
+        upserted = {}
+        deleted = set()
+        for change in changes:
+            operation = change["operationType"]
+            if operation not in _upsert_operations and operation != "delete":
+                # drop, rename or invalidate, start again from a full manifest
+                logger.warning(f"Codebase collection {operation}, reloading the manifest")
+                self.loader.load_manifest()
+                continue
+            name = change["documentKey"]["_id"]
+            document = change.get("fullDocument")
+            if operation == "delete" or document is None:
+                deleted.add(name)
+                upserted.pop(name, None)
+            else:
+                upserted[name] = document
+                deleted.discard(name)
+        self.changes_seen += len(changes)
+
+        added_or_removed = (set(upserted) - self.loader.stored_modules) | deleted
+        self.loader.apply_changes(upserted, deleted)
+
+        changed = set(upserted)
+        for name in added_or_removed:
+            # Synthesized packages list their children, re-execute them when children come and go
+            parent = name.rpartition(".")[0]
+            if parent and parent not in self.loader.stored_modules:
+                changed.add(parent)
+        for name in deleted & sys.modules.keys():
+            logger.warning(f"Module {name} was removed from the codebase but is still imported")
+        logger.info(f"Codebase changed: {len(upserted)} modules updated, {len(deleted)} removed")
+
+        with self._lock:
+            self.pending_reloads |= changed
+        if self.auto_apply:
+            self.apply_pending()
+
+    def loaded_modules(self) -> set[str]:
+        """Return the names of imported modules that were loaded by this watcher's loader."""
+        return {
+            name
+            for name, module in list(sys.modules.items())
+            if getattr(getattr(module, "__spec__", None), "loader", None) is self.loader
+        }
+
+    def apply_pending(self) -> list[str]:
+        """Re-execute changed modules and the loaded modules depending on them.
+
+        Returns:
+            Names of the re-executed modules, in the order they were executed.
+        """
+        with self._lock:
+            changed, self.pending_reloads = self.pending_reloads, set()
+        if not changed:
+            return []
+
+        order = reload_order(changed, self.loader.import_graph(), self.loaded_modules())
+        missing = [name for name in order if name in self.loader.stored_modules and name not in self.loader.prefetched]
+        if missing:
+            self.loader.prefetched.update(self.loader.fetch_sources(missing))
+
+        for name in order:
+            try:
+                self.loader.exec_module(sys.modules[name])
+            except Exception:
+                logger.exception(f"Failed to reload {name}, keeping the partially executed module")
+        self.modules_reloaded += len(order)
+        if order:
+            logger.info(f"Reloaded {len(order)} modules: {', '.join(order)}")
+        return order
+
+    def on_pre_run_cell(self, info: object = None) -> None:
+        """IPython ``pre_run_cell`` callback applying pending reloads before a cell runs."""
+        self.apply_pending()
+
+
+def start_live_reload(auto_apply: bool | None = None) -> CodebaseWatcher | None:
+    """Start mirroring the codebase into the installed Mongo importer.
+
+    Idempotent, later calls return the running watcher. Importers pinned to an
+    immutable release or bundle are not watched.
+
+    Args:
+        auto_apply: Reload on the watcher thread as changes arrive. Defaults to False
+            inside IPython, where reloads run before each cell, and True elsewhere.
+
+    Returns:
+        The watcher, or None if no watchable importer is installed.
+    """
+    global _watcher
+    if _watcher is not None:
+        return _watcher
+
+    importer = get_micap_importer()
+    if importer is None or not getattr(importer.loader, "supports_live_reload", False):
+        logger.info("No mutable Mongo codebase importer installed, live reload not started")
+        return None
+
+    shell = get_ipython() if get_ipython is not None else None
+    watcher = CodebaseWatcher(importer.loader, auto_apply=shell is None if auto_apply is None else auto_apply)
+    if shell is not None:
+        shell.events.register("pre_run_cell", watcher.on_pre_run_cell)
+    watcher.start()
+    _watcher = watcher
+    return watcher
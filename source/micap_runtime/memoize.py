@@ -0,0 +1,302 @@
+"""Result memoization for idempotent jobs.
+
+A job that is a pure function of its code and arguments declares it at module
+level::
+
+    MEMOIZE = True                  # keyed by runDate
+    MEMOIZE = ("runDate", "venue")  # keyed by these runner arguments
+
+The runner then keys the job's output by a hash of the sources of the job module
+and everything it transitively imports from the codebase, and of the key
+arguments. On a hit the stored output is replayed and ``main`` is not called, so
+Airflow retries and re-triggers cost one lookup. A change to any module the job
+imports gives a new key. ``--forceRerun`` runs the job regardless and replaces
+the stored output.
+
+A step of a DAG is also keyed by the results of the steps it runs after, from
+``args.upstream``, so new upstream data gives a new key.
+
+The output is what ``main`` prints to stdout and what it returns. A run whose
+return value, or any upstream result, cannot be pickled is not memoized, since
+it could not be replayed faithfully. Outputs are stored in the ``job_results``
+collection, or in the directory named by MICAP_RESULT_CACHE_DIR.
+"""
+
+__author__ = "David Dawson"
+__copyright__ = "Copyright 2025, David Dawson"
+__credits__ = ["David Dawson"]
+__license__ = "GPL"
+__version__ = "1.0.1"
+__maintainer__ = "Dave Dawson"
+__email__ = "davedawson.co@gmail.com"
+__status__ = "Production"
+
+import argparse
+import contextlib
+import datetime
+import hashlib
+import io
+import json
+import logging
+import os
+import pickle
+import sys
+import tempfile
+import threading
+from collections.abc import Iterator
+from types import ModuleType
+from typing import Protocol
+
+import bson
+import pymongo
+
+try:
+    from .async_jobs import call_job_main
+    from .dynamic_import_lib import get_micap_importer
+except ImportError:
+    from async_jobs import call_job_main
+    from dynamic_import_lib import get_micap_importer
+
+logger = logging.getLogger(__name__)
+
+MEMOIZE_ATTRIBUTE = "MEMOIZE"
+CACHE_DIR_ENV = "MICAP_RESULT_CACHE_DIR"
+DEFAULT_KEY_ARGUMENTS = ("runDate",)
+
+_result_collection_name = "job_results"
+
+
+class ResultStore(Protocol):
+    """Where memoized outputs are kept."""
+
+    def get(self, key: str) -> dict | None:
+        """Return the stored output for a key, or None."""
+
+    def put(self, key: str, record: dict) -> None:
+        """Store the output for a key, replacing any earlier one."""
+
+
+class MongoResultStore:
+    """Memoized outputs in a Mongo collection, shared by every runner."""
+
+    def __init__(self, collection: pymongo.collection.Collection) -> None:
+        """Initialize with the result collection."""
+        self.collection = collection
+
+    def get(self, key: str) -> dict | None:
+        """Return the stored output for a key, or None."""
+        doc = self.collection.find_one({"_id": key})
+        if doc is None:
+            return None
+        result = doc.get("result")
+        return {**doc, "result": pickle.loads(result) if result is not None else None}
+
+    def put(self, key: str, record: dict) -> None:
+        """Store the output for a key, replacing any earlier one."""
+        result = record.get("result")
+        document = {**record, "_id": key, "result": bson.Binary(pickle.dumps(result)) if result is not None else None}
+        self.collection.replace_one({"_id": key}, document, upsert=True)
+
+
+class DirectoryResultStore:
+    """Memoized outputs as pickle files in a local or mounted directory."""
+
+    def __init__(self, directory: str) -> None:
+        """Initialize the store, creating the directory if needed."""
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        """Return the file of a key."""
+        return os.path.join(self.directory, f"{key}.pickle")
+
+    def get(self, key: str) -> dict | None:
+        """Return the stored output for a key, or None."""
+        try:
+            with open(self.path(key), "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, record: dict) -> None:
+        """Store the output for a key through a temporary file and an atomic rename."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(record, f)
+            os.replace(tmp_path, self.path(key))
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+
+
+def result_store_from_environment() -> ResultStore | None:
+    """Return the directory store if MICAP_RESULT_CACHE_DIR is set, else the Mongo store of the installed importer."""
+    directory = os.environ.get(CACHE_DIR_ENV)
+    if directory:
+        return DirectoryResultStore(directory)
+    importer = get_micap_importer()
+    if importer is None:
+        return None
+    return MongoResultStore(importer.loader.db[_result_collection_name])
+
+
+def key_arguments(module: ModuleType) -> tuple[str, ...] | None:
+    """Return the runner arguments a job's output depends on, or None if it is not memoizable."""
+    declared = getattr(module, MEMOIZE_ATTRIBUTE, False)
+    if declared is True:
+        return DEFAULT_KEY_ARGUMENTS
+    if isinstance(declared, (tuple, list)):
+        return tuple(declared)
+    return None
+
+
+def memo_key(job_module: str, code_hash: str, arguments: dict, upstream: dict[str, str] | None = None) -> str:
+    """Return the key of a job's output for its code, key arguments and, for a DAG step, its upstream result hashes."""
+    fields = {"job": job_module, "code": code_hash, "arguments": arguments}
+    if upstream:
+        fields["upstream"] = upstream
+    payload = json.dumps(fields, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def result_hash(result: object) -> str:
+    """Return the sha256 of a result's pickle.
+
+    Raises:
+        Exception: Whatever pickling raises for a result that cannot be pickled.
+    """
+    return hashlib.sha256(pickle.dumps(result)).hexdigest()
+
+
+class _ThreadTee(io.TextIOBase):
+    """Stdout that copies what a thread writes to that thread's captures.
+
+    Jobs of a DAG run on threads, so a capture must not see the output of the
+    other jobs, nor swap sys.stdout under them.
+    """
+
+    def __init__(self, stream: io.TextIOBase) -> None:
+        self.stream = stream
+        self.local = threading.local()
+        self.users = 0
+
+    def write(self, text: str) -> int:
+        for copy in getattr(self.local, "copies", ()):
+            copy.write(text)
+        return self.stream.write(text)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+
+_tee_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _capture_stdout() -> Iterator[io.StringIO]:
+    """Copy what the calling thread writes to stdout, which still gets it, into a buffer."""
+    with _tee_lock:
+        tee = sys.stdout if isinstance(sys.stdout, _ThreadTee) else _ThreadTee(sys.stdout)
+        sys.stdout = tee
+        tee.users += 1
+    copy = io.StringIO()
+    copies = getattr(tee.local, "copies", [])
+    tee.local.copies = [*copies, copy]
+    try:
+        yield copy
+    finally:
+        tee.local.copies = copies
+        with _tee_lock:
+            tee.users -= 1
+            if tee.users == 0 and sys.stdout is tee:
+                sys.stdout = tee.stream
+
+
+def run_memoized(
+    module: ModuleType,
+    args: argparse.Namespace,
+    store: ResultStore,
+    code_hash: str,
+    force: bool = False,
+) -> object:
+    """Replay a job's stored output, or run it and store its output.
+
+    Args:
+        module: Imported job module declaring MEMOIZE.
+        args: Runner arguments passed to ``main``.
+        store: Where outputs are kept.
+        code_hash: Hash of the sources of the job and everything it imports.
+        force: Run the job even if an output is stored.
+
+    Returns:
+        What ``main`` returned, or the stored return value on a hit.
+    """
+    job_module = module.__name__
+    arguments = {name: getattr(args, name, None) for name in key_arguments(module) or DEFAULT_KEY_ARGUMENTS}
+    try:
+        upstream = {name: result_hash(result) for name, result in (getattr(args, "upstream", None) or {}).items()}
+    except Exception as e:
+        logger.info(f"An upstream result of {job_module} cannot be pickled, running it without memoization: {e}")
+        return call_job_main(module, args)
+    key = memo_key(job_module, code_hash, arguments, upstream)
+
+    if not force:
+        try:
+            record = store.get(key)
+        except (pymongo.errors.PyMongoError, OSError, pickle.UnpicklingError) as e:
+            logger.warning(f"Could not read memoized output of {job_module}, running it: {e}")
+            record = None
+        if record is not None:
+            logger.info(f"Memoized output of {job_module} for {arguments} from {record.get('created_at')}, skipping the run")
+            sys.stdout.write(record.get("stdout", ""))
+            return record.get("result")
+
+    with _capture_stdout() as stdout:
+        result = call_job_main(module, args)
+
+    try:
+        pickle.dumps(result)
+    except Exception as e:
+        # Replaying the output without the return value would hand None to downstream steps
+        logger.info(f"Return value of {job_module} cannot be pickled, not memoizing it: {e}")
+        return result
+    record = {
+        "job_module": job_module,
+        "arguments": arguments,
+        "code_hash": code_hash,
+        "upstream": upstream,
+        "stdout": stdout.getvalue(),
+        "result": result,
+        "created_at": datetime.datetime.now(datetime.UTC),
+    }
+    try:
+        store.put(key, record)
+    except (pymongo.errors.PyMongoError, OSError) as e:
+        logger.warning(f"Could not store the output of {job_module}: {e}")
+    return result
+
+
+def call_main(module: ModuleType, args: argparse.Namespace, force: bool = False) -> object:
+    """Call a job's ``main``, through the result store if the job declares MEMOIZE.
+
+    An ``async def main`` runs on a managed event loop, see async_jobs.py. Jobs
+    not loaded from the Mongo codebase have no code hash and always run.
+
+    Args:
+        module: Imported job module.
+        args: Runner arguments passed to ``main``.
+        force: Run a memoizable job even if an output is stored.
+
+    Returns:
+        What ``main`` returned, or the stored return value on a hit.
+    """
+    if key_arguments(module) is None:
+        return call_job_main(module, args)
+    importer = get_micap_importer()
+    store = result_store_from_environment()
+    if importer is None or store is None or module.__name__ not in importer.loader.stored_modules:
+        logger.info(f"{module.__name__} declares {MEMOIZE_ATTRIBUTE} but is not loaded from the codebase, running it")
+        return call_job_main(module, args)
+    return run_memoized(module, args, store, importer.loader.code_hash(module.__name__), force)
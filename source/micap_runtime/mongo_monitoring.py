@@ -0,0 +1,134 @@
+"""Latency and connection pool statistics for the importer's Mongo client.
+
+The listeners are registered on the client when it is created and aggregate
+per-command round trips and latencies plus connection pool activity, so job
+startup costs can be attributed to Mongo.
+"""
+
+__author__ = "David Dawson"
+__copyright__ = "Copyright 2025, David Dawson"
+__credits__ = ["David Dawson"]
+__license__ = "GPL"
+__version__ = "1.0.1"
+__maintainer__ = "Dave Dawson"
+__email__ = "davedawson.co@gmail.com"
+__status__ = "Production"
+
+import threading
+
+from pymongo import monitoring
+
+
+class CommandStats(monitoring.CommandListener):
+    """Counts round trips and aggregates latency per Mongo command."""
+
+    def __init__(self) -> None:
+        """Initialize empty counters."""
+        self._lock = threading.Lock()
+        self.commands: dict[str, dict] = {}
+
+    def _record(self, command_name: str, duration_micros: int, failed: bool) -> None:
+        with self._lock:
+            entry = self.commands.setdefault(command_name, {"count": 0, "failed": 0, "total_ms": 0.0, "max_ms": 0.0})
+            duration_ms = duration_micros / 1000
+            entry["count"] += 1
+            entry["failed"] += failed
+            entry["total_ms"] += duration_ms
+            entry["max_ms"] = max(entry["max_ms"], duration_ms)
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        """Ignore command starts, latency is recorded on completion."""
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        """Record a successful round trip."""
+        self._record(event.command_name, event.duration_micros, failed=False)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        """Record a failed round trip."""
+        self._record(event.command_name, event.duration_micros, failed=True)
+
+    def round_trips(self) -> int:
+        """Return the total number of commands sent."""
+        with self._lock:
+            return sum(entry["count"] for entry in self.commands.values())
+
+    def stats(self) -> dict:
+        """Return totals and the per-command breakdown."""
+        with self._lock:
+            commands = {name: dict(entry) for name, entry in self.commands.items()}
+        count = sum(entry["count"] for entry in commands.values())
+        total_ms = sum(entry["total_ms"] for entry in commands.values())
+        return {
+            "round_trips": count,
+            "failed": sum(entry["failed"] for entry in commands.values()),
+            "total_ms": round(total_ms, 3),
+            "mean_ms": round(total_ms / count, 3) if count else 0.0,
+            "max_ms": max((entry["max_ms"] for entry in commands.values()), default=0.0),
+            "by_command": commands,
+        }
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Counts connection pool events."""
+
+    def __init__(self) -> None:
+        """Initialize empty counters."""
+        self._lock = threading.Lock()
+        self.counters = {
+            "connections_created": 0,
+            "connections_closed": 0,
+            "checked_out": 0,
+            "checked_in": 0,
+            "check_out_failed": 0,
+            "pool_cleared": 0,
+        }
+
+    def _increment(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        """Ignore pool creation."""
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        """Ignore pool readiness."""
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        """Count pools cleared after network errors."""
+        self._increment("pool_cleared")
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        """Ignore pool closing."""
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        """Count new connections."""
+        self._increment("connections_created")
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        """Ignore connection readiness."""
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        """Count closed connections."""
+        self._increment("connections_closed")
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        """Ignore check out attempts, outcomes are counted."""
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        """Count failed check outs."""
+        self._increment("check_out_failed")
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        """Count check outs."""
+        self._increment("checked_out")
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        """Count check ins."""
+        self._increment("checked_in")
+
+    def stats(self) -> dict:
+        """Return the pool counters and the number of connections currently open."""
+        with self._lock:
+            counters = dict(self.counters)
+        counters["open_connections"] = counters["connections_created"] - counters["connections_closed"]
+        return counters
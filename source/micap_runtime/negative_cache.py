@@ -0,0 +1,55 @@
+"""Negative lookup cache for the Mongo importer.
+
+Optional imports probed by third-party libraries (accelerators, backports, platform
+shims) fall through ``sys.meta_path`` into ``MongoDBImporter.find_spec``. The loader's
+manifest lists every name in the codebase, so this module answers those misses with a
+set lookup against it and counts them, no network I/O and no per-name state.
+
+The cache is rebuilt whenever the loader reloads its manifest, which happens when
+the codebase collection's fingerprint changes.
+"""
+
+__author__ = "David Dawson"
+__copyright__ = "Copyright 2025, David Dawson"
+__credits__ = ["David Dawson"]
+__license__ = "GPL"
+__version__ = "1.0.1"
+__maintainer__ = "Dave Dawson"
+__email__ = "davedawson.co@gmail.com"
+__status__ = "Production"
+
+from collections.abc import Collection, Iterable
+
+
+class NegativeLookupCache:
+    """Answers "is this module absent from the codebase" without network I/O."""
+
+    def __init__(self, names: Iterable[str], fingerprint: object = None) -> None:
+        """Build the cache from every name that exists in the codebase.
+
+        Args:
+            names: Module and package names present in the codebase, a manifest dict or set
+                is used as is.
+            fingerprint: Collection fingerprint the names were read at.
+        """
+        self.names: Collection[str] = names if isinstance(names, (dict, set, frozenset)) else frozenset(names)
+        self.fingerprint = fingerprint
+        self.hits = 0
+        self.misses = 0
+
+    def is_known_absent(self, fullname: str) -> bool:
+        """Return True if the name is not in the codebase."""
+        if fullname in self.names:
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+
+    def stats(self) -> dict:
+        """Return the hit and miss counters of the cache."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "names": len(self.names),
+            "fingerprint": self.fingerprint,
+        }
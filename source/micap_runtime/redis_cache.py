@@ -0,0 +1,144 @@
+"""Optional Redis tier for module sources, shared by every runner container.
+
+When the scheduler fans out many tasks at once, each new runner fetches the same
+sources from Mongo. Sources are immutable for a given content hash, so they can be
+served from the Redis instance the compose stack already runs: release_codebase
+writes every released source under its sha256, and the loader reads from Redis
+first and falls back to Mongo only for the hashes Redis does not hold, writing
+those back for the next runner.
+
+The tier is enabled by MICAP_REDIS_URL and needs the ``redis`` package; without
+either the loader goes straight to Mongo. Redis failures are never fatal: a
+circuit breaker stops consulting Redis for a while after a connection error and
+the loader reads from Mongo instead.
+"""
+
+__author__ = "David Dawson"
+__copyright__ = "Copyright 2025, David Dawson"
+__credits__ = ["David Dawson"]
+__license__ = "GPL"
+__version__ = "1.0.1"
+__maintainer__ = "Dave Dawson"
+__email__ = "davedawson.co@gmail.com"
+__status__ = "Production"
+
+import logging
+import os
+from collections.abc import Iterable, Mapping
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+try:
+    from .circuit_breaker import CircuitBreaker, CircuitOpenError
+except ImportError:
+    from circuit_breaker import CircuitBreaker, CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+URL_ENV = "MICAP_REDIS_URL"
+TTL_ENV = "MICAP_REDIS_TTL_SECONDS"
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+KEY_PREFIX = "micap:source:"
+
+_socket_timeout_seconds = 0.25
+_circuit_reset_seconds = 60.0
+
+
+class RedisSourceCache:
+    """Module sources in Redis, keyed by content hash."""
+
+    def __init__(self, client: "redis.Redis", ttl_seconds: int = DEFAULT_TTL_SECONDS) -> None:
+        """Initialize the tier.
+
+        Args:
+            client: Redis client, responses are decoded to str.
+            ttl_seconds: Expiry of written entries, refreshed whenever a release rewrites them.
+        """
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        trip_on = (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError) if redis is not None else (OSError,)
+        self.circuit_breaker = CircuitBreaker(trip_on=trip_on, reset_timeout=_circuit_reset_seconds)
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @classmethod
+    def connect(cls, url: str, ttl_seconds: int = DEFAULT_TTL_SECONDS) -> "RedisSourceCache":
+        """Create a tier for a Redis URL such as ``redis://redis:6379/1``."""
+        if redis is None:
+            raise ImportError("The redis package is required for the Redis source cache")
+        client = redis.Redis.from_url(
+            url, decode_responses=True, socket_timeout=_socket_timeout_seconds, socket_connect_timeout=_socket_timeout_seconds
+        )
+        return cls(client, ttl_seconds)
+
+    @classmethod
+    def from_environment(cls) -> "RedisSourceCache | None":
+        """Build a tier from MICAP_REDIS_URL, or return None if it is unset or redis is not installed."""
+        url = os.environ.get(URL_ENV)
+        if not url:
+            return None
+        if redis is None:
+            logger.warning(f"{URL_ENV} is set but the redis package is not installed, reading sources from Mongo")
+            return None
+        return cls.connect(url, int(os.environ.get(TTL_ENV, DEFAULT_TTL_SECONDS)))
+
+    @staticmethod
+    def key(content_hash: str) -> str:
+        """Return the Redis key of a source."""
+        return KEY_PREFIX + content_hash
+
+    def get_many(self, content_hashes: Iterable[str]) -> dict[str, str]:
+        """Return the sources Redis holds for the given hashes, in one round trip.
+
+        Args:
+            content_hashes: sha256 hex digests of module sources.
+
+        Returns:
+            Sources by content hash, missing hashes are absent. Empty if Redis is unavailable.
+        """
+        content_hashes = list(dict.fromkeys(content_hashes))
+        if not content_hashes:
+            return {}
+        try:
+            values = self.circuit_breaker.call(lambda: self.client.mget([self.key(digest) for digest in content_hashes]))
+        except CircuitOpenError:
+            return {}
+        except Exception as e:
+            self.errors += 1
+            logger.debug(f"Redis source cache read failed, falling back to Mongo: {e}")
+            return {}
+        found = {digest: value for digest, value in zip(content_hashes, values, strict=True) if value is not None}
+        self.hits += len(found)
+        self.misses += len(content_hashes) - len(found)
+        return found
+
+    def set_many(self, sources: Mapping[str, str]) -> None:
+        """Store sources by content hash in one pipelined round trip, ignoring failures.
+
+        Args:
+            sources: Sources by content hash.
+        """
+        if not sources:
+            return
+
+        def write() -> None:
+            pipeline = self.client.pipeline(transaction=False)
+            for digest, source in sources.items():
+                pipeline.set(self.key(digest), source, ex=self.ttl_seconds)
+            pipeline.execute()
+
+        try:
+            self.circuit_breaker.call(write)
+        except CircuitOpenError:
+            return
+        except Exception as e:
+            self.errors += 1
+            logger.debug(f"Redis source cache write failed: {e}")
+
+    def stats(self) -> dict:
+        """Return hit, miss and error counters and the breaker state."""
+        return {"hits": self.hits, "misses": self.misses, "errors": self.errors, "circuit": self.circuit_breaker.stats()}
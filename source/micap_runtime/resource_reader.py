@@ -0,0 +1,173 @@
+"""importlib.resources support for data files released alongside the codebase.
+
+release_codebase stores every non-Python file under the source tree in a GridFS
+bucket, content-addressed by sha256, and records its path in a resource index. The
+Mongo loader returns a ``MongoResourceReader`` for its packages, so
+``importlib.resources.files("lib.ecb")`` works as it does for packages on disk.
+
+Files are opened as GridFS download streams that fetch chunks on demand, so a job
+can stream a large reference file without holding it in memory.
+``importlib.resources.as_file`` copies the stream chunk by chunk to a local file
+that can be memory-mapped. If MICAP_RESOURCE_CACHE_DIR is set, the copy is kept
+there under its content hash and reused; otherwise it is a temporary file.
+"""
+
+__author__ = "David Dawson"
+__copyright__ = "Copyright 2025, David Dawson"
+__credits__ = ["David Dawson"]
+__license__ = "GPL"
+__version__ = "1.0.1"
+__maintainer__ = "Dave Dawson"
+__email__ = "davedawson.co@gmail.com"
+__status__ = "Production"
+
+import contextlib
+import importlib.resources
+import io
+import os
+import pathlib
+import shutil
+import tempfile
+from collections.abc import Iterator
+from importlib.resources.abc import Traversable, TraversableResources
+from typing import IO, Protocol
+
+CACHE_DIR_ENV = "MICAP_RESOURCE_CACHE_DIR"
+
+_COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class ResourceSource(Protocol):
+    """What the reader needs from a loader: the resource index and a way to open a file."""
+
+    def get_resource_index(self) -> tuple[dict[str, dict], dict[str, set[str]]]:
+        """Return resource entries by path and the child names of every directory."""
+
+    def open_resource(self, entry: dict) -> IO[bytes]:
+        """Open a binary stream over a resource entry's content."""
+
+
+class MongoTraversable(Traversable):
+    """A file or directory of released resources, addressed by its path below the source root."""
+
+    def __init__(self, source: ResourceSource, path: str) -> None:
+        """Initialize a traversable.
+
+        Args:
+            source: Loader holding the resource index.
+            path: Slash-separated path below the source root, e.g. ``lib/ecb/data/rates.csv``.
+        """
+        self.source = source
+        self.path = path
+
+    def __repr__(self) -> str:
+        """Return the class name and resource path."""
+        return f"MongoTraversable({self.path!r})"
+
+    @property
+    def name(self) -> str:
+        """Return the last path component."""
+        return self.path.rpartition("/")[2]
+
+    @property
+    def entry(self) -> dict | None:
+        """Return the index entry of the file, or None for directories and missing paths."""
+        return self.source.get_resource_index()[0].get(self.path)
+
+    def is_file(self) -> bool:
+        """Return True if a resource file exists at this path."""
+        return self.entry is not None
+
+    def is_dir(self) -> bool:
+        """Return True if released resources exist below this path."""
+        return self.path in self.source.get_resource_index()[1]
+
+    def iterdir(self) -> Iterator["MongoTraversable"]:
+        """Yield the files and directories directly below this directory."""
+        for child in sorted(self.source.get_resource_index()[1].get(self.path, ())):
+            yield MongoTraversable(self.source, f"{self.path}/{child}")
+
+    def joinpath(self, *descendants: str) -> "MongoTraversable":
+        """Return the traversable at a path relative to this one."""
+        parts = [part for descendant in descendants for part in str(descendant).split("/") if part not in ("", ".")]
+        return MongoTraversable(self.source, "/".join([self.path, *parts]))
+
+    def open(self, mode: str = "r", *args, **kwargs) -> IO:  # noqa: ANN002, ANN003
+        """Open the resource for streaming reads, in text mode unless ``mode`` contains ``b``.
+
+        Raises:
+            FileNotFoundError: If no resource file exists at this path.
+            ValueError: If a write mode is requested, released resources are read only.
+        """
+        if set(mode) - set("rbt"):
+            raise ValueError(f"Released resources are read only, cannot open with mode {mode!r}")
+        entry = self.entry
+        if entry is None:
+            raise FileNotFoundError(f"Resource {self.path} was not released with the codebase")
+        stream = self.source.open_resource(entry)
+        if "b" in mode:
+            return stream
+        return io.TextIOWrapper(stream, *args, **kwargs)
+
+    def read_bytes(self) -> bytes:
+        """Return the whole content of the resource."""
+        with self.open("rb") as stream:
+            return stream.read()
+
+    @contextlib.contextmanager
+    def as_file(self) -> Iterator[pathlib.Path]:
+        """Provide the resource as a local file, copied from the stream chunk by chunk."""
+        entry = self.entry
+        if entry is None:
+            raise FileNotFoundError(f"Resource {self.path} was not released with the codebase")
+
+        cache_dir = os.environ.get(CACHE_DIR_ENV)
+        if cache_dir:
+            suffix = os.path.splitext(self.name)[1]
+            cached = pathlib.Path(cache_dir, f"{entry['content_hash']}{suffix}")
+            if not cached.exists():
+                cached.parent.mkdir(parents=True, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "wb") as f, self.open("rb") as stream:
+                        shutil.copyfileobj(stream, f, _COPY_BUFFER_SIZE)
+                    os.replace(tmp_path, cached)  # Atomic, concurrent runners never see a partial file
+                except BaseException:
+                    with contextlib.suppress(OSError):
+                        os.unlink(tmp_path)
+                    raise
+            yield cached
+            return
+
+        fd, tmp_path = tempfile.mkstemp(suffix=f"-{self.name}")
+        try:
+            with os.fdopen(fd, "wb") as f, self.open("rb") as stream:
+                shutil.copyfileobj(stream, f, _COPY_BUFFER_SIZE)
+            yield pathlib.Path(tmp_path)
+        finally:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+
+
+class MongoResourceReader(TraversableResources):
+    """Resource reader of one package loaded from Mongo."""
+
+    def __init__(self, source: ResourceSource, fullname: str) -> None:
+        """Initialize the reader.
+
+        Args:
+            source: Loader holding the resource index.
+            fullname: Full dotted name of the package.
+        """
+        self.source = source
+        self.fullname = fullname
+
+    def files(self) -> MongoTraversable:
+        """Return the package's directory of resources."""
+        return MongoTraversable(self.source, self.fullname.replace(".", "/"))
+
+
+@importlib.resources.as_file.register
+def _as_file(path: MongoTraversable) -> contextlib.AbstractContextManager[pathlib.Path]:
+    # The default implementation reads the whole resource into memory before writing it out
+    return path.as_file()
@@ -0,0 +1,141 @@
+"""Run date ranges and calendars for ``--runDate``.
+
+``--runDate`` takes a single date as before, or an inclusive range with an
+optional calendar selecting the dates to run::
+
+    2024-03-22                          one run, passed to the job unchanged
+    2020-01-01:2024-12-31               every day
+    2020-01-01:2024-12-31:weekdays      Monday to Friday
+    2020-01-01:2024-12-31:target        TARGET2 business days, when the ECB publishes FX rates
+    2020-01-01:2024-12-31:month_end     the last day of each month
+
+A range is split into partitions of consecutive run dates. Each partition is
+itself written as a range, e.g. ``2024-01-01:2024-01-05:weekdays``, so it can be
+passed on as a ``--runDate``.
+"""
+
+__author__ = "David Dawson"
+__copyright__ = "Copyright 2025, David Dawson"
+__credits__ = ["David Dawson"]
+__license__ = "GPL"
+__version__ = "1.0.1"
+__maintainer__ = "Dave Dawson"
+__email__ = "davedawson.co@gmail.com"
+__status__ = "Production"
+
+import datetime
+from collections.abc import Callable, Container
+
+RANGE_SEPARATOR = ":"
+
+
+def easter_sunday(year: int) -> datetime.date:
+    """Return Easter Sunday of a year in the Gregorian calendar (anonymous Gregorian algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7  # noqa: E741
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return datetime.date(year, month, day + 1)
+
+
+def is_target_business_day(day: datetime.date) -> bool:
+    """Return True if TARGET2 is open: weekdays except New Year, Good Friday, Easter Monday, 1 May and 25-26 December."""
+    if day.weekday() >= 5:
+        return False
+    if (day.month, day.day) in ((1, 1), (5, 1), (12, 25), (12, 26)):
+        return False
+    easter = easter_sunday(day.year)
+    return day not in (easter - datetime.timedelta(days=2), easter + datetime.timedelta(days=1))
+
+
+def is_month_end(day: datetime.date) -> bool:
+    """Return True on the last day of a month."""
+    return (day + datetime.timedelta(days=1)).day == 1
+
+
+CALENDARS: dict[str, Callable[[datetime.date], bool]] = {
+    "daily": lambda day: True,
+    "weekdays": lambda day: day.weekday() < 5,
+    "target": is_target_business_day,
+    "month_end": is_month_end,
+}
+
+
+def is_range(run_date: str | None) -> bool:
+    """Return True if a ``--runDate`` value is a range rather than a single run, e.g. a date and time."""
+    parts = str(run_date or "").split(RANGE_SEPARATOR)
+    if len(parts) not in (2, 3):
+        return False
+    try:
+        datetime.date.fromisoformat(parts[0])
+        datetime.date.fromisoformat(parts[1])
+    except ValueError:
+        return False
+    return True
+
+
+def parse_range(run_date: str) -> tuple[datetime.date, datetime.date, str]:
+    """Split a range into its first and last date and its calendar.
+
+    Raises:
+        ValueError: If the dates are not ISO dates, are reversed or the calendar is unknown.
+    """
+    start, end, *calendar = run_date.split(RANGE_SEPARATOR)
+    calendar_name = calendar[0] if calendar else "daily"
+    if calendar_name not in CALENDARS:
+        raise ValueError(f"Unknown run date calendar {calendar_name!r}, expected one of {', '.join(CALENDARS)}")
+    first, last = datetime.date.fromisoformat(start), datetime.date.fromisoformat(end)
+    if last < first:
+        raise ValueError(f"Run date range {run_date} ends before it starts")
+    return first, last, calendar_name
+
+
+def expand_run_dates(run_date: str) -> list[str]:
+    """Return the run dates of a ``--runDate`` value, a single value is returned unchanged.
+
+    Args:
+        run_date: A run date or a range.
+
+    Returns:
+        ISO dates of the range that the calendar selects, in order.
+    """
+    if not is_range(run_date):
+        return [run_date]
+    first, last, calendar_name = parse_range(run_date)
+    selected = CALENDARS[calendar_name]
+    days = (first + datetime.timedelta(days=offset) for offset in range((last - first).days + 1))
+    return [day.isoformat() for day in days if selected(day)]
+
+
+def partition_run_dates(run_date: str, size: int, skip: Container[str] = ()) -> list[str]:
+    """Split a range into partitions of at most ``size`` run dates, each written as a range.
+
+    Args:
+        run_date: A run date or a range.
+        size: Run dates per partition.
+        skip: Run dates to leave out. A partition never spans one, so it still expands to exactly its own dates.
+
+    Returns:
+        Ranges covering every run date not skipped exactly once, in order.
+    """
+    dates = expand_run_dates(run_date)
+    if not is_range(run_date):
+        return [date for date in dates if date not in skip]
+    calendar_name = parse_range(run_date)[2]
+    size = max(1, size)
+    partitions = []
+    chunk: list[str] = []
+    for date in [*dates, None]:
+        if date is not None and date not in skip and len(chunk) < size:
+            chunk.append(date)
+            continue
+        if chunk:
+            partitions.append(RANGE_SEPARATOR.join([chunk[0], chunk[-1], calendar_name]))
+        chunk = [date] if date is not None and date not in skip else []
+    return partitions
@@ -17,13 +17,34 @@ __email__ = "davedawson.co@gmail.com"
 __status__ = "Production"
 
 import argparse  # noqa: I001
-import datetime
+import contextlib
 import importlib
 import logging
+import os
 import sys
 
-from dynamic_import_lib import setup_micap_importing, is_running_in_docker, _db_uri
-setup_micap_importing()
+from async_jobs import (
+    CONCURRENCY_ENV as ASYNC_CONCURRENCY_ENV,
+    default_concurrency as default_async_concurrency,
+    default_timeout as default_async_timeout,
+)
+from dynamic_import_lib import setup_micap_importing, prefetch_module_closure, importer_stats, is_running_in_docker, get_micap_importer, _db_uri
+from job_profiler import MODES as PROFILE_MODES, PROFILE_DIR_ENV, JobProfiler
+from memoize import call_main
+from run_dates import is_range
+from telemetry import JobTelemetry
+
+# The code version must be known before the first Mongo import so every module comes from the same release.
+# Only the command line is parsed here, importers of runner (the fork server) install the importer themselves
+# and a plain setup_micap_importing() call then returns it.
+if __name__ == "__main__":
+    _bootstrap_parser = argparse.ArgumentParser(add_help=False, allow_abbrev=False)
+    _bootstrap_parser.add_argument("--codeVersion", default=os.environ.get("MICAP_CODE_VERSION"))
+    _bootstrap_parser.add_argument("--importProfile", default=os.environ.get("MICAP_IMPORT_PROFILE"))
+    _bootstrap_args = _bootstrap_parser.parse_known_args()[0]
+    setup_micap_importing(code_version=_bootstrap_args.codeVersion, import_profile=_bootstrap_args.importProfile)
+else:
+    setup_micap_importing()
 
 from lib.logging.utils import DEFAULT_LOG_LEVEL, setup_logging
 
@@ -37,13 +58,14 @@ def main(args: argparse.Namespace) -> None:
     """Execute the specified job module with given parameters.
 
     Args:
-        args: Command line arguments containing jobModule, runDate, and logLevel.
+        args: Command line arguments containing jobModule, runDate, logLevel and codeVersion.
     """
     arg_module = args.jobModule
     run_datetime = args.runDate
     log_level = args.logLevel
 
     logger.info(f"Starting Module: {arg_module} for run Date/Time: {run_datetime} logging level: {log_level}")
+    logger.info(f"Code version: {getattr(args, 'codeVersion', None) or 'current'}")
     logger.info(f"Sys Metapath currently looks like: {sys.meta_path}")
     is_docker = is_running_in_docker()
     logger.info(f"Docker Fn evaluated {is_docker} and uri : {_db_uri}")
@@ -57,24 +79,214 @@ def main(args: argparse.Namespace) -> None:
     else:
         logger.setLevel(logging.ERROR)
 
-    arg_module_import = importlib.import_module(arg_module, "...")
-    arg_module_import.main(args)
+    profile = getattr(args, "profile", None)
+    # A profiled run must execute the job, not replay a memoized output
+    force = getattr(args, "forceRerun", False) or bool(profile)
+    # Measured from before the prefetch, so the Mongo round trips include loading the job's code
+    with JobTelemetry(arg_module, run_datetime, getattr(args, "codeVersion", None)) as telemetry:
+        prefetched = prefetch_module_closure(arg_module)
+        logger.info(f"Prefetched {prefetched} modules imported by {arg_module}")
+
+        arg_module_import = importlib.import_module(arg_module, "...")
+        importer = get_micap_importer()
+        if telemetry.code_version is None and importer is not None:
+            # The loader knows the release it serves once the manifest is loaded
+            telemetry.code_version = importer.loader.code_version
+        with JobProfiler(profile, arg_module, run_datetime, getattr(args, "profileDir", None)) if profile else contextlib.nullcontext():
+            call_main(arg_module_import, args, force=force)
+    logger.debug(f"Importer stats: {importer_stats()}")
     # Your code to use the runtime argument goes here
 
-if __name__ == "__main__":
+
+def build_parser() -> argparse.ArgumentParser:
+    """Return the job argument parser, shared with the fork server."""
     parser = argparse.ArgumentParser(description="Parse arguments to injection into python layer")
     parser.add_argument(
         "--jobModule",
         "-j",
-        default="jobs.market_data.ecb.fx_api",
         type=str,
-        required=True,
+        required=False,
+        help="Job module to run, required unless --batch is given",
+    )
+    parser.add_argument(
+        "--runDate",
+        "-d",
+        type=str,
+        required=False,
+        help="Run date, or a range START:END[:CALENDAR] to backfill, required unless every batch job sets one",
     )
-    parser.add_argument("--runDate", "-d", default=datetime.date.today(), type=str, required=True)
     parser.add_argument("--logLevel", "-l", default="ERROR", type=str, required=False)
+    parser.add_argument(
+        "--codeVersion",
+        default=os.environ.get("MICAP_CODE_VERSION"),
+        type=str,
+        required=False,
+        help="Immutable codebase release to load, defaults to the current release pointer",
+    )
+    parser.add_argument(
+        "--importProfile",
+        default=os.environ.get("MICAP_IMPORT_PROFILE"),
+        type=str,
+        required=False,
+        help="Write an import-time profile of Mongo-sourced modules to this JSON path",
+    )
+    parser.add_argument(
+        "--profile",
+        choices=PROFILE_MODES,
+        required=False,
+        help="Profile the job's main: cpu (cProfile and sampled stacks), mem (tracemalloc) or both",
+    )
+    parser.add_argument(
+        "--profileDir",
+        default=os.environ.get(PROFILE_DIR_ENV),
+        type=str,
+        required=False,
+        help="Directory to write profiles to, the job_profiles GridFS bucket if unset",
+    )
+    parser.add_argument(
+        "--forceRerun",
+        action="store_true",
+        help="Run a job declaring MEMOIZE even if its output for this code and these arguments is stored",
+    )
+    parser.add_argument(
+        "--asyncConcurrency",
+        default=default_async_concurrency(),
+        type=int,
+        required=False,
+        help=f"Requests an async def main job runs at once, defaults to {ASYNC_CONCURRENCY_ENV} or 64",
+    )
+    parser.add_argument(
+        "--asyncTimeout",
+        default=default_async_timeout(),
+        type=float,
+        required=False,
+        help="Seconds after which an async def main job is cancelled, no timeout if unset",
+    )
+    parser.add_argument(
+        "--batch",
+        type=str,
+        required=False,
+        help="JSON manifest of jobs to run concurrently in forked children, - for stdin",
+    )
+    parser.add_argument(
+        "--dag",
+        type=str,
+        required=False,
+        help="JSON spec of chained jobs to run in this process in dependency order, - for stdin",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        required=False,
+        help="Maximum number of batch jobs or DAG steps running at once, defaults to the manifest or spec",
+    )
+    parser.add_argument(
+        "--batchLogDir",
+        default=os.environ.get("MICAP_BATCH_LOG_DIR"),
+        type=str,
+        required=False,
+        help="Directory to write one log file per batch job or backfill partition to",
+    )
+    parser.add_argument(
+        "--partitionSize",
+        default=1,
+        type=int,
+        required=False,
+        help="Run dates per backfill partition",
+    )
+    parser.add_argument(
+        "--ignoreCheckpoints",
+        action="store_true",
+        help="Backfill every run date again even if an earlier run completed it",
+    )
+    return parser
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse runner arguments, a single job needs --jobModule and --runDate."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.batch and args.dag:
+        parser.error("--batch and --dag cannot be combined")
+    if args.dag and not args.runDate:
+        parser.error("--runDate is required with --dag")
+    if not (args.batch or args.dag) and not (args.jobModule and args.runDate):
+        parser.error("--jobModule and --runDate are required unless --batch or --dag is given")
+    return args
+
+
+def run_batch(args: argparse.Namespace) -> int:
+    """Run the jobs of a batch manifest and return the batch exit code.
+
+    Args:
+        args: Command line arguments, runDate and logLevel apply to jobs that omit them.
+
+    Returns:
+        0 if every job succeeded, 1 otherwise.
+    """
+    from batch import INHERITED_ARGUMENTS, load_manifest
+    from batch import run_batch as run_batch_jobs
+
+    entries, concurrency = load_manifest(args.batch)
+    defaults = {name: getattr(args, name) for name in INHERITED_ARGUMENTS}
+    jobs = run_batch_jobs(entries, defaults, args.concurrency or concurrency, args.batchLogDir)
+    logger.debug(f"Importer stats: {importer_stats()}")
+    return 1 if any(job.exit_code for job in jobs) else 0
+
 
-    logger.info(f"Raw parser configuration: {vars(parser)}")
-    args = parser.parse_args()
+def run_backfill(args: argparse.Namespace) -> int:
+    """Backfill a job over a run date range and return the exit code.
+
+    Args:
+        args: Command line arguments, runDate being the range.
+
+    Returns:
+        0 if every partition succeeded, 1 otherwise.
+    """
+    from backfill import PartitionCheckpoints
+    from backfill import run_backfill as run_backfill_partitions
+
+    jobs = run_backfill_partitions(
+        vars(args),
+        args.partitionSize,
+        args.concurrency,
+        args.batchLogDir,
+        PartitionCheckpoints.from_importer(),
+        args.ignoreCheckpoints,
+    )
+    logger.debug(f"Importer stats: {importer_stats()}")
+    return 1 if any(job.exit_code for job in jobs) else 0
+
+
+def run_dag(args: argparse.Namespace) -> int:
+    """Run the steps of a DAG spec and return the exit code.
+
+    Args:
+        args: Command line arguments, passed to every step.
+
+    Returns:
+        0 if every step succeeded, 1 otherwise.
+    """
+    from dag import load_dag, summary
+    from dag import run_dag as run_dag_steps
+
+    steps, concurrency = load_dag(args.dag)
+    arguments = {name: value for name, value in vars(args).items() if name not in ("dag", "batch")}
+    steps = run_dag_steps(steps, arguments, args.concurrency or concurrency)
+    print(summary(steps))
+    logger.debug(f"Importer stats: {importer_stats()}")
+    return 0 if all(step.status == "ok" for step in steps) else 1
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    logger.info(f"Parsed arguments: {vars(args)}")
+    if args.batch:
+        sys.exit(run_batch(args))
+    if args.dag:
+        sys.exit(run_dag(args))
+    if is_range(args.runDate):
+        sys.exit(run_backfill(args))
     main(args)
 
 # https://stackoverflow.com/questions/72395188/how-to-dynamically-import-module-from-a-relative-path-with-python-importlib
@@ -0,0 +1,339 @@
+"""Large datasets shared by the job processes of one host.
+
+Parallel jobs that need the same large frame, the Deribit book summary or years
+of ECB FX history, each load and hold their own copy. A dataset published here
+lives once in POSIX shared memory, and every process that attaches to it by name
+reads it in place::
+
+    from shared_frames import share
+
+    with share(f"ecb_fx_history_{args.runDate}", load_history) as history:
+        frame = history.frame()
+
+``share`` attaches to the dataset if another process published it and loads and
+publishes it otherwise; processes asking while it loads wait for it, so it is
+loaded once however many jobs start together.
+
+* NumPy arrays of numeric, boolean, datetime and timedelta dtypes, and such
+  columns and indexes of a DataFrame, are mapped without a copy and are
+  read-only. Other columns, strings or extension dtypes, are pickled into the
+  block and copied on attach.
+* Every process holding a dataset is recorded in a holders file next to the
+  block, under an exclusive lock. Closing a handle, explicitly or at exit,
+  removes its process, holders that died are pruned, and the last one out
+  unlinks the block.
+
+Frames stay valid while the handle is open; the mapping of a closed handle is
+kept until the process exits if frames of it are still referenced.
+"""
+
+__author__ = "David Dawson"
+__copyright__ = "Copyright 2025, David Dawson"
+__credits__ = ["David Dawson"]
+__license__ = "GPL"
+__version__ = "1.0.1"
+__maintainer__ = "Dave Dawson"
+__email__ = "davedawson.co@gmail.com"
+__status__ = "Production"
+
+import atexit
+import contextlib
+import fcntl
+import json
+import logging
+import os
+import pickle
+import re
+import struct
+import sys
+import tempfile
+from collections.abc import Callable
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_alignment = 64
+_header_length = struct.Struct("<Q")
+# dtype kinds whose arrays are mapped in place: bool, integers, floats, complex, timedelta, datetime
+_mapped_kinds = "biufcmM"
+# SharedMemory takes track=False from Python 3.13
+_untracked = sys.version_info >= (3, 13)
+_valid_name = re.compile(r"^[A-Za-z0-9_.-]{1,200}$")
+# Closed handles whose frames are still referenced, unmapped when the process exits
+_still_mapped: list[shared_memory.SharedMemory] = []
+
+
+def _checked(name: str) -> str:
+    if not _valid_name.match(name):
+        raise ValueError(f"Invalid shared dataset name {name!r}")
+    return name
+
+
+def _holders_dir() -> str:
+    return "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class _Holders:
+    """The processes holding a dataset, read and written under an exclusive lock on their file."""
+
+    def __init__(self, name: str) -> None:
+        self.path = os.path.join(_holders_dir(), f"{name}.holders")
+        self.pids: list[int] = []
+
+    def __enter__(self) -> "_Holders":
+        while True:
+            self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+            # The last holder removed the file while we waited for the lock
+            if os.fstat(self.fd).st_nlink:
+                break
+            os.close(self.fd)
+        with os.fdopen(os.dup(self.fd)) as f:
+            content = f.read()
+        self.pids = [pid for pid in (json.loads(content) if content else []) if _alive(pid)]
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        try:
+            if self.pids:
+                os.ftruncate(self.fd, 0)
+                os.pwrite(self.fd, json.dumps(self.pids).encode(), 0)
+            else:
+                os.remove(self.path)
+        finally:
+            os.close(self.fd)
+
+
+def _shared_memory(name: str, create: bool = False, size: int = 0) -> shared_memory.SharedMemory:
+    # Lifetime is managed by the holders file; the resource tracker would unlink the block when its creator exits
+    if _untracked:
+        return shared_memory.SharedMemory(name, create=create, size=size, track=False)
+    shm = shared_memory.SharedMemory(name, create=create, size=size)
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def _unlink(shm: shared_memory.SharedMemory) -> None:
+    if not _untracked:
+        # Before Python 3.13 unlink unregisters the block from the resource tracker, which must know it
+        resource_tracker.register(shm._name, "shared_memory")
+    shm.unlink()
+
+
+def _unlink_stale(name: str) -> None:
+    with contextlib.suppress(FileNotFoundError):
+        stale = _shared_memory(name)
+        stale.close()
+        _unlink(stale)
+        logger.warning(f"Unlinked shared dataset {name} left behind by processes that died")
+
+
+def _is_mapped(dtype: object) -> bool:
+    return isinstance(dtype, np.dtype) and dtype.kind in _mapped_kinds
+
+
+def _layout(data: "np.ndarray | pd.DataFrame") -> tuple[dict, list[tuple[int, object]], int]:
+    """Return the header of a dataset, its parts with their offsets and the size of the block."""
+    parts: list[tuple[int, object]] = []
+    offset = 0
+
+    def place(value: object) -> tuple:
+        nonlocal offset
+        if isinstance(value, np.ndarray) and _is_mapped(value.dtype):
+            array = np.ascontiguousarray(value)
+            entry = ("array", array.dtype.str, array.shape, offset)
+            size = array.nbytes
+        else:
+            array = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            entry = ("pickle", offset, len(array))
+            size = len(array)
+        parts.append((offset, array))
+        offset += -(-size // _alignment) * _alignment
+        return entry
+
+    if isinstance(data, np.ndarray):
+        if not _is_mapped(data.dtype):
+            raise TypeError(f"Only numeric, boolean and datetime arrays can be shared, got {data.dtype}")
+        header = {"kind": "array", "array": place(data)}
+    elif isinstance(data, pd.DataFrame):
+        columns = []
+        for i in range(data.shape[1]):
+            column = data.iloc[:, i]
+            columns.append(place(column.to_numpy() if _is_mapped(column.dtype) else column.array))
+        index = data.index
+        if isinstance(index, pd.RangeIndex):
+            index_entry = ("range", index.start, index.stop, index.step, index.name)
+        elif _is_mapped(index.dtype):
+            index_entry = ("index", place(index.to_numpy()), index.name)
+        else:
+            index_entry = ("pickled_index", place(index))
+        header = {"kind": "frame", "labels": list(data.columns), "columns": columns, "index": index_entry}
+    else:
+        raise TypeError(f"Only NumPy arrays and pandas DataFrames can be shared, got {type(data).__name__}")
+    return header, parts, offset
+
+
+class SharedFrame:
+    """A handle on a dataset in shared memory, holding it until closed."""
+
+    def __init__(self, name: str, shm: shared_memory.SharedMemory) -> None:
+        """Initialize the handle, use publish, attach or share."""
+        self.name = name
+        self._shm = shm
+        self._closed = False
+        length = _header_length.unpack_from(shm.buf, 0)[0]
+        self._data_offset = -(-(_header_length.size + length) // _alignment) * _alignment
+        self.header = pickle.loads(shm.buf[_header_length.size : _header_length.size + length])
+        atexit.register(self.close)
+
+    @classmethod
+    def publish(cls, name: str, data: "np.ndarray | pd.DataFrame") -> "SharedFrame":
+        """Copy a dataset into a new shared memory block.
+
+        Args:
+            name: Name processes attach by, letters, digits, ``_``, ``.`` and ``-``.
+            data: Array or DataFrame to share.
+
+        Returns:
+            A handle holding the dataset.
+
+        Raises:
+            FileExistsError: If a live process already publishes a dataset of that name.
+        """
+        with _Holders(_checked(name)) as holders:
+            if holders.pids:
+                raise FileExistsError(f"Shared dataset {name} is already published")
+            handle = cls._create(name, data)
+            holders.pids.append(os.getpid())
+        return handle
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedFrame":
+        """Attach to a published dataset.
+
+        Raises:
+            FileNotFoundError: If no live process holds a dataset of that name.
+        """
+        with _Holders(_checked(name)) as holders:
+            if not holders.pids:
+                raise FileNotFoundError(f"Shared dataset {name} is not published")
+            handle = cls(name, _shared_memory(name))
+            holders.pids.append(os.getpid())
+        return handle
+
+    @classmethod
+    def _create(cls, name: str, data: "np.ndarray | pd.DataFrame") -> "SharedFrame":
+        header, parts, size = _layout(data)
+        header_bytes = pickle.dumps(header, protocol=pickle.HIGHEST_PROTOCOL)
+        data_offset = -(-(_header_length.size + len(header_bytes)) // _alignment) * _alignment
+        _unlink_stale(name)
+        shm = _shared_memory(name, create=True, size=max(data_offset + size, 1))
+        try:
+            _header_length.pack_into(shm.buf, 0, len(header_bytes))
+            shm.buf[_header_length.size : _header_length.size + len(header_bytes)] = header_bytes
+            for offset, part in parts:
+                start = data_offset + offset
+                if isinstance(part, np.ndarray):
+                    np.ndarray(part.shape, part.dtype, buffer=shm.buf, offset=start)[...] = part
+                else:
+                    shm.buf[start : start + len(part)] = part
+        except BaseException:
+            shm.close()
+            _unlink(shm)
+            raise
+        logger.info(f"Published shared dataset {name}: {shm.size / 1024 / 1024:.1f} MiB")
+        return cls(name, shm)
+
+    def _part(self, entry: tuple) -> object:
+        if entry[0] == "array":
+            _, dtype, shape, offset = entry
+            array = np.ndarray(shape, np.dtype(dtype), buffer=self._shm.buf, offset=self._data_offset + offset)
+            array.flags.writeable = False
+            return array
+        _, offset, length = entry
+        start = self._data_offset + offset
+        return pickle.loads(self._shm.buf[start : start + length])
+
+    def frame(self) -> "np.ndarray | pd.DataFrame":
+        """Return the dataset, its mapped arrays and columns read-only views of the shared block."""
+        if self._closed:
+            raise ValueError(f"Shared dataset handle {self.name} is closed")
+        header = self.header
+        if header["kind"] == "array":
+            return self._part(header["array"])
+        index_entry = header["index"]
+        if index_entry[0] == "range":
+            index = pd.RangeIndex(*index_entry[1:4], name=index_entry[4])
+        elif index_entry[0] == "index":
+            index = pd.Index(self._part(index_entry[1]), name=index_entry[2], copy=False)
+        else:
+            index = self._part(index_entry[1])
+        columns = {i: self._part(entry) for i, entry in enumerate(header["columns"])}
+        frame = pd.DataFrame(columns, index=index, copy=False)
+        frame.columns = pd.Index(header["labels"])
+        return frame
+
+    def close(self) -> None:
+        """Release the dataset, unlinking the block if this process was its last holder."""
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        with _Holders(self.name) as holders:
+            # A forked child closing its parent's handle holds nothing
+            if os.getpid() in holders.pids:
+                holders.pids.remove(os.getpid())
+            if not holders.pids:
+                with contextlib.suppress(FileNotFoundError):
+                    _unlink(self._shm)
+                logger.info(f"Unlinked shared dataset {self.name}, no process holds it")
+        try:
+            self._shm.close()
+        except BufferError:
+            _still_mapped.append(self._shm)
+
+    def __enter__(self) -> "SharedFrame":
+        """Return the handle, closed on exit."""
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Close the handle."""
+        self.close()
+
+
+def share(name: str, load: Callable[[], "np.ndarray | pd.DataFrame"]) -> SharedFrame:
+    """Attach to a published dataset, or load and publish it.
+
+    Processes asking for a dataset while another loads it wait for that load.
+
+    Args:
+        name: Name of the dataset, e.g. its source and run date.
+        load: Zero-argument callable returning the array or DataFrame, called only if nobody holds it.
+
+    Returns:
+        A handle holding the dataset.
+    """
+    with _Holders(_checked(name)) as holders:
+        handle = SharedFrame(name, _shared_memory(name)) if holders.pids else SharedFrame._create(name, load())
+        holders.pids.append(os.getpid())
+    return handle
+
+
+def holders(name: str) -> list[int]:
+    """Return the live processes holding a dataset."""
+    with _Holders(_checked(name)) as registry:
+        return list(registry.pids)
+
@@ -0,0 +1,122 @@
+"""Single-flight execution of concurrent Mongo fetches.
+
+Threads that ask for the same key while a fetch for it is in flight wait for that
+fetch and share its result instead of issuing their own query. Fetches for
+different keys run in parallel.
+"""
+
+__author__ = "David Dawson"
+__copyright__ = "Copyright 2025, David Dawson"
+__credits__ = ["David Dawson"]
+__license__ = "GPL"
+__version__ = "1.0.1"
+__maintainer__ = "Dave Dawson"
+__email__ = "davedawson.co@gmail.com"
+__status__ = "Production"
+
+import threading
+from collections.abc import Callable, Hashable, Iterable, Mapping
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call(Generic[T]):
+    """An in-flight fetch and, once done, its result or error."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: T | None = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls per key."""
+
+    def __init__(self) -> None:
+        """Initialize with nothing in flight."""
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self.calls = 0
+        self.shared = 0
+
+    def _join(self, call: _Call[T]) -> T | None:
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def do(self, key: Hashable, operation: Callable[[], T]) -> T | None:
+        """Run an operation for a key, or wait for the one already in flight for it.
+
+        Args:
+            key: Identity of the work, e.g. a module name.
+            operation: Zero-argument callable doing the work.
+
+        Returns:
+            The result of the operation, shared by every concurrent caller. None if the call
+            joined a ``do_many`` that returned no result for the key.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.shared += 1
+        if not leader:
+            return self._join(call)
+
+        try:
+            call.result = operation()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def do_many(self, keys: Iterable[Hashable], operation: Callable[[list], Mapping]) -> list:
+        """Run one operation for every key not already in flight.
+
+        Concurrent ``do`` callers for any of the claimed keys wait for this operation
+        and receive its result for their key, or None if it returned none.
+
+        Args:
+            keys: Keys the operation would produce results for.
+            operation: Callable receiving the claimed keys and returning results by key.
+
+        Returns:
+            The keys claimed and passed to the operation.
+        """
+        with self._lock:
+            claimed = {key: _Call() for key in dict.fromkeys(keys) if key not in self._calls}
+            self._calls.update(claimed)
+            self.calls += bool(claimed)
+        if not claimed:
+            return []
+
+        error = None
+        results: Mapping = {}
+        try:
+            results = operation(list(claimed))
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            with self._lock:
+                for key in claimed:
+                    del self._calls[key]
+            for key, call in claimed.items():
+                call.error = error
+                call.result = results.get(key)
+                call.done.set()
+        return list(claimed)
+
+    def stats(self) -> dict:
+        """Return how many fetches ran and how many callers shared one instead of fetching."""
+        with self._lock:
+            return {"calls": self.calls, "shared": self.shared, "in_flight": len(self._calls)}
@@ -15,6 +15,12 @@ def custom_import_hook():
     from dynamic_import_lib import setup_micap_importing
     setup_micap_importing()
 
+    # Long-lived kernels follow codebase changes instead of needing a restart
+    import os
+    if os.environ.get("MICAP_LIVE_RELOAD"):
+        from live_reload import start_live_reload
+        start_live_reload()
+
     # Example: Set up global logging
     import logging
     logging.basicConfig(
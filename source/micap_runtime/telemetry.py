@@ -0,0 +1,167 @@
+"""Per-job resource telemetry written to QuestDB.
+
+The runner measures every job run and writes one row to the ``micap_job_runs``
+table over the InfluxDB line protocol (ILP), which QuestDB accepts on TCP port
+9009. Job module, run date, code version and outcome are tags. The fields are:
+
+* wall time, and user and system CPU time
+* peak RSS of the process
+* bytes received and sent on the network interfaces. Each runner container has
+  its own network namespace, so these are the job's traffic; in batch or fork
+  server mode jobs share the namespace.
+* Mongo round trips and their total latency, from the runtime client's command
+  listener. The runner starts measuring before it prefetches and imports the job,
+  so these include loading the job's code.
+
+Set MICAP_QUESTDB_ILP to ``host:port`` to enable it; the runtime image points it
+at ``questdb:9009``. Telemetry never fails a job: a QuestDB that cannot be reached
+is logged and the row dropped.
+"""
+
+__author__ = "David Dawson"
+__copyright__ = "Copyright 2025, David Dawson"
+__credits__ = ["David Dawson"]
+__license__ = "GPL"
+__version__ = "1.0.1"
+__maintainer__ = "Dave Dawson"
+__email__ = "davedawson.co@gmail.com"
+__status__ = "Production"
+
+import logging
+import os
+import re
+import socket
+import sys
+import time
+from collections.abc import Mapping
+
+try:
+    import resource
+except ImportError:  # Windows, CPU time and peak RSS are then not recorded
+    resource = None
+
+try:
+    from .dynamic_import_lib import command_stats
+except ImportError:
+    from dynamic_import_lib import command_stats
+
+logger = logging.getLogger(__name__)
+
+ILP_ENV = "MICAP_QUESTDB_ILP"
+TABLE = "micap_job_runs"
+
+_connect_timeout_seconds = 0.5
+_tag_escape = re.compile(r"([ ,=\\])")
+
+
+def escape_tag(value: object) -> str:
+    """Escape a tag value or table name for the line protocol."""
+    return _tag_escape.sub(r"\\\1", str(value)).replace("\n", "\\n")
+
+
+def format_field(value: object) -> str:
+    """Format a field value: integers get an ``i`` suffix, strings are quoted."""
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, int):
+        return f"{value}i"
+    if isinstance(value, float):
+        return repr(value)
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def ilp_line(table: str, tags: Mapping[str, object], fields: Mapping[str, object], timestamp_ns: int) -> str:
+    """Return one line protocol row, skipping tags and fields that are None."""
+    tag_part = "".join(f",{escape_tag(key)}={escape_tag(value)}" for key, value in tags.items() if value not in (None, ""))
+    field_part = ",".join(f"{escape_tag(key)}={format_field(value)}" for key, value in fields.items() if value is not None)
+    return f"{escape_tag(table)}{tag_part} {field_part} {timestamp_ns}\n"
+
+
+def network_bytes(path: str = "/proc/self/net/dev") -> tuple[int, int] | None:
+    """Return bytes received and sent on every interface but loopback, None where unavailable."""
+    try:
+        with open(path) as f:
+            lines = f.readlines()[2:]
+    except OSError:
+        return None
+    received = sent = 0
+    for line in lines:
+        interface, _, counters = line.partition(":")
+        if interface.strip() == "lo":
+            continue
+        values = counters.split()
+        received += int(values[0])
+        sent += int(values[8])
+    return received, sent
+
+
+def send(line: str, address: str) -> None:
+    """Send rows to a QuestDB ILP endpoint over TCP.
+
+    Args:
+        line: One or more line protocol rows.
+        address: ``host:port`` of the endpoint.
+    """
+    host, _, port = address.rpartition(":")
+    with socket.create_connection((host, int(port)), timeout=_connect_timeout_seconds) as conn:
+        conn.sendall(line.encode())
+
+
+class JobTelemetry:
+    """Measures a job run and writes it to QuestDB on exit."""
+
+    def __init__(self, job_module: str, run_date: str | None, code_version: str | None, address: str | None = None) -> None:
+        """Initialize the measurement.
+
+        Args:
+            job_module: Job being run, a tag.
+            run_date: Run date of the job, a tag.
+            code_version: Codebase release the job runs, a tag.
+            address: ``host:port`` of the QuestDB ILP endpoint, defaults to MICAP_QUESTDB_ILP.
+        """
+        self.job_module = job_module
+        self.run_date = run_date
+        self.code_version = code_version
+        self.address = address or os.environ.get(ILP_ENV)
+        self.row: str | None = None
+
+    def __enter__(self) -> "JobTelemetry":
+        """Record the clock, resource usage, network and Mongo counters at the start of the job."""
+        self.started_ns = time.time_ns()
+        self.started = time.perf_counter()
+        self.usage = resource.getrusage(resource.RUSAGE_SELF) if resource is not None else None
+        self.network = network_bytes()
+        self.mongo = command_stats.stats()
+        return self
+
+    def __exit__(self, exc_type: type | None, *exc_info: object) -> None:
+        """Log the job's status and resource usage since entry, and send them to QuestDB as one row if configured."""
+        fields = {"wall_ms": round((time.perf_counter() - self.started) * 1000, 3)}
+        if self.usage is not None:
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            fields["cpu_user_s"] = round(usage.ru_utime - self.usage.ru_utime, 6)
+            fields["cpu_system_s"] = round(usage.ru_stime - self.usage.ru_stime, 6)
+            # Kilobytes on Linux, bytes on macOS
+            fields["peak_rss_bytes"] = usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+        network = network_bytes()
+        if self.network is not None and network is not None:
+            fields["net_rx_bytes"] = network[0] - self.network[0]
+            fields["net_tx_bytes"] = network[1] - self.network[1]
+        mongo = command_stats.stats()
+        fields["mongo_round_trips"] = mongo["round_trips"] - self.mongo["round_trips"]
+        fields["mongo_ms"] = round(mongo["total_ms"] - self.mongo["total_ms"], 3)
+
+        tags = {
+            "job_module": self.job_module,
+            "run_date": self.run_date,
+            "code_version": self.code_version or "current",
+            "status": "failed" if exc_type is not None else "ok",
+        }
+        self.row = ilp_line(TABLE, tags, fields, self.started_ns)
+        logger.info(f"Job telemetry: {fields}")
+        if not self.address:
+            return
+        try:
+            send(self.row, self.address)
+        except OSError as e:
+            logger.warning(f"Could not write job telemetry to QuestDB at {self.address}: {e}")
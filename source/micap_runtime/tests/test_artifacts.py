@@ -0,0 +1,80 @@
+"""Tests for the artifacts module."""
+import argparse
+import os
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pd = pytest.importorskip("pandas")
+
+from .. import artifacts  # noqa: E402
+from ..artifacts import ArtifactStore, read_output, write_output  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path) -> ArtifactStore:  # noqa: ANN001
+    """Create a store in a temporary directory."""
+    return ArtifactStore(str(tmp_path))
+
+
+def rates(scale: float = 1.0) -> pd.DataFrame:
+    """Build an FX rates frame."""
+    return pd.DataFrame(
+        {
+            "date": pd.date_range("2024-03-22", periods=1000, freq="D"),
+            "currency": ["USD", "GBP", "JPY", "CHF"] * 250,
+            "rate": [1.08 * scale + i / 1e4 for i in range(1000)],
+        }
+    )
+
+
+def test_round_trip_and_index(store: ArtifactStore) -> None:
+    """Test that a stored output is indexed by name and run date and reads back unchanged."""
+    artifact = store.put("ecb_fx_rates", rates(), "jobs.market_data.ecb.fx_api", "2024-03-22", {"source": "ecb"})
+    assert artifact.rows == 1000
+    assert artifact.path == store.path(artifact.digest) and os.path.exists(artifact.path)
+
+    found = store.latest("ecb_fx_rates", "2024-03-22")
+    assert found.digest == artifact.digest
+    assert found.metadata == {"source": "ecb"}
+    assert "rate: double" in found.schema
+    pd.testing.assert_frame_equal(store.read_frame(found), rates())
+    assert store.latest("ecb_fx_rates", "2024-03-25") is None
+
+
+def test_identical_outputs_share_a_file(store: ArtifactStore) -> None:
+    """Test that identical outputs are stored once and a different output gets its own file."""
+    first = store.put("ecb_fx_rates", rates(), run_date="2024-03-22")
+    second = store.put("ecb_fx_rates", rates(), run_date="2024-03-25")
+    third = store.put("ecb_fx_rates", rates(2.0), run_date="2024-03-26")
+    assert first.digest == second.digest != third.digest
+    files = [name for _, _, names in os.walk(os.path.join(store.root, "objects")) for name in names]
+    assert sorted(files) == sorted([first.digest + ".arrow", third.digest + ".arrow"])
+    assert [artifact.run_date for artifact in store.find("ecb_fx_rates")] == ["2024-03-26", "2024-03-25", "2024-03-22"]
+    assert not [name for name in os.listdir(store.root) if name.startswith(".tmp-")]
+
+
+def test_memory_mapped_read_does_not_copy(store: ArtifactStore) -> None:
+    """Test that reading an uncompressed output allocates nothing and compressed outputs read back equal."""
+    artifact = store.put("ecb_fx_rates", rates())
+    before = pa.total_allocated_bytes()
+    table = store.read_table(artifact)
+    assert pa.total_allocated_bytes() == before
+    assert table.column("rate").to_pylist()[:2] == [1.08, 1.0801]
+
+    compressed = store.put("ecb_fx_rates_lz4", rates(), compression="lz4")
+    assert compressed.digest != artifact.digest
+    assert store.read_table(compressed).equals(table)
+
+
+def test_job_output_api(tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:  # noqa: ANN001
+    """Test that write_output indexes the job module and run date and read_output returns the newest output."""
+    monkeypatch.setenv(artifacts.ARTIFACT_DIR_ENV, str(tmp_path))
+    monkeypatch.setattr(artifacts, "_default_store", None)
+    args = argparse.Namespace(jobModule="jobs.market_data.ecb.fx_api", runDate="2024-03-22")
+
+    artifact = write_output(args, "ecb_fx_rates", rates(), source="ecb")
+    assert (artifact.job_module, artifact.run_date, artifact.metadata) == ("jobs.market_data.ecb.fx_api", "2024-03-22", {"source": "ecb"})
+    pd.testing.assert_frame_equal(read_output("ecb_fx_rates", "2024-03-22"), rates())
+    with pytest.raises(LookupError, match="for 2024-03-25"):
+        read_output("ecb_fx_rates", "2024-03-25")
@@ -0,0 +1,99 @@
+"""Tests for the async_jobs module."""
+import argparse
+import asyncio
+import time
+import types
+
+import pytest
+
+from ..async_jobs import LoopLagMonitor, call_job_main, gather, is_async_job, limited, run_async_main
+
+
+def job_module(main: object) -> types.ModuleType:
+    """Build a job module with the given main."""
+    module = types.ModuleType("jobs.quotes")
+    module.main = main
+    return module
+
+
+def test_async_main_runs_with_concurrency_limit() -> None:
+    """Test that an async main runs on a managed loop whose gather never exceeds the concurrency limit."""
+    running = peak = 0
+
+    async def fetch(conid: int) -> int:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return conid * 2
+
+    async def main(args: argparse.Namespace) -> list[int]:
+        return await gather(*(fetch(conid) for conid in range(args.count)))
+
+    module = job_module(main)
+    assert is_async_job(module)
+    args = argparse.Namespace(count=40, asyncConcurrency=5, asyncTimeout=None)
+    assert call_job_main(module, args) == [conid * 2 for conid in range(40)]
+    assert peak == 5
+
+
+def test_sync_main_is_called_directly() -> None:
+    """Test that a plain main is called without an event loop."""
+    module = job_module(lambda args: args.runDate)
+    assert not is_async_job(module)
+    assert call_job_main(module, argparse.Namespace(runDate="2025-03-20")) == "2025-03-20"
+
+
+def test_timeout_cancels_main_and_its_tasks() -> None:
+    """Test that the timeout cancels main and every task it started, then raises TimeoutError."""
+    cancelled = []
+
+    async def request(conid: int) -> None:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(conid)
+            raise
+
+    async def main(args: argparse.Namespace) -> None:
+        # A task main does not await is cancelled too
+        asyncio.get_running_loop().create_task(request(-1))
+        await gather(request(1), request(2))
+
+    start = time.perf_counter()
+    with pytest.raises(TimeoutError, match=r"did not finish within 0\.1s"):
+        run_async_main(main, argparse.Namespace(), concurrency=4, timeout=0.1)
+    assert time.perf_counter() - start < 5
+    assert sorted(cancelled) == [-1, 1, 2]
+
+
+def test_timeout_raised_by_main_itself_passes_through() -> None:
+    """Test that a TimeoutError raised by main, with no timeout set, is not reported as the job timing out."""
+    async def main(args: argparse.Namespace) -> None:
+        raise TimeoutError("socket read timed out")
+
+    with pytest.raises(TimeoutError, match=r"^socket read timed out$"):
+        run_async_main(main, argparse.Namespace(), timeout=None)
+
+
+def test_blocking_callback_shows_as_loop_lag() -> None:
+    """Test that a blocking call inside main is reported as a loop stall."""
+    async def main(args: argparse.Namespace) -> None:
+        await asyncio.sleep(0.05)
+        time.sleep(0.3)
+        await asyncio.sleep(0.05)
+
+    monitor = LoopLagMonitor(interval=0.02, warning=0.2)
+    run_async_main(main, argparse.Namespace(), monitor=monitor)
+    stats = monitor.stats()
+    assert stats["stalls"] == 1
+    assert stats["max_lag_ms"] >= 200
+
+
+def test_limited_outside_a_managed_loop_is_unlimited() -> None:
+    """Test that limited awaits its coroutine directly on a loop the runner did not start."""
+    async def value() -> int:
+        return 3
+
+    assert asyncio.run(limited(value())) == 3
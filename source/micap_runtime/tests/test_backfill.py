@@ -0,0 +1,90 @@
+"""Tests for the backfill module."""
+import io
+import os
+
+import pytest
+
+from ..backfill import PartitionCheckpoints, Throughput, run_backfill
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="Backfills need os.fork")
+
+
+class CheckpointCollection:
+    """Minimal checkpoint collection holding documents in memory."""
+
+    def __init__(self) -> None:
+        """Initialize an empty collection."""
+        self.documents: dict[str, dict] = {}
+
+    def find(self, query: dict, projection: dict | None = None) -> list[dict]:
+        """Return the documents whose fields equal every value in the query."""
+        return [doc for doc in self.documents.values() if all(doc.get(key) == value for key, value in query.items())]
+
+    def update_one(self, query: dict, update: dict, upsert: bool = False) -> None:
+        """Apply a ``$set`` and ``$inc`` update, creating the document if needed."""
+        doc = self.documents.setdefault(query["_id"], {"_id": query["_id"], "attempts": 0})
+        doc.update(update["$set"])
+        doc["attempts"] += update["$inc"]["attempts"]
+
+
+def execute(argv: list[str]) -> int:
+    """Stand-in for run_job: fails partitions containing 2024-03-06."""
+    run_date = dict(arg[2:].split("=", 1) for arg in argv)["runDate"]
+    print(f"backfilling {run_date}")
+    return 1 if run_date.startswith("2024-03-06") else 0
+
+
+def test_backfill_checkpoints_and_resumes() -> None:
+    """Test that the run dates of completed partitions are checkpointed and a restart reruns only the failed one."""
+    checkpoints = PartitionCheckpoints(CheckpointCollection())
+    arguments = {"jobModule": "jobs.fx", "runDate": "2024-03-04:2024-03-08:weekdays", "logLevel": "ERROR"}
+
+    output = io.StringIO()
+    jobs = run_backfill(arguments, 1, 2, checkpoints=checkpoints, execute=execute, output=output)
+    assert [job.exit_code for job in jobs] == [0, 0, 1, 0, 0]
+    assert checkpoints.completed("jobs.fx") == {"2024-03-04", "2024-03-05", "2024-03-07", "2024-03-08"}
+    assert "[backfill] 5/5 partitions, 1 failed" in output.getvalue()
+    assert "partitions/min" in output.getvalue()
+
+    # A restart runs only the failed partition
+    jobs = run_backfill(arguments, 1, 2, checkpoints=checkpoints, execute=execute, output=io.StringIO())
+    assert [job.label for job in jobs] == ["jobs.fx@2024-03-06:2024-03-06:weekdays"]
+    assert checkpoints.collection.documents["jobs.fx@2024-03-06"]["attempts"] == 2
+
+    jobs = run_backfill(arguments, 1, 2, checkpoints=checkpoints, ignore_checkpoints=True, execute=execute, output=io.StringIO())
+    assert len(jobs) == 5
+
+
+def test_resume_with_another_partition_size_skips_completed_dates() -> None:
+    """Test that changing the partition size on resume reruns only the run dates not completed before."""
+    checkpoints = PartitionCheckpoints(CheckpointCollection())
+    arguments = {"jobModule": "jobs.fx", "runDate": "2024-03-04:2024-03-08", "logLevel": "ERROR"}
+    run_backfill(arguments, 2, 1, checkpoints=checkpoints, execute=execute, output=io.StringIO())
+    assert checkpoints.completed("jobs.fx") == {"2024-03-04", "2024-03-05", "2024-03-08"}
+
+    jobs = run_backfill(arguments, 5, 1, checkpoints=checkpoints, execute=execute, output=io.StringIO())
+    assert [job.label for job in jobs] == ["jobs.fx@2024-03-06:2024-03-07:daily"]
+
+
+def test_partitions_pass_their_range_to_the_job() -> None:
+    """Test that each partition runs as one job given its date range and the backfill's arguments."""
+    output = io.StringIO()
+    arguments = {"jobModule": "jobs.fx", "runDate": "2024-03-04:2024-03-08", "logLevel": "ERROR"}
+    jobs = run_backfill(arguments, 2, 1, execute=execute, output=output)
+    assert [job.label for job in jobs] == [
+        "jobs.fx@2024-03-04:2024-03-05:daily",
+        "jobs.fx@2024-03-06:2024-03-07:daily",
+        "jobs.fx@2024-03-08:2024-03-08:daily",
+    ]
+    assert "--logLevel=ERROR" in jobs[0].argv
+
+
+def test_throughput() -> None:
+    """Test that the progress report shows partitions per minute and the estimated time remaining."""
+    now = [0.0]
+    throughput = Throughput(10, clock=lambda: now[0])
+    now[0] = 60.0
+    for _ in range(5):
+        throughput.record(0)
+    assert throughput.per_minute() == 5
+    assert throughput.report() == "5/10 partitions, 5.0 partitions/min, 1.0 min remaining"
@@ -0,0 +1,73 @@
+"""Tests for the batch module."""
+import io
+import json
+import os
+import sys
+import time
+
+import pytest
+
+from ..batch import job_argv, load_manifest, run_batch
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="Batch mode needs os.fork")
+
+
+def execute(argv: list[str]) -> int:
+    """Stand-in for run_job: echoes its arguments and exits with the code named by its module."""
+    arguments = dict(arg[2:].split("=", 1) for arg in argv)
+    print(f"running {arguments['jobModule']} for {arguments['runDate']}")
+    print(f"log level {arguments['logLevel']}", file=sys.stderr)
+    if arguments["jobModule"].endswith("slow"):
+        time.sleep(0.3)
+    if arguments["jobModule"].endswith("fails"):
+        raise RuntimeError("fetch failed")
+    return 0
+
+
+def test_jobs_get_their_own_log_stream_and_exit_status(tmp_path) -> None:  # noqa: ANN001
+    """Test that each job inherits the batch defaults, writes its own log file and reports its own exit code."""
+    output = io.StringIO()
+    entries = [
+        {"jobModule": "jobs.ecb"},
+        {"jobModule": "jobs.deribit_fails", "logLevel": "INFO"},
+        {"jobModule": "jobs.asx", "runDate": "2025-03-19"},
+    ]
+    jobs = run_batch(entries, {"runDate": "2025-03-20", "logLevel": "ERROR"}, 2, str(tmp_path), execute, output=output)
+
+    assert [job.label for job in jobs] == ["jobs.ecb@2025-03-20", "jobs.deribit_fails@2025-03-20", "jobs.asx@2025-03-19"]
+    assert [job.exit_code for job in jobs] == [0, 1, 0]
+    lines = output.getvalue().splitlines()
+    assert "[jobs.ecb@2025-03-20] running jobs.ecb for 2025-03-20" in lines
+    assert "[jobs.deribit_fails@2025-03-20] log level INFO" in lines
+    assert "[jobs.asx@2025-03-19] running jobs.asx for 2025-03-19" in lines
+    assert any(line.startswith("[jobs.deribit_fails@2025-03-20] RuntimeError: fetch failed") for line in lines)
+
+    log = (tmp_path / "jobs.deribit_fails@2025-03-20.log").read_text()
+    assert "log level INFO" in log
+    assert "running jobs.ecb" not in log
+
+
+def test_concurrency_is_capped() -> None:
+    """Test that no more than the concurrency limit of jobs run at once."""
+    entries = [{"jobModule": f"jobs.job_{i}_slow"} for i in range(4)]
+    start = time.perf_counter()
+    jobs = run_batch(entries, {"runDate": "2025-03-20", "logLevel": "ERROR"}, 2, None, execute, output=io.StringIO())
+    elapsed = time.perf_counter() - start
+    assert all(job.exit_code == 0 for job in jobs)
+    # Two waves of two jobs, each sleeping 0.3s
+    assert 0.6 <= elapsed < 3
+
+
+def test_load_manifest(tmp_path) -> None:  # noqa: ANN001
+    """Test that a manifest is read either as an object with a concurrency or as a bare list of jobs."""
+    path = tmp_path / "morning.json"
+    path.write_text(json.dumps({"concurrency": 3, "jobs": [{"jobModule": "jobs.ecb"}]}))
+    assert load_manifest(str(path)) == ([{"jobModule": "jobs.ecb"}], 3)
+    path.write_text(json.dumps([{"jobModule": "jobs.ecb"}]))
+    assert load_manifest(str(path)) == ([{"jobModule": "jobs.ecb"}], None)
+
+
+def test_job_argv_skips_unset_arguments() -> None:
+    """Test that None and False arguments are left out of a job's command line and True becomes a bare flag."""
+    arguments = {"jobModule": "jobs.ecb", "runDate": "2025-03-20", "codeVersion": None, "forceRerun": True, "flag": False}
+    assert job_argv(arguments) == ["--jobModule=jobs.ecb", "--runDate=2025-03-20", "--forceRerun"]
@@ -0,0 +1,136 @@
+"""Tests for the bytecode_cache module."""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from ..bytecode_cache import BytecodeCache
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> BytecodeCache:
+    """Create a BytecodeCache in a temporary directory.
+
+    Args:
+        tmp_path: Pytest temporary directory.
+
+    Returns:
+        Empty BytecodeCache instance.
+    """
+    return BytecodeCache(str(tmp_path / "bytecode"))
+
+
+def test_get_code_miss_then_hit(cache: BytecodeCache) -> None:
+    """Test that a second compile of the same source is served from disk."""
+    source = "VALUE = 40 + 2"
+
+    first = cache.get_code(source, "<mongodb>/test/module")
+    second = cache.get_code(source, "<mongodb>/test/module")
+
+    assert (cache.misses, cache.hits) == (1, 1)
+    namespace = {}
+    exec(second, namespace)
+    assert namespace["VALUE"] == 42
+    assert second.co_filename == first.co_filename == "<mongodb>/test/module"
+
+
+def test_cache_key_depends_on_source_and_filename() -> None:
+    """Test that changed sources or filenames never share an entry."""
+    key = BytecodeCache.cache_key("VALUE = 1", "<mongodb>/a")
+
+    assert key == BytecodeCache.cache_key("VALUE = 1", "<mongodb>/a")
+    assert key != BytecodeCache.cache_key("VALUE = 2", "<mongodb>/a")
+    assert key != BytecodeCache.cache_key("VALUE = 1", "<mongodb>/b")
+
+
+def test_corrupt_entry_is_recompiled(cache: BytecodeCache) -> None:
+    """Test that a truncated entry is discarded and replaced."""
+    source = "VALUE = 1"
+    path = cache.entry_path(cache.cache_key(source, "<mongodb>/a"))
+    with open(path, "wb") as f:
+        f.write(b"\xe3\x00")
+
+    code = cache.get_code(source, "<mongodb>/a")
+
+    assert cache.misses == 1
+    namespace = {}
+    exec(code, namespace)
+    assert namespace["VALUE"] == 1
+    assert cache.get_code(source, "<mongodb>/a") is not None
+    assert cache.hits == 1
+
+
+def test_eviction_keeps_cache_within_bound(tmp_path: Path) -> None:
+    """Test that least recently used entries are evicted once the bound is exceeded."""
+    cache = BytecodeCache(str(tmp_path), max_bytes=4096)
+    for i in range(50):
+        path = cache.entry_path(cache.cache_key(f"VALUE = {i}\n" + "#" * 200, "<mongodb>/a"))
+        cache.get_code(f"VALUE = {i}\n" + "#" * 200, "<mongodb>/a")
+        # Age entries so eviction order is deterministic
+        os.utime(path, (i, i))
+
+    assert cache.size() <= 4096
+    newest = cache.entry_path(cache.cache_key("VALUE = 49\n" + "#" * 200, "<mongodb>/a"))
+    oldest = cache.entry_path(cache.cache_key("VALUE = 0\n" + "#" * 200, "<mongodb>/a"))
+    assert os.path.exists(newest)
+    assert not os.path.exists(oldest)
+
+
+def test_stale_temporary_files_are_counted_and_removed(cache: BytecodeCache) -> None:
+    """Test that temporary files left by killed writers count towards the size and are swept, recent ones are kept."""
+    stale = os.path.join(cache.directory, ".tmp-killed")
+    recent = os.path.join(cache.directory, ".tmp-writing")
+    for path in (stale, recent):
+        with open(path, "wb") as f:
+            f.write(b"x" * 100)
+    os.utime(stale, (0, 0))
+
+    assert cache.size() == 100
+    assert cache.evict() == 1
+    assert not os.path.exists(stale)
+    assert os.path.exists(recent)
+
+
+def test_writes_do_not_rescan_the_directory(cache: BytecodeCache) -> None:
+    """Test that the cache size is tracked from its own writes instead of scanning the directory after each one."""
+    with patch.object(BytecodeCache, "size", wraps=cache.size) as size:
+        for i in range(100):
+            cache.get_code(f"VALUE = {i}\n", "<mongodb>/a")
+
+    assert size.call_count == 1
+    assert len(os.listdir(cache.directory)) == 100
+
+
+def test_concurrent_writers_share_entries(tmp_path: Path) -> None:
+    """Test that caches sharing one directory never observe partial entries."""
+    directory = str(tmp_path)
+    sources = [f"VALUE = {i}" for i in range(20)]
+
+    def compile_all(_: int) -> list[int]:
+        cache = BytecodeCache(directory)
+        values = []
+        for source in sources:
+            namespace = {}
+            exec(cache.get_code(source, "<mongodb>/shared"), namespace)
+            values.append(namespace["VALUE"])
+        return values
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(compile_all, range(8)))
+
+    assert all(values == list(range(20)) for values in results)
+    assert not [name for name in os.listdir(directory) if name.startswith(".tmp-")]
+
+
+def test_from_environment(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the cache is only enabled when its directory is configured."""
+    monkeypatch.delenv("MICAP_BYTECODE_CACHE_DIR", raising=False)
+    assert BytecodeCache.from_environment() is None
+
+    monkeypatch.setenv("MICAP_BYTECODE_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("MICAP_BYTECODE_CACHE_MAX_MB", "1")
+    cache = BytecodeCache.from_environment()
+    assert cache is not None
+    assert cache.max_bytes == 1024 * 1024
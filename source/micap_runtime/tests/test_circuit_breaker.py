@@ -0,0 +1,87 @@
+"""Tests for the circuit_breaker module."""
+import pytest
+
+from ..circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self) -> None:
+        """Start the clock at zero."""
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """Return the current time."""
+        return self.now
+
+
+def fail() -> None:
+    """Simulate a Mongo call that times out."""
+    raise TimeoutError("server selection timed out")
+
+
+def test_opens_after_first_failure_and_fails_fast() -> None:
+    """Test that the first tripping failure opens the circuit and later calls are rejected unexecuted."""
+    breaker = CircuitBreaker(trip_on=(TimeoutError,), reset_timeout=30, clock=FakeClock())
+    calls = []
+
+    with pytest.raises(TimeoutError):
+        breaker.call(fail)
+    assert breaker.state == OPEN
+
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: calls.append(1))
+    assert calls == []
+    assert breaker.stats() == {"state": OPEN, "failures": 1, "rejected": 1}
+
+
+def test_half_open_trial_closes_or_reopens() -> None:
+    """Test that a trial call after the reset timeout closes the circuit on success and reopens it on failure."""
+    clock = FakeClock()
+    breaker = CircuitBreaker(trip_on=(TimeoutError,), reset_timeout=30, clock=clock)
+    with pytest.raises(TimeoutError):
+        breaker.call(fail)
+
+    clock.now = 31
+    with pytest.raises(TimeoutError):
+        breaker.call(fail)
+    assert breaker.state == OPEN
+    assert breaker.opened_at == 31
+
+    clock.now = 62
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == CLOSED
+
+
+def test_other_errors_do_not_trip() -> None:
+    """Test that errors outside trip_on pass through and keep the circuit closed."""
+    breaker = CircuitBreaker(trip_on=(TimeoutError,))
+
+    with pytest.raises(KeyError):
+        breaker.call(lambda: {}["missing"])
+
+    assert breaker.state == CLOSED
+    assert breaker.state != HALF_OPEN
+
+
+def test_half_open_trial_raising_other_errors_does_not_wedge() -> None:
+    """Test that a trial call raising outside trip_on closes the circuit, and an interrupted trial allows another."""
+    clock = FakeClock()
+    breaker = CircuitBreaker(trip_on=(TimeoutError,), reset_timeout=30, clock=clock)
+    with pytest.raises(TimeoutError):
+        breaker.call(fail)
+
+    clock.now = 31
+
+    def interrupted() -> None:
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        breaker.call(interrupted)
+    assert breaker.state == OPEN
+
+    with pytest.raises(KeyError):
+        breaker.call(lambda: {}["missing"])
+    assert breaker.state == CLOSED
+    assert breaker.call(lambda: "ok") == "ok"
@@ -0,0 +1,149 @@
+"""Tests for the dag module."""
+import argparse
+import contextlib
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+from .. import dag
+from ..dag import parse_dag, run_dag
+
+SPEC = {
+    "concurrency": 2,
+    "steps": [
+        {"name": "fx", "jobModule": "jobs_dag_test.fx"},
+        {"name": "positions", "jobModule": "jobs_dag_test.positions", "venue": "ibkr"},
+        {"name": "net_worth", "jobModule": "jobs_dag_test.net_worth", "after": ["fx", "positions"]},
+        {"jobModule": "jobs_dag_test.email", "after": "net_worth"},
+    ],
+}
+
+
+@pytest.fixture
+def job_modules(monkeypatch: pytest.MonkeyPatch) -> dict[str, list]:
+    """Install the job modules of SPEC, recording when each starts and ends."""
+    events = []
+    barrier = threading.Barrier(2, timeout=5)
+
+    def fx(args: argparse.Namespace) -> dict:
+        events.append("fx")
+        # Only returns once positions runs alongside it
+        barrier.wait()
+        return {"USD": 1.08}
+
+    def positions(args: argparse.Namespace) -> dict:
+        events.append("positions")
+        barrier.wait()
+        return {"venue": args.venue, "USD": 100.0}
+
+    def net_worth(args: argparse.Namespace) -> float:
+        events.append("net_worth")
+        return args.upstream["positions"]["USD"] / args.upstream["fx"]["USD"]
+
+    def email(args: argparse.Namespace) -> str:
+        events.append("email")
+        return f"{args.runDate}: {args.upstream['net_worth']:.2f} EUR"
+
+    monkeypatch.setitem(sys.modules, "jobs_dag_test", types.ModuleType("jobs_dag_test"))
+    for main in (fx, positions, net_worth, email):
+        module = types.ModuleType(f"jobs_dag_test.{main.__name__}")
+        module.main = main
+        monkeypatch.setitem(sys.modules, module.__name__, module)
+    return {"events": events}
+
+
+def execute(module: types.ModuleType, args: argparse.Namespace) -> object:
+    """Call the step's main without memoization or telemetry."""
+    return module.main(args)
+
+
+def test_steps_run_in_order_with_results_passed_in_process(job_modules: dict[str, list]) -> None:
+    """Test that independent steps run together and each step receives its upstream results in-process."""
+    steps, concurrency = parse_dag(SPEC)
+    assert concurrency == 2
+    assert [step.name for step in steps] == ["fx", "positions", "net_worth", "email"]
+
+    steps = run_dag(steps, {"runDate": "2025-03-20", "logLevel": "ERROR"}, concurrency, execute)
+
+    assert [step.status for step in steps] == ["ok"] * 4
+    assert steps[3].result == "2025-03-20: 92.59 EUR"
+    assert steps[1].result["venue"] == "ibkr"
+    events = job_modules["events"]
+    assert set(events[:2]) == {"fx", "positions"}
+    assert events[2:] == ["net_worth", "email"]
+
+
+def test_failed_step_skips_descendants_only(job_modules: dict[str, list], monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a failed step skips the steps depending on it while unrelated steps still run."""
+    def broken(args: argparse.Namespace) -> None:
+        raise RuntimeError("IBKR gateway down")
+
+    monkeypatch.setattr(sys.modules["jobs_dag_test.positions"], "main", broken)
+    spec = {
+        "steps": [
+            {"name": "positions", "jobModule": "jobs_dag_test.positions"},
+            {"name": "net_worth", "jobModule": "jobs_dag_test.net_worth", "after": ["positions"]},
+            {"name": "email", "jobModule": "jobs_dag_test.email", "after": ["net_worth"]},
+            {"jobModule": "jobs_dag_test.slow"},
+        ]
+    }
+    slow = types.ModuleType("jobs_dag_test.slow")
+    slow.main = lambda args: time.sleep(0.05) or "done"
+    monkeypatch.setitem(sys.modules, slow.__name__, slow)
+    steps = run_dag(parse_dag(spec)[0], {"runDate": "2025-03-20"}, 2, execute)
+
+    assert [step.status for step in steps] == ["failed", "skipped", "skipped", "ok"]
+    assert isinstance(steps[0].error, RuntimeError)
+    assert steps[3].result == "done"
+    assert "net_worth" not in job_modules["events"]
+
+
+def test_step_arguments_force_and_profile_their_step(job_modules: dict[str, list], monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that forceRerun and profile set on one step rerun and profile that step only."""
+    forced = {}
+    profiled = []
+
+    def call_main(module: types.ModuleType, args: argparse.Namespace, force: bool = False) -> str:
+        forced[module.__name__] = force
+        return "done"
+
+    class Profiler:
+        def __init__(self, mode: str, job_module: str, run_date: str | None, output_dir: str | None = None) -> None:
+            profiled.append((job_module, mode, output_dir))
+
+        def __enter__(self) -> "Profiler":
+            return self
+
+        def __exit__(self, *exc_info: object) -> None:
+            pass
+
+    monkeypatch.setattr(dag, "call_main", call_main)
+    monkeypatch.setattr(dag, "JobProfiler", Profiler)
+    monkeypatch.setattr(dag, "JobTelemetry", lambda *args: contextlib.nullcontext())
+    spec = [
+        {"jobModule": "jobs_dag_test.fx", "forceRerun": True},
+        {"jobModule": "jobs_dag_test.positions", "profile": "cpu", "profileDir": "/tmp/profiles"},
+        {"jobModule": "jobs_dag_test.email"},
+    ]
+    steps = run_dag(parse_dag(spec)[0], {"runDate": "2025-03-20", "forceRerun": False})
+
+    assert [step.status for step in steps] == ["ok"] * 3
+    assert forced == {"jobs_dag_test.fx": True, "jobs_dag_test.positions": True, "jobs_dag_test.email": False}
+    assert profiled == [("jobs_dag_test.positions", "cpu", "/tmp/profiles")]
+
+
+@pytest.mark.parametrize(
+    ("steps", "message"),
+    [
+        ([{"jobModule": "jobs.a"}, {"jobModule": "other.a"}], "unique"),
+        ([{"jobModule": "jobs.a", "after": ["b"]}], "unknown steps"),
+        ([{"jobModule": "jobs.a", "after": ["b"]}, {"jobModule": "jobs.b", "after": ["a"]}], "cycle"),
+    ],
+)
+def test_invalid_specs_are_rejected(steps: list[dict], message: str) -> None:
+    """Test that duplicate step names, unknown dependencies and cycles are rejected."""
+    with pytest.raises(ValueError, match=message):
+        parse_dag(steps)
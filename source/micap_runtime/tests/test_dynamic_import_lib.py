@@ -1,12 +1,25 @@
 """Tests for the dynamic_import_lib module."""
-import re
+import importlib
+import io
+import json
+import random
 import sys
+import threading
+import time
+import types
+import zipfile
+from collections import Counter
 from collections.abc import Generator
-from unittest.mock import MagicMock, call, patch
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import MagicMock, patch
 
 import pytest
 
-from ..dynamic_import_lib import MongoDBImporter, MongoDBModuleLoader
+from .. import dynamic_import_lib, import_profiler
+from ..bytecode_cache import BytecodeCache
+from ..circuit_breaker import CircuitBreaker, CircuitOpenError
+from ..dynamic_import_lib import MongoDBBundleLoader, MongoDBImporter, MongoDBModuleLoader, MongoDBReleaseLoader
 
 
 @pytest.fixture
@@ -55,6 +68,32 @@ def module_importer(module_loader: MongoDBModuleLoader) -> MongoDBImporter:
     return importer
 
 
+def load_manifest(loader: MongoDBModuleLoader, module_names: list[str]) -> None:
+    """Load the loader's manifest from a mocked collection holding the given modules.
+
+    Args:
+        loader: Loader with a mocked collection.
+        module_names: Ids of the documents stored in the collection.
+    """
+    loader.collection.find.return_value = [{"_id": name} for name in module_names]
+    loader.load_manifest()
+
+
+def submodule_names(content: str) -> list[str]:
+    """Execute synthesized package code and return the submodule names it exposes.
+
+    Args:
+        content: Package code returned by get_sub_module_data.
+
+    Returns:
+        Sorted names of the lazily importable submodules.
+    """
+    namespace = {"__name__": "synthesized"}
+    exec(content, namespace)
+    assert "__all__" not in namespace
+    return sorted(namespace["_SUBMODULES"])
+
+
 def test_get_data_success(module_loader: MongoDBModuleLoader) -> None:
     """Test successful retrieval of module data from MongoDB."""
     expected_content = "def test_function(): return 'Hello'"
@@ -91,50 +130,57 @@ def test_get_sub_module_data(module_loader: MongoDBModuleLoader) -> None:
 
     result = module_loader.get_sub_module_data("lib.logging")
 
-    # Check that __all__ is created correctly with direct children only
-    assert result["content"] == '__all__ = ["formatters", "handlers", "utils"]'
+    # Check that the synthesized package exposes direct children only
+    assert submodule_names(result["content"]) == ["formatters", "handlers", "utils"]
     module_loader.collection.find.assert_called_once()
 
 
 def test_get_sub_module_data_nested(module_loader: MongoDBModuleLoader) -> None:
     """Test retrieval of nested submodule data from MongoDB."""
-    # Setup the mock to return different results based on the query
-    def mock_find_side_effect(query, **kwargs):
-        pattern = query["_id"]["$regex"]
-
-        # For lib.logging package query
-        # For lib.logging.utils package query
-        if "^lib\\.logging\\.utils\\." in pattern:
-            return [
-                {"_id": "lib.logging.utils.common"},
-                {"_id": "lib.logging.utils.common.helpers"}
-            ]
-        elif "^lib\\.logging\\." in pattern:
-            return [
-                {"_id": "lib.logging.utils"},
-                {"_id": "lib.logging.utils.common"},
-                {"_id": "lib.logging.formatters"},
-                {"_id": "lib.logging.handlers.custom"}
-            ]
-        # Default case
-        return []
-
-    module_loader.collection.find.side_effect = mock_find_side_effect
+    module_loader.collection.find.return_value = [
+        {"_id": "lib.logging.utils"},
+        {"_id": "lib.logging.utils.common"},
+        {"_id": "lib.logging.utils.common.helpers"},
+        {"_id": "lib.logging.formatters"},
+        {"_id": "lib.logging.handlers.custom"}
+    ]
 
     # First call - test for lib.logging package
     result = module_loader.get_sub_module_data("lib.logging")
-    assert result["content"] == '__all__ = ["formatters", "handlers", "utils"]'
+    assert submodule_names(result["content"]) == ["formatters", "handlers", "utils"]
 
     # Second call - test for lib.logging.utils package
     result = module_loader.get_sub_module_data("lib.logging.utils")
-    assert result["content"] == '__all__ = ["common"]'
+    assert submodule_names(result["content"]) == ["common"]
 
-    # Verify both calls were made with correct patterns
-    assert module_loader.collection.find.call_count == 2
-    module_loader.collection.find.assert_has_calls([
-        call({"_id": {"$regex": f"^{re.escape('lib.logging')}\\."}}),
-        call({"_id": {"$regex": f"^{re.escape('lib.logging.utils')}\\."}}),
-    ])
+    # Both listings are served from the manifest loaded by a single query
+    module_loader.collection.find.assert_called_once_with({}, {"_id": 1, "parent": 1, "is_package": 1, "imports": 1, "content_hash": 1})
+
+
+def test_manifest_uses_parent_and_package_fields(module_loader: MongoDBModuleLoader) -> None:
+    """Test that released parent and is_package fields drive package checks and child listings."""
+    module_loader.collection.find.return_value = [
+        {"_id": "lib", "parent": None, "is_package": True},
+        {"_id": "lib.market_data", "parent": "lib", "is_package": True},
+        {"_id": "lib.market_data.ecb.fx_api", "parent": "lib.market_data.ecb", "is_package": False},
+        {"_id": "lib.market_data.rba", "parent": "lib.market_data", "is_package": True},
+        {"_id": "lib.logging"},  # Released before the fields existed
+    ]
+
+    manifest = module_loader.load_manifest()
+
+    assert manifest == {
+        "lib": True,
+        "lib.market_data": True,
+        "lib.market_data.ecb": True,
+        "lib.market_data.ecb.fx_api": False,
+        "lib.market_data.rba": True,
+        "lib.logging": False,
+    }
+    assert module_loader.get_children("lib") == ["lib.logging", "lib.market_data"]
+    assert module_loader.get_children("lib.market_data") == ["lib.market_data.ecb", "lib.market_data.rba"]
+    assert module_loader.get_children("lib.market_data.ecb.fx_api") == []
+    assert "lib.market_data.ecb" not in module_loader.stored_modules
 
 
 def test_exec_module_regular_module(module_loader: MongoDBModuleLoader) -> None:
@@ -143,6 +189,7 @@ def test_exec_module_regular_module(module_loader: MongoDBModuleLoader) -> None:
     mock_module = type('MockModule', (), {'__dict__': {}, '__name__': 'test.module'})()
 
     test_code = "def test_func(): return 42"
+    load_manifest(module_loader, ["test.module"])
     module_loader.get_data = MagicMock(return_value=test_code)
 
     # Save original modules and clear sys.modules
@@ -159,21 +206,34 @@ def test_exec_module_regular_module(module_loader: MongoDBModuleLoader) -> None:
         sys.modules.update(orig_modules)
 
 
+def test_exec_module_uses_bytecode_cache(module_loader: MongoDBModuleLoader, tmp_path: Path) -> None:
+    """Test that compiled module code is stored in and served from the bytecode cache."""
+    module_loader.bytecode_cache = BytecodeCache(str(tmp_path))
+    load_manifest(module_loader, ["test.module"])
+    module_loader.get_data = MagicMock(return_value="def test_func(): return 42")
+
+    with patch.dict(sys.modules, {}, clear=True):
+        for _ in range(2):
+            mock_module = type('MockModule', (), {'__dict__': {}, '__name__': 'test.module'})()
+            module_loader.exec_module(mock_module)
+            assert mock_module.__dict__["test_func"]() == 42
+
+    assert (module_loader.bytecode_cache.misses, module_loader.bytecode_cache.hits) == (1, 1)
+
+
 def test_exec_module_package(module_loader: MongoDBModuleLoader) -> None:
     """Test execution of a package module code retrieved from MongoDB."""
     # Create a simple mock module
     mock_module = type('MockModule', (), {'__dict__': {}, '__name__': 'test.package'})()
 
-    # Simulate FileNotFoundError for direct module, indicating it's a package
+    # The package has no document of its own, only submodules
+    load_manifest(module_loader, ["test.package.submodule1", "test.package.submodule2"])
     module_loader.get_data = MagicMock(side_effect=FileNotFoundError("Module not found"))
 
     # Setup the package to have submodules
     mock_sub_modules = {'content': '__all__ = ["submodule1", "submodule2"]'}
     module_loader.get_sub_module_data = MagicMock(return_value=mock_sub_modules)
 
-    # Mock the collection.count_documents to indicate submodules exist
-    module_loader.collection.count_documents = MagicMock(return_value=2)
-
     # Save original modules and clear sys.modules
     orig_modules = dict(sys.modules)
     sys.modules.clear()
@@ -182,6 +242,7 @@ def test_exec_module_package(module_loader: MongoDBModuleLoader) -> None:
         # Check that __all__ was properly set
         assert "__all__" in mock_module.__dict__
         assert module_loader.get_sub_module_data.called
+        assert not module_loader.get_data.called
         assert hasattr(mock_module, "__path__")
         assert mock_module.__name__ in sys.modules
     finally:
@@ -192,8 +253,8 @@ def test_exec_module_package(module_loader: MongoDBModuleLoader) -> None:
 
 def test_find_spec_for_module(module_importer: MongoDBImporter) -> None:
     """Test finding module spec for a regular module."""
-    # Setup module_loader to return data for a module
-    module_importer.loader.get_data = MagicMock(return_value="module_content")
+    # Setup module_loader manifest to contain a module
+    load_manifest(module_importer.loader, ["test.module"])
 
     with patch.dict(sys.modules, {}, clear=True):
         spec = module_importer.find_spec("test.module")
@@ -206,9 +267,8 @@ def test_find_spec_for_module(module_importer: MongoDBImporter) -> None:
 
 def test_find_spec_for_package(module_importer: MongoDBImporter) -> None:
     """Test finding module spec for a package."""
-    # Setup module_loader to fail for direct module but have submodules
-    module_importer.loader.get_data = MagicMock(side_effect=FileNotFoundError)
-    module_importer.loader.collection.count_documents = MagicMock(return_value=2)
+    # Setup module_loader manifest to contain a package with submodules
+    load_manifest(module_importer.loader, ["test.package.module"])
 
     # Mock spec creation to avoid importlib internals
     mock_spec = MagicMock()
@@ -225,6 +285,72 @@ def test_find_spec_for_package(module_importer: MongoDBImporter) -> None:
     assert spec.submodule_search_locations is not None  # Is a package
 
 
+def test_find_spec_uses_manifest_only(module_importer: MongoDBImporter) -> None:
+    """Test that spec resolution never queries MongoDB once the manifest is loaded."""
+    module_importer.loader.collection.find.return_value = [{"_id": "lib.logging.utils"}]
+    module_importer.loader.load_manifest()
+    module_importer.loader.collection.reset_mock()
+
+    with patch.dict(sys.modules, {}, clear=True):
+        assert module_importer.find_spec("lib") is not None
+        assert module_importer.find_spec("lib.logging.utils") is not None
+        assert module_importer.find_spec("pandas_accelerator") is None
+
+    module_importer.loader.collection.find.assert_not_called()
+    module_importer.loader.collection.find_one.assert_not_called()
+    module_importer.loader.collection.count_documents.assert_not_called()
+
+
+def test_find_spec_misses_use_negative_cache(module_importer: MongoDBImporter) -> None:
+    """Test that absent names are answered by the negative cache without queries."""
+    load_manifest(module_importer.loader, ["lib.logging.utils"])
+    module_importer.loader.collection.reset_mock()
+
+    with patch.dict(sys.modules, {}, clear=True):
+        for _ in range(3):
+            assert module_importer.find_spec("bottleneck") is None
+
+    assert module_importer.loader.negative_cache.stats()["hits"] == 3
+    module_importer.loader.collection.find.assert_not_called()
+
+
+def test_manifest_reloaded_when_collection_changes(module_loader: MongoDBModuleLoader) -> None:
+    """Test that a changed collection fingerprint invalidates the manifest and negative cache."""
+    load_manifest(module_loader, ["lib.logging.utils"])
+    assert module_loader.negative_cache.is_known_absent("lib.market_data")
+
+    module_loader.collection.find.return_value = [{"_id": "lib.logging.utils"}, {"_id": "lib.market_data"}]
+    with patch("micap_runtime.dynamic_import_lib._manifest_ttl_seconds", 0):
+        manifest = module_loader.get_manifest()
+
+    assert "lib.market_data" in manifest
+    assert not module_loader.negative_cache.is_known_absent("lib.market_data")
+
+
+def test_manifest_reloaded_when_modules_are_added_and_deleted(module_loader: MongoDBModuleLoader) -> None:
+    """Test that deleting one module and adding another, which keeps the count, still reloads the manifest."""
+    load_manifest(module_loader, ["lib.ecb", "lib.fred"])
+
+    module_loader.collection.find.return_value = [{"_id": "lib.ecb"}, {"_id": "lib.boe"}]
+    with patch("micap_runtime.dynamic_import_lib._manifest_ttl_seconds", 0):
+        manifest = module_loader.get_manifest()
+
+    assert "lib.boe" in manifest
+    assert "lib.fred" not in manifest
+
+
+def test_manifest_kept_when_collection_is_unchanged(module_loader: MongoDBModuleLoader) -> None:
+    """Test that the same modules listed in another order keep the loaded manifest."""
+    load_manifest(module_loader, ["lib.ecb", "lib.fred"])
+    negative_cache = module_loader.negative_cache
+
+    module_loader.collection.find.return_value = [{"_id": "lib.fred"}, {"_id": "lib.ecb"}]
+    with patch("micap_runtime.dynamic_import_lib._manifest_ttl_seconds", 0):
+        module_loader.get_manifest()
+
+    assert module_loader.negative_cache is negative_cache
+
+
 def test_from_import_syntax(module_loader: MongoDBModuleLoader) -> None:
     """Test the 'from x import y' syntax with the MongoDB loader."""
     # Setup collection to return modules and submodules
@@ -240,37 +366,12 @@ def test_from_import_syntax(module_loader: MongoDBModuleLoader) -> None:
             return {"_id": module_id, **package_structure[module_id]}
         return None
 
-    def mock_find(query, **kwargs):
-        pattern = query["_id"]["$regex"]
-        pattern = pattern.replace("^", "").replace("\\.", ".").replace("$", "")
-        base_package = pattern.rstrip(".")
-
-        results = []
-        for key in package_structure:
-            # Check if the key is a direct child of the base package
-            if key.startswith(base_package + "."):
-                remaining = key[len(base_package) + 1:]
-                if "." not in remaining:  # Only direct children
-                    results.append({"_id": key})
-        return results
-
-    def mock_count_documents(query, **kwargs):
-        pattern = query["_id"]["$regex"]
-        pattern = pattern.replace("^", "").replace("\\.", ".").replace("$", "")
-        base_package = pattern.rstrip(".")
-
-        count = 0
-        for key in package_structure:
-            if key.startswith(base_package + "."):
-                count += 1
-        return count
-
     module_loader.collection.find_one = MagicMock(side_effect=mock_find_one)
-    module_loader.collection.find = MagicMock(side_effect=mock_find)
-    module_loader.collection.count_documents = MagicMock(side_effect=mock_count_documents)
+    module_loader.collection.find = MagicMock(return_value=[{"_id": key} for key in package_structure])
 
     importer = MongoDBImporter()
     importer.loader = module_loader
+    module_loader.collection.find.reset_mock()
 
     # Make sure our modules aren't already loaded
     for mod in ["lib", "lib.logging", "lib.logging.utils"]:
@@ -295,6 +396,11 @@ def test_from_import_syntax(module_loader: MongoDBModuleLoader) -> None:
         assert "lib.logging" in sys.modules
         assert "lib.logging.utils" in sys.modules
 
+        # Every module is fetched exactly once, spec resolution does not query
+        fetched = [c.args[0]["_id"] for c in module_loader.collection.find_one.call_args_list]
+        assert sorted(fetched) == ["lib", "lib.logging", "lib.logging.utils"]
+        module_loader.collection.find.assert_called_once()
+
     finally:
         sys.meta_path.remove(importer)
         for mod in ["lib", "lib.logging", "lib.logging.utils"]:
@@ -323,39 +429,14 @@ def test_hierarchical_import(module_loader: MongoDBModuleLoader) -> None:
             return result
         return None
 
-    def mock_find(query, **kwargs):
-        pattern = query["_id"]["$regex"]
-        pattern = pattern.replace("^", "").replace("\\.", ".").replace("$", "")
-        base_package = pattern.rstrip(".")
-
-        results = []
-        for key in package_structure:
-            # Check if the key is a direct child of the base package
-            if key.startswith(base_package + "."):
-                remaining = key[len(base_package) + 1:]
-                if "." not in remaining:  # Only direct children
-                    results.append({"_id": key})
-        return results
-
-    def mock_count_documents(query, **kwargs):
-        pattern = query["_id"]["$regex"]
-        pattern = pattern.replace("^", "").replace("\\.", ".").replace("$", "")
-        base_package = pattern.rstrip(".")
-
-        count = 0
-        for key in package_structure:
-            if key.startswith(base_package + "."):
-                count += 1
-        return count
-
     def mock_get_data(fullname):
         if fullname in package_structure and "content" in package_structure[fullname]:
             return package_structure[fullname]["content"]
         raise FileNotFoundError(f"Module {fullname} not found")
 
     module_loader.collection.find_one = MagicMock(side_effect=mock_find_one)
-    module_loader.collection.find = MagicMock(side_effect=mock_find)
-    module_loader.collection.count_documents = MagicMock(side_effect=mock_count_documents)
+    # Packages without content have no document, they are implied by their children
+    module_loader.collection.find = MagicMock(return_value=[{"_id": key} for key, doc in package_structure.items() if "content" in doc])
     module_loader.get_data = MagicMock(side_effect=mock_get_data)
 
     importer = MongoDBImporter()
@@ -390,3 +471,392 @@ def test_hierarchical_import(module_loader: MongoDBModuleLoader) -> None:
         for mod in list(sys.modules.keys()):
             if mod.startswith("jobs"):
                 del sys.modules[mod]
+
+
+def test_bundle_loader_serves_imports_from_memory(mock_mongo_client: MagicMock) -> None:
+    """Test that bundle mode fetches the codebase once and imports without further queries."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+        bundle.writestr("lib/__init__.py", "")
+        bundle.writestr("lib/logging/utils.py", 'DEFAULT_LOG_LEVEL = "INFO"')
+        bundle.writestr("manifest.json", json.dumps({"modules": [
+            {"_id": "lib", "parent": None, "is_package": True, "path": "lib/__init__.py"},
+            {"_id": "lib.logging.utils", "parent": "lib.logging", "is_package": False, "path": "lib/logging/utils.py"},
+        ]}))
+    stream = MagicMock()
+    stream.__enter__.return_value.read.return_value = buffer.getvalue()
+
+    with patch("gridfs.GridFSBucket") as mock_bucket:
+        mock_bucket.return_value.open_download_stream_by_name.return_value = stream
+        loader = MongoDBBundleLoader()
+        importer = MongoDBImporter(loader)
+
+    mock_bucket.return_value.open_download_stream_by_name.assert_called_once_with("codebase.zip")
+    assert loader.get_children("lib.logging") == ["lib.logging.utils"]
+    mock_mongo_client.reset_mock()
+
+    for mod in ["lib", "lib.logging", "lib.logging.utils"]:
+        sys.modules.pop(mod, None)
+    sys.meta_path.insert(0, importer)
+    try:
+        local_vars = {}
+        exec("from lib.logging.utils import DEFAULT_LOG_LEVEL", {}, local_vars)
+        assert local_vars["DEFAULT_LOG_LEVEL"] == "INFO"
+    finally:
+        sys.meta_path.remove(importer)
+        for mod in ["lib", "lib.logging", "lib.logging.utils"]:
+            sys.modules.pop(mod, None)
+
+    mock_mongo_client.find_one.assert_not_called()
+    mock_mongo_client.find.assert_not_called()
+
+
+def test_bundle_loader_prefetch_reads_the_bundle(mock_mongo_client: MagicMock) -> None:
+    """Test that prefetching in bundle mode serves the bundle's sources even when the collection disagrees."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+        bundle.writestr("jobs/fx.py", "from lib import rates\nRATE = rates.RATE")
+        bundle.writestr("lib/rates.py", "RATE = 'bundle'")
+        bundle.writestr("manifest.json", json.dumps({"modules": [
+            {"_id": "jobs.fx", "parent": "jobs", "is_package": False, "path": "jobs/fx.py", "imports": ["lib.rates"]},
+            {"_id": "lib.rates", "parent": "lib", "is_package": False, "path": "lib/rates.py"},
+        ]}))
+    stream = MagicMock()
+    stream.__enter__.return_value.read.return_value = buffer.getvalue()
+    # The live collection holds a newer release than the bundle
+    mock_mongo_client.find.return_value = [
+        {"_id": "jobs.fx", "content": "RATE = 'collection'"},
+        {"_id": "lib.rates", "content": "RATE = 'collection'"},
+    ]
+
+    with patch("gridfs.GridFSBucket") as mock_bucket:
+        mock_bucket.return_value.open_download_stream_by_name.return_value = stream
+        loader = MongoDBBundleLoader()
+        importer = MongoDBImporter(loader)
+
+    for mod in ["jobs", "lib", "jobs.fx", "lib.rates"]:
+        sys.modules.pop(mod, None)
+    sys.meta_path.insert(0, importer)
+    try:
+        assert sorted(loader.prefetch("jobs.fx")) == ["jobs.fx", "lib.rates"]
+        assert importlib.import_module("jobs.fx").RATE == "bundle"
+    finally:
+        sys.meta_path.remove(importer)
+        for mod in ["jobs", "lib", "jobs.fx", "lib.rates"]:
+            sys.modules.pop(mod, None)
+    mock_mongo_client.find.assert_not_called()
+
+
+def test_release_loader_pins_version(mock_mongo_client: MagicMock) -> None:
+    """Test that a release loader resolves the current pointer once and serves blobs by content hash."""
+    documents = {
+        "current": {"_id": "current", "version": "v1"},
+        "v1": {"_id": "v1", "modules": [{"_id": "lib.constants", "parent": "lib", "is_package": False, "content_hash": "h1"}]},
+        "v2": {
+            "_id": "v2",
+            "modules": [{"_id": "lib.constants", "parent": "lib", "is_package": False, "content_hash": "h2"}],
+            "resources": [{"_id": "lib/data/rates.csv", "content_hash": "r2", "length": 10}],
+        },
+        "h1": {"_id": "h1", "content": "VERSION = 1"},
+        "h2": {"_id": "h2", "content": "VERSION = 2"},
+    }
+    mock_mongo_client.find_one.side_effect = lambda query, *args, **kwargs: documents.get(query["_id"])
+
+    loader = MongoDBReleaseLoader()
+    assert loader.load_manifest() == {"lib": True, "lib.constants": False}
+    assert loader.code_version == "v1"
+
+    # A new release moving the pointer does not affect the running process
+    documents["current"]["version"] = "v2"
+    assert not loader.manifest_is_stale()
+    assert loader.get_data("lib.constants") == "VERSION = 1"
+
+    pinned = MongoDBReleaseLoader("v2")
+    assert pinned.get_data("lib.constants") == "VERSION = 2"
+    assert pinned.get_resource_index() == ({"lib/data/rates.csv": documents["v2"]["resources"][0]}, {"lib": {"data"}, "lib/data": {"rates.csv"}})
+    assert loader.get_resource_index() == ({}, {})
+    with pytest.raises(FileNotFoundError):
+        pinned.get_data("lib.missing")
+
+
+def test_release_loader_resources_reuse_the_loaded_snapshot(mock_mongo_client: MagicMock) -> None:
+    """Test that rebuilding the resource index of a loaded release reads no snapshot again."""
+    release = {
+        "_id": "v2",
+        "modules": [{"_id": "lib.constants", "parent": "lib", "is_package": False, "content_hash": "h2"}],
+        "resources": [{"_id": "lib/data/rates.csv", "content_hash": "r2", "length": 10}],
+    }
+    mock_mongo_client.find_one.return_value = release
+    loader = MongoDBReleaseLoader("v2")
+    loader.get_manifest()
+    mock_mongo_client.find_one.reset_mock()
+
+    loader.resource_index = None
+    assert loader.get_resource_index()[0] == {"lib/data/rates.csv": release["resources"][0]}
+    mock_mongo_client.find_one.assert_not_called()
+
+
+def test_synthesized_package_imports_submodules_lazily(module_loader: MongoDBModuleLoader) -> None:
+    """Test that attribute access on a synthesized package imports only the named submodule."""
+    sources = {
+        "lib.market_data.ecb": "NAME = 'ecb'",
+        "lib.market_data.rba": "raise RuntimeError('rba must not be imported')",
+    }
+    module_loader.collection.find.return_value = [{"_id": name} for name in sources]
+    module_loader.get_data = MagicMock(side_effect=lambda fullname: sources[fullname])
+    importer = MongoDBImporter(module_loader)
+
+    for mod in ["lib", "lib.market_data", *sources]:
+        sys.modules.pop(mod, None)
+    sys.meta_path.insert(0, importer)
+    try:
+        namespace = {}
+        exec("import lib.market_data\nfrom lib.market_data import *", namespace)
+        market_data = namespace["lib"].market_data
+        assert "ecb" in dir(market_data)
+        assert "lib.market_data.ecb" not in sys.modules
+
+        assert market_data.ecb.NAME == "ecb"
+        assert "lib.market_data.ecb" in sys.modules
+        assert "lib.market_data.rba" not in sys.modules
+        module_loader.get_data.assert_called_once_with("lib.market_data.ecb")
+
+        with pytest.raises(AttributeError):
+            market_data.missing  # noqa: B018
+    finally:
+        sys.meta_path.remove(importer)
+        for mod in ["lib", "lib.market_data", *sources]:
+            sys.modules.pop(mod, None)
+
+
+def test_prefetch_fetches_closure_in_one_query(module_loader: MongoDBModuleLoader) -> None:
+    """Test that a job's dependency closure is fetched with one $in query and imported without further queries."""
+    sources = {
+        "jobs.fx": "from lib.ecb import fx_api\nRATE = fx_api.RATE",
+        "lib.ecb.fx_api": "from lib.logging import utils\nRATE = 1.1",
+        "lib.logging.utils": "LEVEL = 'INFO'",
+        "lib.unused": "raise RuntimeError('not in the closure')",
+    }
+    imports = {"jobs.fx": ["lib.ecb", "lib.ecb.fx_api"], "lib.ecb.fx_api": ["lib.logging", "lib.logging.utils"]}
+    module_loader.collection.find.return_value = [{"_id": name, "imports": imports.get(name, [])} for name in sources]
+    importer = MongoDBImporter(module_loader)
+
+    def mock_find(query: dict, *args: object, **kwargs: object) -> list[dict]:
+        return [{"_id": name, "content": sources[name]} for name in query["_id"]["$in"]]
+
+    module_loader.collection.find = MagicMock(side_effect=mock_find)
+
+    for mod in ["jobs", "lib", *sources, "lib.ecb", "lib.logging"]:
+        sys.modules.pop(mod, None)
+    sys.meta_path.insert(0, importer)
+    try:
+        fetched = module_loader.prefetch("jobs.fx")
+        assert sorted(fetched) == ["jobs.fx", "lib.ecb.fx_api", "lib.logging.utils"]
+        module_loader.collection.find.assert_called_once()
+
+        module = importlib.import_module("jobs.fx")
+        assert module.RATE == 1.1
+        module_loader.collection.find_one.assert_not_called()
+        assert module_loader.prefetched == {}
+    finally:
+        sys.meta_path.remove(importer)
+        for mod in ["jobs", "lib", *sources, "lib.ecb", "lib.logging"]:
+            sys.modules.pop(mod, None)
+
+
+def test_client_is_created_lazily() -> None:
+    """Test that constructing a loader does not open a Mongo client until it is used."""
+    with patch("pymongo.MongoClient") as mock_client:
+        loader = MongoDBModuleLoader()
+        mock_client.assert_not_called()
+
+        loader.collection.find_one({"_id": "lib"})
+        loader.collection.find_one({"_id": "lib"})
+
+    mock_client.assert_called_once()
+    assert mock_client.call_args.kwargs["serverSelectionTimeoutMS"] == dynamic_import_lib._server_selection_timeout_ms
+
+
+def test_setup_micap_importing_is_idempotent() -> None:
+    """Test that repeated setup calls install a single importer."""
+    with patch.object(sys, "meta_path", list(sys.meta_path)), patch("pymongo.MongoClient"):
+        first = dynamic_import_lib.setup_micap_importing(mode="collection")
+        second = dynamic_import_lib.setup_micap_importing(mode="collection")
+
+        assert first is second
+        assert sum(getattr(finder, "is_micap_importer", False) for finder in sys.meta_path) == 1
+
+
+def test_open_circuit_fails_imports_fast(module_loader: MongoDBModuleLoader) -> None:
+    """Test that after one timeout, lookups fail without touching Mongo."""
+    module_loader.circuit_breaker = CircuitBreaker(trip_on=(TimeoutError,))
+    module_loader.collection.find.side_effect = TimeoutError("server selection timed out")
+    importer = MongoDBImporter(module_loader)
+    module_loader.collection.reset_mock()
+
+    with patch.dict(sys.modules, {}, clear=True):
+        for _ in range(5):
+            assert importer.find_spec("lib.logging.utils") is None
+
+    module_loader.collection.find.assert_not_called()
+    assert module_loader.circuit_breaker.stats()["rejected"] == 5
+    with pytest.raises(CircuitOpenError):
+        module_loader.get_data("lib.logging.utils")
+
+
+def test_import_profiler_records_nested_imports(module_loader: MongoDBModuleLoader) -> None:
+    """Test that the active profiler records each Mongo-sourced module nested under its importer."""
+    sources = {
+        "jobs.fx": "from lib.ecb import fx_api\nRATE = fx_api.RATE",
+        "lib.ecb.fx_api": "RATE = 1.1",
+    }
+    module_loader.collection.find.return_value = [{"_id": name} for name in sources]
+    importer = MongoDBImporter(module_loader)
+    module_loader.get_data = MagicMock(side_effect=lambda name: sources[name])
+    profiler = import_profiler.ImportProfiler()
+
+    for mod in ["jobs", "lib", "lib.ecb", *sources]:
+        sys.modules.pop(mod, None)
+    sys.meta_path.insert(0, importer)
+    try:
+        with patch.object(import_profiler, "active_profiler", profiler):
+            assert importlib.import_module("jobs.fx").RATE == 1.1
+    finally:
+        sys.meta_path.remove(importer)
+        for mod in ["jobs", "lib", "lib.ecb", *sources]:
+            sys.modules.pop(mod, None)
+
+    assert profiler.roots == ["jobs", "jobs.fx"]  # Parent packages are imported before, not inside, their children
+    assert profiler.records["jobs.fx"].children == ["lib", "lib.ecb", "lib.ecb.fx_api"]
+    fx_api = profiler.records["lib.ecb.fx_api"]
+    assert fx_api.bytes == len(sources["lib.ecb.fx_api"])
+    assert fx_api.lookup_ms > 0
+    job = profiler.records["jobs.fx"]
+    assert job.cumulative_ms >= job.children_ms >= fx_api.cumulative_ms
+
+
+def test_direct_exec_module_calls_are_serialized(module_loader: MongoDBModuleLoader) -> None:
+    """Test that concurrent direct executions of one module, as hot reloads make, never overlap."""
+    load_manifest(module_loader, ["jobs.fx"])
+    module_loader.get_source = MagicMock(return_value="import time\nimport exec_probe\nexec_probe.enter()\ntime.sleep(0.02)\nexec_probe.exit()\n")
+    running = []
+    overlaps = []
+
+    def enter() -> None:
+        running.append(1)
+        overlaps.append(len(running) > 1)
+
+    probe = types.SimpleNamespace(enter=enter, exit=running.pop)
+    module = types.ModuleType("jobs.fx")
+    with patch.dict(sys.modules, {"exec_probe": probe}), ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda _: module_loader.exec_module(module), range(4)))
+
+    assert overlaps == [False] * 4
+
+
+def test_exec_module_reentered_by_the_same_thread(module_loader: MongoDBModuleLoader) -> None:
+    """Test that a module re-executed from its own execution, as a reload mid-import does, does not deadlock."""
+    load_manifest(module_loader, ["jobs.fx"])
+    module_loader.get_source = MagicMock(return_value="import exec_probe\nexec_probe.run(__name__)\n")
+    module = types.ModuleType("jobs.fx")
+    executed = []
+
+    def run(name: str) -> None:
+        executed.append(name)
+        if len(executed) == 1:
+            module_loader.exec_module(module)
+
+    with patch.dict(sys.modules, {"exec_probe": types.SimpleNamespace(run=run)}):
+        worker = threading.Thread(target=module_loader.exec_module, args=(module,), daemon=True)
+        worker.start()
+        worker.join(timeout=5)
+
+    assert not worker.is_alive()
+    assert executed == ["jobs.fx", "jobs.fx"]
+
+
+def test_concurrent_imports_share_one_fetch_and_exec(module_loader: MongoDBModuleLoader) -> None:
+    """Stress test threads prefetching and importing overlapping modules: one manifest query, fetch and exec each."""
+    names = [f"stress{i % 4}.m{i}" for i in range(20)]
+    imports = {name: [names[i // 2]] for i, name in enumerate(names) if i}
+    sources = {
+        name: "import stress_probe\n"
+        + (f"import {names[i // 2]}\n" if i else "")
+        + "stress_probe.executed.append(__name__)\nimport time\ntime.sleep(0.005)\nREADY = True\n"
+        for i, name in enumerate(names)
+    }
+    module_loader.collection.find.return_value = [{"_id": name} for name in names]
+    importer = MongoDBImporter(module_loader)
+    module_loader.manifest = None
+
+    fetches = Counter()
+    fetch_lock = threading.Lock()
+
+    def record_fetch(fetched: list[str]) -> None:
+        with fetch_lock:
+            fetches.update(fetched)
+        time.sleep(0.02)
+
+    def slow_find(query: dict, *args: object, **kwargs: object) -> list[dict]:
+        if query:  # A prefetch batch
+            record_fetch(query["_id"]["$in"])
+            return [{"_id": name, "content": sources[name]} for name in query["_id"]["$in"]]
+        time.sleep(0.05)
+        return [{"_id": name, "imports": imports.get(name, [])} for name in names]
+
+    def slow_get_data(fullname: str) -> str:
+        record_fetch([fullname])
+        return sources[fullname]
+
+    module_loader.collection.find = MagicMock(side_effect=slow_find)
+    module_loader.get_data = slow_get_data
+    probe = types.SimpleNamespace(executed=[])
+
+    def prefetch_and_import(seed: int) -> list[bool]:
+        order = list(names)
+        random.Random(seed).shuffle(order)
+        if seed % 2:  # Like the runner, prefetching outside the import lock
+            module_loader.prefetch(order[0])
+        return [getattr(importlib.import_module(name), "READY", False) for name in order]
+
+    with patch.dict(sys.modules, {"stress_probe": probe}):
+        sys.meta_path.insert(0, importer)
+        try:
+            with ThreadPoolExecutor(max_workers=32) as pool:
+                results = list(pool.map(prefetch_and_import, range(64)))
+        finally:
+            sys.meta_path.remove(importer)
+            for mod in [f"stress{i}" for i in range(4)] + names:
+                sys.modules.pop(mod, None)
+
+    assert all(all(ready) for ready in results)  # No thread saw a half-initialized module
+    assert sorted(probe.executed) == sorted(names)  # Each module executed once
+    assert fetches == Counter(names)  # And fetched once, by a prefetch or an import
+    manifest_queries = [call for call in module_loader.collection.find.call_args_list if not call.args[0]]
+    assert len(manifest_queries) == 1
+
+
+def test_unrelated_modules_load_in_parallel(module_loader: MongoDBModuleLoader) -> None:
+    """Test that single-flight loading does not serialize imports of different modules."""
+    names = [f"parallel.m{i}" for i in range(16)]
+    load_manifest(module_loader, names)
+    importer = MongoDBImporter(module_loader)
+
+    def slow_get_data(fullname: str) -> str:
+        time.sleep(0.1)
+        return "VALUE = 1"
+
+    module_loader.get_data = slow_get_data
+    sys.meta_path.insert(0, importer)
+    try:
+        importlib.import_module("parallel")
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(names)) as pool:
+            list(pool.map(importlib.import_module, names))
+        elapsed = time.perf_counter() - started
+    finally:
+        sys.meta_path.remove(importer)
+        for mod in ["parallel", *names]:
+            sys.modules.pop(mod, None)
+
+    assert elapsed < 0.1 * len(names) / 2
@@ -0,0 +1,134 @@
+"""Tests for the fork_server module."""
+import json
+import os
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Generator
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from ..dynamic_import_lib import MongoDBModuleLoader
+from ..fork_server import ForkServer, exit_code_from_status, submit
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="The fork server needs os.fork")
+
+
+def execute(argv: list[str]) -> int:
+    """Stand-in for run_job, driven by its first argument."""
+    command = argv[0]
+    if command == "echo":
+        print(" ".join(argv[1:]))
+        print(os.environ.get("MICAP_TEST_VALUE"), file=sys.stderr)
+        return 0
+    if command == "exit":
+        sys.exit(int(argv[1]))
+    if command == "raise":
+        raise ValueError("job failed")
+    if command == "kill":
+        os.kill(os.getpid(), signal.SIGKILL)
+    if command == "sleep":
+        time.sleep(30)
+    return 0
+
+
+@pytest.fixture
+def server() -> Generator[ForkServer, None, None]:
+    """Run a fork server on a temporary socket in a background thread."""
+    with tempfile.TemporaryDirectory() as directory:
+        server = ForkServer(os.path.join(directory, "fork.sock"), execute)
+        server.bind()
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server
+        server.stop()
+        thread.join(timeout=5)
+
+
+def run(server: ForkServer, argv: list[str], env: dict | None = None) -> tuple[int, str, str]:
+    """Submit a job with files as its stdout and stderr, return exit code and output."""
+    with tempfile.TemporaryFile("w+") as stdout, tempfile.TemporaryFile("w+") as stderr:
+        code = submit(argv, server.socket_path, env or {}, (0, stdout.fileno(), stderr.fileno()))
+        stdout.seek(0)
+        stderr.seek(0)
+        return code, stdout.read(), stderr.read()
+
+
+def test_output_and_environment_reach_the_client(server: ForkServer) -> None:
+    """Test that the job's stdout and stderr go to the client's descriptors and its environment is applied."""
+    code, out, err = run(server, ["echo", "hello", "world"], {"MICAP_TEST_VALUE": "forwarded"})
+    assert code == 0
+    assert out == "hello world\n"
+    assert err == "forwarded\n"
+
+
+def test_exit_codes_are_forwarded(server: ForkServer) -> None:
+    """Test that exit codes, uncaught exceptions and killing signals come back as the client's exit code."""
+    assert run(server, ["exit", "3"])[0] == 3
+    code, _, err = run(server, ["raise"])
+    assert code == 1
+    assert "ValueError: job failed" in err
+    assert run(server, ["kill"])[0] == 128 + signal.SIGKILL
+
+
+def test_jobs_run_concurrently_in_isolated_children(server: ForkServer) -> None:
+    """Test that simultaneous submissions each run in their own forked child at the same time."""
+    results = []
+    threads = [threading.Thread(target=lambda i=i: results.append(run(server, ["echo", str(i)]))) for i in range(8)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert time.perf_counter() - start < 5
+    assert sorted(out for _, out, _ in results) == [f"{i}\n" for i in range(8)]
+    assert server.jobs_started == 8
+
+
+def test_job_start_is_sub_second(server: ForkServer) -> None:
+    """Test that a job forked from the warm server starts and finishes within a second."""
+    start = time.perf_counter()
+    assert run(server, ["echo"])[0] == 0
+    assert time.perf_counter() - start < 1
+
+
+def test_signals_are_forwarded_to_the_job(server: ForkServer) -> None:
+    """Test that a signal sent by the client terminates the job and is reported in its exit code."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.connect(server.socket_path)
+        socket.send_fds(conn, [json.dumps({"argv": ["sleep"]}).encode() + b"\n"], [0, 1, 2])
+        replies = conn.makefile("r")
+        assert "pid" in json.loads(replies.readline())
+        conn.sendall(json.dumps({"signal": signal.SIGTERM}).encode() + b"\n")
+        assert json.loads(replies.readline()) == {"exit_code": 128 + signal.SIGTERM}
+
+
+def test_rejects_requests_without_descriptors(server: ForkServer) -> None:
+    """Test that a request arriving without stdio descriptors is answered with an error and not run."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.connect(server.socket_path)
+        conn.sendall(b'{"argv": []}\n')
+        assert "error" in conn.makefile("r").readline()
+    assert server.jobs_started == 0
+
+
+def test_exit_code_from_status() -> None:
+    """Test that wait statuses map to shell-style exit codes, 128 plus the signal for killed jobs."""
+    assert exit_code_from_status(0) == 0
+    assert exit_code_from_status(2 << 8) == 2
+    assert exit_code_from_status(signal.SIGTERM) == 128 + signal.SIGTERM
+
+
+def test_forked_child_drops_the_mongo_client() -> None:
+    """Test that resetting the connection discards the Mongo client inherited from the server."""
+    with patch("pymongo.MongoClient"):
+        loader = MongoDBModuleLoader()
+        loader.client  # noqa: B018
+        loader.collection = MagicMock()
+        loader.reset_connection()
+        assert loader._client is None
+        assert loader._collection is None
@@ -0,0 +1,67 @@
+"""Tests for the import_graph module."""
+from ..import_graph import dependency_closure, reload_order, static_imports
+
+
+def test_static_imports_absolute_and_from() -> None:
+    """Test that plain and from imports yield their module and submodule candidates."""
+    source = "import datetime\nimport lib.logging.utils as log\nfrom lib.market_data.ecb import fx_api, constants\n"
+
+    assert static_imports(source, "jobs.market_data.ecb.fx_api") == [
+        "datetime",
+        "lib.logging.utils",
+        "lib.market_data.ecb",
+        "lib.market_data.ecb.constants",
+        "lib.market_data.ecb.fx_api",
+    ]
+
+
+def test_static_imports_relative() -> None:
+    """Test that relative imports resolve against the module's package."""
+    source = "from . import sibling\nfrom ..common import helpers\nfrom .... import too_far\n"
+
+    assert static_imports(source, "lib.market_data.ecb.fx_api") == [
+        "lib.market_data.common",
+        "lib.market_data.common.helpers",
+        "lib.market_data.ecb",
+        "lib.market_data.ecb.sibling",
+    ]
+    assert static_imports("from .utils import x", "lib.logging", is_package=True) == ["lib.logging.utils", "lib.logging.utils.x"]
+
+
+def test_static_imports_invalid_source() -> None:
+    """Test that unparsable sources have no imports."""
+    assert static_imports("def broken(:", "lib.broken") == []
+
+
+def test_dependency_closure() -> None:
+    """Test that the closure follows imports transitively and includes parent packages."""
+    imports = {
+        "jobs.fx": ["datetime", "lib.ecb.fx_api", "lib.ecb.fx_api.get_rates"],
+        "lib.ecb.fx_api": ["pandas", "lib.logging.utils"],
+        "lib.logging.utils": ["logging", "jobs.fx"],  # Cycles are followed once
+    }
+    known = {"jobs", "jobs.fx", "lib", "lib.ecb", "lib.ecb.fx_api", "lib.logging", "lib.logging.utils", "lib.unused"}
+
+    closure = dependency_closure(["jobs.fx"], imports, known)
+
+    assert sorted(closure) == ["jobs", "jobs.fx", "lib", "lib.ecb", "lib.ecb.fx_api", "lib.logging", "lib.logging.utils"]
+
+
+def test_reload_order_dependencies_first() -> None:
+    """Test that loaded dependents of a changed module are reloaded after it, unloaded ones skipped."""
+    imports = {
+        "jobs.fx": {"lib.ecb.fx_api"},
+        "jobs.rates": {"lib.ecb.fx_api", "lib.logging.utils"},
+        "lib.ecb.fx_api": {"lib.logging.utils"},
+        "lib.logging.utils": {"lib.logging.cycle"},
+        "lib.logging.cycle": {"lib.logging.utils"},
+    }
+    loaded = {"jobs.fx", "lib.ecb.fx_api", "lib.logging.utils", "lib.logging.cycle"}
+
+    assert reload_order(["lib.logging.utils"], imports, loaded) == [
+        "lib.logging.cycle",  # The cycle is broken where it was entered
+        "lib.logging.utils",
+        "lib.ecb.fx_api",
+        "jobs.fx",
+    ]
+    assert reload_order(["jobs.fx", "jobs.unloaded"], imports, loaded) == ["jobs.fx"]
@@ -0,0 +1,58 @@
+"""Tests for the import_profiler module."""
+import json
+from pathlib import Path
+
+from ..import_profiler import ImportProfiler
+
+
+def profile_tree() -> ImportProfiler:
+    """Return a profile of jobs.fx importing lib.utils, with one lookup miss."""
+    profiler = ImportProfiler()
+    profiler.record_lookup("jobs.fx", 0.002, found=True)
+    profiler.begin("jobs.fx")
+    profiler.add("jobs.fx", bytes=120, fetch_ms=1.0, compile_ms=0.5)
+    profiler.record_lookup("lib.utils", 0.001, found=True)
+    profiler.begin("lib.utils")
+    profiler.add("lib.utils", bytes=40, fetch_ms=0.25, exec_ms=0.1)
+    profiler.end("lib.utils")
+    profiler.record_lookup("numexpr", 0.0005, found=False)
+    profiler.add("jobs.fx", exec_ms=2.0)
+    profiler.end("jobs.fx")
+    return profiler
+
+
+def test_profiler_nests_modules_and_splits_self_time() -> None:
+    """Test that child imports are nested under their importer and excluded from its self time."""
+    profiler = profile_tree()
+
+    job, utils = profiler.records["jobs.fx"], profiler.records["lib.utils"]
+    assert profiler.roots == ["jobs.fx"]
+    assert job.children == ["lib.utils"] and utils.parent == "jobs.fx"
+    assert utils.cumulative_ms >= utils.lookup_ms == 1.0
+    assert job.children_ms == utils.cumulative_ms
+    assert abs(job.self_ms + job.children_ms - job.cumulative_ms) < 1e-9
+    assert (profiler.miss_count, profiler.miss_ms) == (1, 0.5)
+
+
+def test_profiler_report_lists_children_first() -> None:
+    """Test that the tree report follows importtime's order and indentation."""
+    lines = profile_tree().report().splitlines()
+
+    assert lines[0].startswith("import time:  self [us] | cumulative")
+    assert lines[1].endswith("|   lib.utils")
+    assert lines[2].endswith("| jobs.fx")
+    assert "1 lookups" in lines[3]
+
+
+def test_profiler_writes_json_and_tree(tmp_path: Path) -> None:
+    """Test that the JSON artifact and tree report are written side by side."""
+    path = tmp_path / "profiles" / "imports.json"
+
+    profile_tree().write(str(path))
+
+    data = json.loads(path.read_text())
+    assert data["roots"] == ["jobs.fx"]
+    assert data["bytes"] == 160
+    assert {module["name"] for module in data["modules"]} == {"jobs.fx", "lib.utils"}
+    assert "started" not in data["modules"][0]
+    assert (tmp_path / "profiles" / "imports.txt").read_text().startswith("import time:")
@@ -0,0 +1,50 @@
+"""Tests for the job_profiler module."""
+import pstats
+import time
+
+import pytest
+
+from ..job_profiler import JobProfiler
+
+
+def busy(seconds: float) -> list[bytes]:
+    """Spin for a while and allocate memory."""
+    deadline = time.perf_counter() + seconds
+    blocks = []
+    while time.perf_counter() < deadline:
+        blocks.append(bytes(10_000))
+    return blocks
+
+
+def test_cpu_profile_writes_pstats_and_collapsed_stacks(tmp_path) -> None:  # noqa: ANN001
+    """Test that a CPU profile writes pstats and collapsed stacks that include the profiled function."""
+    with JobProfiler("cpu", "jobs.fx", "2024-03-22", str(tmp_path)) as profiler:
+        busy(0.1)
+
+    assert set(profiler.artifacts) == {"pstats", "collapsed"}
+    pstats_file = next(tmp_path.glob("jobs.fx_2024-03-22_*.pstats"))
+    stats = pstats.Stats(str(pstats_file))
+    assert any(function == "busy" for _, _, function in stats.stats)
+
+    collapsed = next(tmp_path.glob("*.collapsed")).read_text().splitlines()
+    assert collapsed
+    _stack, count = collapsed[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert any("busy (test_job_profiler.py" in line for line in collapsed)
+
+
+def test_mem_profile_reports_top_allocations(tmp_path) -> None:  # noqa: ANN001
+    """Test that a memory profile writes the peak and the lines that allocated the most."""
+    with JobProfiler("mem", "jobs.fx", "2024-03-22", str(tmp_path)):
+        kept = busy(0.02)
+
+    report = next(tmp_path.glob("*.alloc.txt")).read_text()
+    assert report.startswith("Peak traced memory:")
+    assert "test_job_profiler.py" in report
+    assert kept
+
+
+def test_unknown_mode() -> None:
+    """Test that an unknown profile mode is rejected."""
+    with pytest.raises(ValueError, match="profile mode"):
+        JobProfiler("gpu", "jobs.fx", None)
@@ -0,0 +1,110 @@
+"""Tests for the live_reload module."""
+import importlib
+import sys
+from collections.abc import Generator
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from ..dynamic_import_lib import MongoDBImporter, MongoDBModuleLoader, manifest_fingerprint
+from ..live_reload import CodebaseWatcher
+
+SOURCES = {
+    "jobs.fx": "from lib.ecb import rates\nRATE = rates.RATE * 2",
+    "jobs.unrelated": "VALUE = 1",
+    "lib.ecb.rates": "RATE = 1.5",
+}
+MODULE_NAMES = ["jobs", "lib", "lib.ecb", *SOURCES]
+
+
+def change(operation: str, name: str, content: str | None = None) -> dict:
+    """Build a change stream event on the codebase collection."""
+    event = {"operationType": operation, "documentKey": {"_id": name}}
+    if content is not None:
+        event["fullDocument"] = {"_id": name, "content": content}
+    return event
+
+
+@pytest.fixture
+def loader() -> Generator[MongoDBModuleLoader, None, None]:
+    """Create a loader serving SOURCES, with jobs.fx and jobs.unrelated imported through it."""
+    with patch("pymongo.MongoClient"):
+        loader = MongoDBModuleLoader()
+        loader.collection = MagicMock()
+        loader.collection.find.return_value = [{"_id": name} for name in SOURCES]
+        importer = MongoDBImporter(loader)
+        loader.get_data = MagicMock(side_effect=lambda name: SOURCES[name])
+        loader.fetch_sources = MagicMock(side_effect=lambda names: {name: SOURCES[name] for name in names})
+
+        for mod in MODULE_NAMES:
+            sys.modules.pop(mod, None)
+        sys.meta_path.insert(0, importer)
+        try:
+            importlib.import_module("jobs.fx")
+            importlib.import_module("jobs.unrelated")
+            yield loader
+        finally:
+            sys.meta_path.remove(importer)
+            for mod in [*MODULE_NAMES, "lib.ecb.extra"]:
+                sys.modules.pop(mod, None)
+
+
+def test_runtime_imports_complete_the_import_graph(loader: MongoDBModuleLoader) -> None:
+    """Test that imports observed while executing a module are part of the import graph."""
+    assert "lib.ecb.rates" in loader.import_graph()["jobs.fx"]
+
+
+def test_changed_module_and_dependents_are_reloaded(loader: MongoDBModuleLoader) -> None:
+    """Test that a change re-executes the module and the modules importing it, in dependency order."""
+    watcher = CodebaseWatcher(loader)
+    unrelated = sys.modules["jobs.unrelated"]
+    unrelated.VALUE = "untouched"
+
+    watcher.handle_changes([change("update", "lib.ecb.rates", "RATE = 4.0")])
+    assert sys.modules["jobs.fx"].RATE == 3.0  # Nothing is re-executed until the main thread applies it
+
+    assert watcher.apply_pending() == ["lib.ecb.rates", "jobs.fx"]
+    assert sys.modules["jobs.fx"].RATE == 8.0
+    assert unrelated.VALUE == "untouched"
+    loader.fetch_sources.assert_called_once_with(["jobs.fx"])  # The changed source came with the event
+    assert watcher.apply_pending() == []
+
+
+def test_inserted_and_deleted_modules_update_the_manifest(loader: MongoDBModuleLoader) -> None:
+    """Test that inserts and deletes are mirrored into the manifest and synthesized parents are refreshed."""
+    watcher = CodebaseWatcher(loader, auto_apply=True)
+
+    watcher.handle_changes([change("insert", "lib.ecb.extra", "EXTRA = True"), change("delete", "jobs.unrelated")])
+
+    assert "lib.ecb.extra" in loader.get_manifest()
+    assert "jobs.unrelated" not in loader.get_manifest()
+    assert "extra" in dir(sys.modules["lib.ecb"])
+    assert importlib.import_module("lib.ecb.extra").EXTRA is True
+    assert loader.negative_cache.fingerprint == manifest_fingerprint({"_id": name} for name in loader.stored_modules)
+
+
+def test_watch_applies_batches_and_tracks_resume_token(loader: MongoDBModuleLoader) -> None:
+    """Test that events from the change stream are applied in a batch once the stream goes idle."""
+    watcher = CodebaseWatcher(loader, debounce_seconds=60)
+    events = [change("update", "lib.ecb.rates", "RATE = 0.5"), change("update", "jobs.unrelated", "VALUE = 2"), None]
+
+    stream = MagicMock()
+    stream.alive = True
+    stream.resume_token = {"_data": "token"}
+
+    def try_next() -> dict | None:
+        if not events:
+            watcher._stop.set()
+            return None
+        return events.pop(0)
+
+    stream.try_next.side_effect = try_next
+    loader.collection.watch.return_value.__enter__.return_value = stream
+    watcher.handle_changes = MagicMock(wraps=watcher.handle_changes)
+
+    watcher.watch()
+
+    watcher.handle_changes.assert_called_once()
+    assert len(watcher.handle_changes.call_args.args[0]) == 2
+    assert watcher.pending_reloads == {"lib.ecb.rates", "jobs.unrelated"}
+    assert watcher.resume_token == {"_data": "token"}
@@ -0,0 +1,150 @@
+"""Tests for the memoize module."""
+import argparse
+import os
+import sys
+import threading
+import types
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from ..dynamic_import_lib import MongoDBModuleLoader
+from ..memoize import DirectoryResultStore, _ThreadTee, key_arguments, run_memoized
+
+
+def job_module(memoize: object = True) -> types.ModuleType:
+    """Build a job module whose main prints and returns its run date and counts its calls."""
+    module = types.ModuleType("jobs.fx")
+    module.MEMOIZE = memoize
+    module.calls = 0
+
+    def main(args: argparse.Namespace) -> dict:
+        module.calls += 1
+        print(f"rates for {args.runDate}")
+        return {"runDate": args.runDate, "rate": 1.08}
+
+    module.main = main
+    return module
+
+
+@pytest.fixture
+def store(tmp_path) -> DirectoryResultStore:  # noqa: ANN001
+    """Create a result store in a temporary directory."""
+    return DirectoryResultStore(str(tmp_path))
+
+
+def test_hit_replays_output_without_running(store: DirectoryResultStore, capsys: pytest.CaptureFixture) -> None:
+    """Test that a hit returns the stored result and replays the job's output without calling main."""
+    module = job_module()
+    args = argparse.Namespace(runDate="2024-03-22", logLevel="ERROR")
+
+    assert run_memoized(module, args, store, "code-1") == {"runDate": "2024-03-22", "rate": 1.08}
+    assert capsys.readouterr().out == "rates for 2024-03-22\n"
+
+    # The log level is not part of the key
+    args.logLevel = "DEBUG"
+    assert run_memoized(module, args, store, "code-1") == {"runDate": "2024-03-22", "rate": 1.08}
+    assert capsys.readouterr().out == "rates for 2024-03-22\n"
+    assert module.calls == 1
+
+
+def test_code_arguments_and_force_rerun(store: DirectoryResultStore) -> None:
+    """Test that a change of code hash or key argument misses, and force reruns even on a hit."""
+    module = job_module()
+    run_memoized(module, argparse.Namespace(runDate="2024-03-22"), store, "code-1")
+    run_memoized(module, argparse.Namespace(runDate="2024-03-25"), store, "code-1")
+    run_memoized(module, argparse.Namespace(runDate="2024-03-22"), store, "code-2")
+    assert module.calls == 3
+    run_memoized(module, argparse.Namespace(runDate="2024-03-22"), store, "code-1", force=True)
+    assert module.calls == 4
+
+
+def test_unpicklable_results_are_not_memoized(store: DirectoryResultStore) -> None:
+    """Test that a result that cannot be pickled is returned and the job runs again instead of replaying None."""
+    module = job_module()
+    calls = []
+    module.main = lambda args: calls.append(1) or (lambda: None)
+
+    assert callable(run_memoized(module, argparse.Namespace(runDate="2024-03-22"), store, "code-1"))
+    assert callable(run_memoized(module, argparse.Namespace(runDate="2024-03-22"), store, "code-1"))
+    assert len(calls) == 2
+    assert os.listdir(store.directory) == []
+
+
+def test_upstream_results_are_part_of_the_key(store: DirectoryResultStore) -> None:
+    """Test that a DAG step reruns when an upstream result changes and replays when it is the same."""
+    module = job_module()
+
+    for rate in (1.08, 1.09, 1.08):
+        run_memoized(module, argparse.Namespace(runDate="2024-03-22", upstream={"fx": {"USD": rate}}), store, "code-1")
+
+    assert module.calls == 2
+
+
+def test_unpicklable_upstream_results_run_the_step(store: DirectoryResultStore) -> None:
+    """Test that a step whose upstream result cannot be pickled always runs."""
+    module = job_module()
+    args = argparse.Namespace(runDate="2024-03-22", upstream={"fx": lambda: None})
+
+    run_memoized(module, args, store, "code-1")
+    run_memoized(module, args, store, "code-1")
+
+    assert module.calls == 2
+
+
+def test_concurrent_jobs_store_only_their_own_output(store: DirectoryResultStore) -> None:
+    """Test that jobs memoized on concurrent threads each store only what their own thread printed."""
+    # DAG steps run on threads: each memoized output holds what its own thread printed
+    barrier = threading.Barrier(2, timeout=5)
+    modules = []
+    for name in ("fx", "rates"):
+        module = job_module()
+        module.__name__ = f"jobs.{name}"
+
+        def main(args: argparse.Namespace, name: str = name) -> str:
+            for i in range(3):
+                print(f"{name} {i}")
+                barrier.wait()
+            return name
+
+        module.main = main
+        modules.append(module)
+    threads = [threading.Thread(target=run_memoized, args=(module, argparse.Namespace(runDate="2024-03-22"), store, "code-1")) for module in modules]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    outputs = sorted(record["stdout"] for record in (store.get(path.removesuffix(".pickle")) for path in os.listdir(store.directory)) if record)
+    assert outputs == ["fx 0\nfx 1\nfx 2\n", "rates 0\nrates 1\nrates 2\n"]
+    assert not isinstance(sys.stdout, _ThreadTee)
+
+
+def test_key_arguments() -> None:
+    """Test that MEMOIZE selects the key arguments, runDate for True, and disables memoizing when false or absent."""
+    assert key_arguments(job_module(True)) == ("runDate",)
+    assert key_arguments(job_module(("runDate", "venue"))) == ("runDate", "venue")
+    assert key_arguments(job_module(False)) is None
+    assert key_arguments(types.ModuleType("jobs.plain")) is None
+
+
+def test_code_hash_covers_the_import_closure() -> None:
+    """Test that the code hash changes with the job's imported modules and ignores modules it does not import."""
+    with patch("pymongo.MongoClient"):
+        loader = MongoDBModuleLoader()
+        loader.collection = MagicMock()
+        entries = [
+            {"_id": "jobs.fx", "imports": ["lib.rates"], "content_hash": "a"},
+            {"_id": "lib.rates", "content_hash": "b"},
+            {"_id": "lib.other", "content_hash": "c"},
+        ]
+        loader.collection.find.return_value = entries
+        before = loader.code_hash("jobs.fx")
+
+        entries[2]["content_hash"] = "c2"
+        loader.manifest = None
+        assert loader.code_hash("jobs.fx") == before
+
+        entries[1]["content_hash"] = "b2"
+        loader.manifest = None
+        assert loader.code_hash("jobs.fx") != before
@@ -0,0 +1,29 @@
+"""Tests for the negative_cache module."""
+from ..negative_cache import NegativeLookupCache
+
+
+def test_negative_cache_counters() -> None:
+    """Test that absent names count as hits and present names as misses."""
+    cache = NegativeLookupCache(["lib", "lib.logging", "lib.logging.utils"], fingerprint=3)
+
+    assert cache.is_known_absent("numexpr")
+    assert cache.is_known_absent("numexpr")
+    assert not cache.is_known_absent("lib.logging")
+
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["names"] == 3
+    assert stats["fingerprint"] == 3
+
+
+def test_negative_cache_reads_the_manifest_without_copying() -> None:
+    """Test that a manifest dict is used directly and probing it keeps no per-name state."""
+    manifest = {"lib": True, "lib.ecb": False}
+    cache = NegativeLookupCache(manifest)
+
+    for i in range(10000):
+        assert cache.is_known_absent(f"thirdparty.probe_{i}")
+
+    assert cache.names is manifest
+    assert vars(cache).keys() == {"names", "fingerprint", "hits", "misses"}
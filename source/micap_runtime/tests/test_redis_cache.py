@@ -0,0 +1,115 @@
+"""Tests for the redis_cache module."""
+import hashlib
+from collections.abc import Generator
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from ..dynamic_import_lib import MongoDBImporter, MongoDBModuleLoader
+from ..redis_cache import KEY_PREFIX, RedisSourceCache
+
+
+class FakeRedis:
+    """Dict-backed stand-in for the redis client calls the tier makes."""
+
+    def __init__(self) -> None:
+        """Initialize an empty store that is reachable."""
+        self.store: dict[str, str] = {}
+        self.mget_calls = 0
+        self.fail = False
+
+    def mget(self, keys: list[str]) -> list[str | None]:
+        """Return the values of keys, or raise ConnectionError while failing."""
+        if self.fail:
+            raise ConnectionError("redis unavailable")
+        self.mget_calls += 1
+        return [self.store.get(key) for key in keys]
+
+    def pipeline(self, transaction: bool = True) -> MagicMock:
+        """Return a pipeline whose writes go straight to the store."""
+        pipeline = MagicMock()
+        pipeline.set.side_effect = lambda key, value, ex=None: self.store.__setitem__(key, value)
+        return pipeline
+
+
+def digest(source: str) -> str:
+    """Return the content hash of a source."""
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+@pytest.fixture
+def fake_redis() -> FakeRedis:
+    """Create an empty fake Redis."""
+    return FakeRedis()
+
+
+def test_get_many_counts_hits_and_misses(fake_redis: FakeRedis) -> None:
+    """Test that sources are read by content hash in one round trip."""
+    cache = RedisSourceCache(fake_redis)
+    cache.set_many({"h1": "VALUE = 1"})
+
+    assert fake_redis.store == {KEY_PREFIX + "h1": "VALUE = 1"}
+    assert cache.get_many(["h1", "h2", "h1"]) == {"h1": "VALUE = 1"}
+    assert fake_redis.mget_calls == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_unavailable_redis_is_skipped(fake_redis: FakeRedis) -> None:
+    """Test that a connection error opens the breaker and later reads skip Redis."""
+    cache = RedisSourceCache(fake_redis)
+    fake_redis.fail = True
+
+    assert cache.get_many(["h1"]) == {}
+    fake_redis.fail = False
+    assert cache.get_many(["h1"]) == {}
+
+    assert fake_redis.mget_calls == 0
+    assert cache.stats()["circuit"]["state"] == "open"
+
+
+@pytest.fixture
+def loader(fake_redis: FakeRedis) -> Generator[MongoDBModuleLoader, None, None]:
+    """Create a loader with a Redis tier, whose manifest lists a job importing two library modules."""
+    with patch("pymongo.MongoClient"):
+        loader = MongoDBModuleLoader()
+        loader.collection = MagicMock()
+        loader.source_cache = RedisSourceCache(fake_redis)
+        loader.collection.find.return_value = [
+            {"_id": "jobs.fx", "content_hash": digest("import lib.a"), "imports": ["lib.a", "lib.b"]},
+            {"_id": "lib.a", "content_hash": digest("A = 1")},
+            {"_id": "lib.b", "content_hash": digest("B = 2")},
+        ]
+        MongoDBImporter(loader)
+        yield loader
+
+
+def test_prefetch_reads_redis_before_mongo(loader: MongoDBModuleLoader, fake_redis: FakeRedis) -> None:
+    """Test that only the sources missing from Redis are fetched from Mongo, and are then written back."""
+    loader.source_cache.set_many({digest("import lib.a"): "import lib.a", digest("A = 1"): "A = 1"})
+    loader.collection.find = MagicMock(return_value=[{"_id": "lib.b", "content": "B = 2"}])
+
+    assert sorted(loader.prefetch("jobs.fx")) == ["jobs.fx", "lib.a", "lib.b"]
+
+    assert loader.collection.find.call_args.args[0] == {"_id": {"$in": ["lib.b"]}}
+    assert loader.prefetched == {"jobs.fx": "import lib.a", "lib.a": "A = 1", "lib.b": "B = 2"}
+    assert fake_redis.store[KEY_PREFIX + digest("B = 2")] == "B = 2"
+
+
+def test_single_module_falls_back_to_mongo(loader: MongoDBModuleLoader, fake_redis: FakeRedis) -> None:
+    """Test that a module fetched on its own is served from Redis once another runner stored it."""
+    loader.get_data = MagicMock(return_value="A = 1")
+
+    assert loader.get_source("lib.a") == "A = 1"
+    assert loader.get_source("lib.a") == "A = 1"
+
+    loader.get_data.assert_called_once_with("lib.a")
+    assert loader.source_cache.hits == 1
+
+
+def test_source_not_matching_its_hash_is_not_cached(loader: MongoDBModuleLoader, fake_redis: FakeRedis) -> None:
+    """Test that a module rewritten since the manifest was loaded is not stored under the old hash."""
+    loader.get_data = MagicMock(return_value="A = 2")
+
+    assert loader.get_source("lib.a") == "A = 2"
+
+    assert fake_redis.store == {}
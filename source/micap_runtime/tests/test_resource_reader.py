@@ -0,0 +1,83 @@
+"""Tests for the resource_reader module."""
+import importlib
+import importlib.resources
+import io
+import sys
+from collections.abc import Generator
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from ..dynamic_import_lib import MongoDBImporter, MongoDBModuleLoader
+from ..resource_reader import CACHE_DIR_ENV
+
+RESOURCES = {
+    "lib/ecb/data/rates.csv": b"date,rate\n2025-03-20,1.08\n",
+    "lib/ecb/templates/report.html": b"<h1>{title}</h1>",
+    "lib/ecb/config.yaml": b"base: EUR\n",
+}
+
+
+@pytest.fixture
+def loader() -> Generator[MongoDBModuleLoader, None, None]:
+    """Create a loader with an importable lib.ecb package and RESOURCES released below it."""
+    with patch("pymongo.MongoClient"):
+        loader = MongoDBModuleLoader()
+        loader.collection = MagicMock()
+        loader.collection.find.return_value = [{"_id": "lib.ecb", "is_package": True}, {"_id": "lib.ecb.fx_api"}]
+        loader.get_data = MagicMock(return_value="")
+        loader.load_resource_entries = MagicMock(
+            return_value=[{"_id": path, "content_hash": f"hash-{i}", "length": len(data)} for i, (path, data) in enumerate(RESOURCES.items())]
+        )
+        loader.open_resource = MagicMock(side_effect=lambda entry: io.BytesIO(RESOURCES[entry["_id"]]))
+        importer = MongoDBImporter(loader)
+
+        sys.meta_path.insert(0, importer)
+        try:
+            yield loader
+        finally:
+            sys.meta_path.remove(importer)
+            for mod in ["lib", "lib.ecb", "lib.ecb.fx_api"]:
+                sys.modules.pop(mod, None)
+
+
+def test_files_reads_and_lists_resources(loader: MongoDBModuleLoader) -> None:
+    """Test that importlib.resources.files serves released files of a Mongo package."""
+    root = importlib.resources.files("lib.ecb")
+
+    assert sorted(child.name for child in root.iterdir()) == ["config.yaml", "data", "templates"]
+    assert (root / "data").is_dir() and not (root / "data").is_file()
+    assert root.joinpath("data/rates.csv").read_text().splitlines() == ["date,rate", "2025-03-20,1.08"]
+    with (root / "templates" / "report.html").open("rb") as stream:
+        assert stream.read(4) == b"<h1>"
+    with pytest.raises(FileNotFoundError):
+        (root / "missing.csv").read_bytes()
+    loader.load_resource_entries.assert_called_once()
+
+
+def test_module_has_no_resource_reader(loader: MongoDBModuleLoader) -> None:
+    """Test that only packages expose resources."""
+    assert loader.get_resource_reader("lib.ecb.fx_api") is None
+    assert loader.get_resource_reader("lib.ecb") is not None
+
+
+def test_as_file_streams_to_a_temporary_file(loader: MongoDBModuleLoader) -> None:
+    """Test that as_file provides a local copy for memory mapping and removes it afterwards."""
+    with importlib.resources.as_file(importlib.resources.files("lib.ecb") / "data" / "rates.csv") as path:
+        assert path.read_bytes() == RESOURCES["lib/ecb/data/rates.csv"]
+    assert not path.exists()
+
+
+def test_as_file_reuses_the_resource_cache(loader: MongoDBModuleLoader, tmp_path: Path) -> None:
+    """Test that with a cache directory the local copy is kept under its content hash and reused."""
+    resource = importlib.resources.files("lib.ecb") / "config.yaml"
+
+    with patch.dict("os.environ", {CACHE_DIR_ENV: str(tmp_path)}):
+        with importlib.resources.as_file(resource) as first:
+            assert first.read_bytes() == b"base: EUR\n"
+        with importlib.resources.as_file(resource) as second:
+            assert second == first
+
+    assert first.exists() and first.name == "hash-2.yaml"
+    assert loader.open_resource.call_count == 1
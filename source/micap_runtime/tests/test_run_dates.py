@@ -0,0 +1,60 @@
+"""Tests for the run_dates module."""
+import datetime
+
+import pytest
+
+from ..run_dates import easter_sunday, expand_run_dates, is_range, is_target_business_day, partition_run_dates
+
+
+def test_single_run_dates_are_unchanged() -> None:
+    """Test that a single run date expands to itself and only colon-separated spans are ranges."""
+    assert expand_run_dates("2024-03-22") == ["2024-03-22"]
+    assert expand_run_dates("2024-03-22T06:00:00") == ["2024-03-22T06:00:00"]
+    assert not is_range("2024-03-22T06:00:00")
+    assert is_range("2024-03-01:2024-03-31:weekdays")
+
+
+def test_calendars() -> None:
+    """Test that ranges expand on the daily, weekdays, month-end and TARGET calendars."""
+    assert expand_run_dates("2024-03-01:2024-03-04") == ["2024-03-01", "2024-03-02", "2024-03-03", "2024-03-04"]
+    assert expand_run_dates("2024-03-01:2024-03-04:weekdays") == ["2024-03-01", "2024-03-04"]
+    assert expand_run_dates("2024-01-15:2024-04-15:month_end") == ["2024-01-31", "2024-02-29", "2024-03-31"]
+    # Good Friday and Easter Monday 2024
+    assert expand_run_dates("2024-03-28:2024-04-02:target") == ["2024-03-28", "2024-04-02"]
+
+
+def test_target_holidays() -> None:
+    """Test that TARGET closing days, including the Easter holidays, are not business days."""
+    assert easter_sunday(2025) == datetime.date(2025, 4, 20)
+    assert not is_target_business_day(datetime.date(2025, 12, 25))
+    assert not is_target_business_day(datetime.date(2025, 5, 1))
+    assert is_target_business_day(datetime.date(2025, 5, 2))
+
+
+def test_partitions_cover_every_run_date_once() -> None:
+    """Test that partitions split a range into consecutive spans covering each run date exactly once."""
+    partitions = partition_run_dates("2024-03-01:2024-03-31:weekdays", 5)
+    assert partitions[:2] == ["2024-03-01:2024-03-07:weekdays", "2024-03-08:2024-03-14:weekdays"]
+    expanded = [day for partition in partitions for day in expand_run_dates(partition)]
+    assert expanded == expand_run_dates("2024-03-01:2024-03-31:weekdays")
+    assert partition_run_dates("2024-03-22", 5) == ["2024-03-22"]
+
+
+def test_partitions_never_span_skipped_dates() -> None:
+    """Test that skipped run dates are left out and split the partitions around them."""
+    partitions = partition_run_dates("2024-03-04:2024-03-15:weekdays", 3, skip={"2024-03-06", "2024-03-11"})
+    assert partitions == [
+        "2024-03-04:2024-03-05:weekdays",
+        "2024-03-07:2024-03-08:weekdays",
+        "2024-03-12:2024-03-14:weekdays",
+        "2024-03-15:2024-03-15:weekdays",
+    ]
+    assert partition_run_dates("2024-03-22", 5, skip={"2024-03-22"}) == []
+
+
+def test_invalid_ranges() -> None:
+    """Test that unknown calendars and ranges ending before they start are rejected."""
+    with pytest.raises(ValueError, match="calendar"):
+        expand_run_dates("2024-03-01:2024-03-31:fortnightly")
+    with pytest.raises(ValueError, match="ends before"):
+        expand_run_dates("2024-03-31:2024-03-01")
@@ -0,0 +1,109 @@
+"""Tests for the shared_frames module."""
+import os
+import uuid
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from ..shared_frames import SharedFrame, holders, share  # noqa: E402
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="Shared datasets are attached from forked workers")
+
+
+@pytest.fixture
+def name() -> str:
+    """Return a dataset name unique to the test."""
+    return f"micap_test_{uuid.uuid4().hex[:12]}"
+
+
+def book_summary() -> pd.DataFrame:
+    """Build a frame with mapped and pickled columns."""
+    return pd.DataFrame(
+        {
+            "mark_price": np.linspace(60000.0, 61000.0, 1000),
+            "open_interest": np.arange(1000, dtype=np.int64),
+            "timestamp": pd.date_range("2025-03-20", periods=1000, freq="s"),
+            "instrument": [f"BTC-{i}" for i in range(1000)],
+        },
+        index=pd.Index(np.arange(1000, 2000), name="row"),
+    )
+
+
+def in_child(check: object) -> int:
+    """Run a check in a forked child and return its exit code."""
+    pid = os.fork()
+    if pid == 0:
+        try:
+            check()
+            code = 0
+        except BaseException:
+            code = 1
+        os._exit(code)
+    return os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1])
+
+
+def test_frame_is_a_read_only_view_of_the_block(name: str) -> None:
+    """Test that an attached frame equals the published one, is read-only and is a view of the block, not a copy."""
+    expected = book_summary()
+    with SharedFrame.publish(name, expected) as handle:
+        frame = handle.frame()
+        pd.testing.assert_frame_equal(frame, expected)
+        with pytest.raises(ValueError, match="read-only"):
+            frame["mark_price"].to_numpy()[0] = 0.0
+
+        # Writing the block shows through frames already taken: they are not copies
+        with SharedFrame.attach(name) as attached:
+            before = attached.frame()
+            start = handle._data_offset + handle.header["columns"][0][3]
+            handle._shm.buf[start : start + 8] = np.float64(1.5).tobytes()
+            assert before["mark_price"].iloc[0] == 1.5
+
+
+def test_workers_attach_and_last_holder_unlinks(name: str) -> None:
+    """Test that a forked worker attaches without loading again and the block is unlinked when the last holder closes."""
+    array = np.arange(12, dtype=np.float64).reshape(3, 4)
+    handle = SharedFrame.publish(name, array)
+
+    def worker() -> None:
+        with share(name, lambda: pytest.fail("loaded again")) as attached:
+            view = attached.frame()
+            assert view.shape == (3, 4) and view[2, 3] == 11.0 and not view.flags.writeable
+            assert os.getpid() in holders(name)
+
+    assert in_child(worker) == 0
+    assert holders(name) == [os.getpid()]
+    assert os.path.exists(os.path.join("/dev/shm", name))
+    handle.close()
+    assert not os.path.exists(os.path.join("/dev/shm", name))
+    with pytest.raises(FileNotFoundError):
+        SharedFrame.attach(name)
+
+
+def test_dead_holders_are_pruned(name: str) -> None:
+    """Test that a process that exited without closing no longer counts as a holder and the name can be shared again."""
+    def leak() -> None:
+        # Exits without closing, as a crashed worker would
+        SharedFrame.publish(name, np.zeros(4))
+        os._exit(0)
+
+    in_child(leak)
+    assert holders(name) == []
+    with share(name, lambda: np.ones(4)) as handle:
+        assert handle.frame().tolist() == [1.0] * 4
+
+
+def test_share_loads_once(name: str) -> None:
+    """Test that a second share of the same name attaches to the first instead of loading again."""
+    loads = []
+    with share(name, lambda: loads.append(1) or np.arange(3)) as first, share(name, lambda: loads.append(2) or np.arange(3)) as second:
+        assert first.frame().tolist() == second.frame().tolist() == [0, 1, 2]
+    assert loads == [1]
+
+
+def test_object_arrays_are_rejected(name: str) -> None:
+    """Test that object arrays are refused before a block is created."""
+    with pytest.raises(TypeError, match="numeric"):
+        SharedFrame.publish(name, np.array(["a", "b"], dtype=object))
+    assert holders(name) == []
@@ -0,0 +1,65 @@
+"""Tests for the single_flight module."""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ..single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_result() -> None:
+    """Test that callers arriving while a call is in flight wait for it instead of calling again."""
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch() -> str:
+        calls.append(1)
+        release.wait(5)
+        return "source"
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(flight.do, "lib.utils", fetch) for _ in range(8)]
+        while flight.stats()["shared"] < 7:
+            threading.Event().wait(0.001)
+        release.set()
+
+    assert [future.result() for future in futures] == ["source"] * 8
+    assert len(calls) == 1
+    assert flight.stats() == {"calls": 1, "shared": 7, "in_flight": 0}
+
+
+def test_errors_are_shared_and_not_cached() -> None:
+    """Test that waiters see the leader's error and a later call runs again."""
+    flight = SingleFlight()
+
+    with pytest.raises(KeyError):
+        flight.do("lib.utils", lambda: {}["missing"])
+
+    assert flight.do("lib.utils", lambda: "retried") == "retried"
+
+
+def test_do_many_serves_waiters_per_key() -> None:
+    """Test that a batch claims only keys not in flight and waiters receive their key's result."""
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def fetch_batch(keys: list[str]) -> dict[str, str]:
+        started.set()
+        release.wait(5)
+        return {key: key.upper() for key in keys if key != "c"}
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        batch = pool.submit(flight.do_many, ["a", "b", "c"], fetch_batch)
+        started.wait(5)
+        waiter = pool.submit(flight.do, "b", lambda: "fetched again")
+        missing = pool.submit(flight.do, "c", lambda: "fetched again")
+        assert flight.do_many(["a", "d"], lambda keys: {key: key for key in keys}) == ["d"]
+        while flight.stats()["shared"] < 2:
+            threading.Event().wait(0.001)
+        release.set()
+
+    assert batch.result() == ["a", "b", "c"]
+    assert waiter.result() == "B"
+    assert missing.result() is None
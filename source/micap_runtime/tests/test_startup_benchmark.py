@@ -0,0 +1,25 @@
+"""Tests for the startup benchmark harness."""
+from ..benchmarks.startup_benchmark import regressions, run
+
+
+def test_cold_and_warm_startup_metrics() -> None:
+    """Test that a cold start compiles everything and a warm start serves it from the bytecode cache."""
+    cold, warm = run(sizes=(20,), rtt_ms=0, repeat=1)
+
+    assert (cold["scenario"], warm["scenario"]) == ("cold", "warm")
+    # Manifest and one prefetch batch
+    assert cold["round_trips"] == warm["round_trips"] == 2
+    assert cold["bytes"] == warm["bytes"] > 0
+    # 20 library modules, the job and three synthesized packages
+    assert (cold["cache_hits"], warm["cache_hits"]) == (0, 24)
+
+
+def test_regressions_compare_deterministic_metrics() -> None:
+    """Test that only round trips and bytes above the baseline are regressions."""
+    baseline = {"results": [{"modules": 50, "scenario": "cold", "ms": 10.0, "round_trips": 3, "bytes": 1000}]}
+    results = [
+        {"modules": 50, "scenario": "cold", "ms": 99.0, "round_trips": 4, "bytes": 1000},
+        {"modules": 500, "scenario": "cold", "ms": 99.0, "round_trips": 40, "bytes": 9000},
+    ]
+
+    assert regressions(results, baseline) == ["50 modules cold: round_trips 4 > baseline 3"]
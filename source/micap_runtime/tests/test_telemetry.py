@@ -0,0 +1,83 @@
+"""Tests for the telemetry module."""
+import socket
+import threading
+from collections.abc import Callable, Generator
+from pathlib import Path
+
+import pytest
+
+from ..telemetry import JobTelemetry, ilp_line, network_bytes
+
+NET_DEV = """Inter-|   Receive                                                |  Transmit
+ face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets errs drop fifo colls carrier compressed
+    lo:   5000      10    0    0    0     0          0         0     5000      10    0    0    0     0       0          0
+  eth0:   1200      12    0    0    0     0          0         0      800       8    0    0    0     0       0          0
+  eth1:     30       1    0    0    0     0          0         0       20       1    0    0    0     0       0          0
+"""
+
+
+def test_ilp_line_escapes_tags_and_types_fields() -> None:
+    """Test that tags are escaped, None values dropped and fields written as ILP floats, integers and strings."""
+    line = ilp_line(
+        "micap_job_runs",
+        {"job_module": "jobs.fx", "run_date": "2024-03-22 06:00", "code_version": None},
+        {"wall_ms": 1.5, "mongo_round_trips": 3, "note": 'say "hi"', "skipped": None},
+        123,
+    )
+    assert line == 'micap_job_runs,job_module=jobs.fx,run_date=2024-03-22\\ 06:00 wall_ms=1.5,mongo_round_trips=3i,note="say \\"hi\\"" 123\n'
+
+
+def test_network_bytes_skips_loopback(tmp_path: Path) -> None:
+    """Test that received and sent bytes are summed over every interface except loopback."""
+    path = tmp_path / "dev"
+    path.write_text(NET_DEV)
+    assert network_bytes(str(path)) == (1230, 820)
+    assert network_bytes(str(tmp_path / "missing")) is None
+
+
+@pytest.fixture
+def questdb() -> Generator[tuple[str, Callable[[], bytes]], None, None]:
+    """Accept one ILP connection on a local port, with a function returning what it received once closed."""
+    server = socket.create_server(("127.0.0.1", 0))
+    received = []
+
+    def accept() -> None:
+        conn, _ = server.accept()
+        with conn:
+            received.append(conn.makefile("rb").read())
+
+    thread = threading.Thread(target=accept, daemon=True)
+    thread.start()
+
+    def read() -> bytes:
+        thread.join(timeout=5)
+        return b"".join(received)
+
+    yield f"127.0.0.1:{server.getsockname()[1]}", read
+    thread.join(timeout=5)
+    server.close()
+
+
+def test_job_run_is_written_as_one_row(questdb: tuple[str, Callable[[], bytes]]) -> None:
+    """Test that a failed job run is sent to QuestDB as one row with its status and resource usage."""
+    address, read = questdb
+    with pytest.raises(ValueError), JobTelemetry("jobs.fx", "2024-03-22", "v1", address):
+        sum(range(100_000))
+        raise ValueError("fetch failed")
+
+    line = read().decode()
+    assert line.startswith("micap_job_runs,job_module=jobs.fx,run_date=2024-03-22,code_version=v1,status=failed ")
+    fields = dict(field.split("=") for field in line.split(" ")[1].split(","))
+    assert float(fields["wall_ms"]) > 0
+    assert fields["mongo_round_trips"] == "0i"
+    assert "cpu_user_s" in fields and "peak_rss_bytes" in fields
+
+
+def test_unreachable_questdb_never_fails_the_job() -> None:
+    """Test that a job finishes normally when QuestDB cannot be reached."""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    with JobTelemetry("jobs.fx", "2024-03-22", None, f"127.0.0.1:{port}") as telemetry:
+        pass
+    assert ",code_version=current,status=ok " in telemetry.row
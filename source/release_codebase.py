@@ -19,15 +19,22 @@ __maintainer__ = "Dave Dawson"
 __email__ = "davedawson.co@gmail.com"
 __status__ = "Production"
 
+import datetime
+import hashlib
+import io
+import json
 import logging
 import os
+import zipfile
 from urllib.parse import quote_plus
 
+import gridfs
 from lib.logging.utils import setup_logging
-from pymongo import MongoClient
+from micap_runtime.import_graph import static_imports
+from micap_runtime.redis_cache import RedisSourceCache
+from pymongo import MongoClient, UpdateOne
 
 logger = setup_logging(level=logging.INFO, module_name="release_codebase")
-init_hierarchy = {}
 
 # Replace 'your_username' and 'your_password' with your actual username and password
 username = "dd_python_codebase"
@@ -38,11 +45,117 @@ client = MongoClient(uri)
 db = client["dwdrun"]  # Replace 'your_database' with your actual database name
 collection = db["codebase"]  # Replace 'your_collection' with your actual collection name
 
+# Immutable, content-addressed sources and the release snapshots that reference them
+blob_collection = db["codebase_blobs"]
+release_collection = db["codebase_releases"]
+current_release_id = "current"
+
+# Must match the bundle settings in micap_runtime/dynamic_import_lib.py
+bundle_bucket = "codebase_bundles"
+bundle_name = "codebase.zip"
+bundle_manifest_name = "manifest.json"
+bundle_revisions_kept = 3
+
+# Must match the resource settings in micap_runtime/dynamic_import_lib.py
+resource_bucket = "codebase_resources"
+resource_index_collection = db["codebase_resource_index"]
+resource_chunk_size = 1024 * 1024
+
+# Shared source tier read by runners before Mongo, db 0 is the Celery broker
+redis_url = os.environ.get("MICAP_REDIS_URL", "redis://localhost:6379/1")
+
+
+def content_hash(content: str) -> str:
+    """Return the sha256 hex digest identifying a module's source."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def iter_source_files(directory: str):  # noqa: ANN201
+    """Yield the relative path and content of every Python file under a directory, in a stable order.
+
+    Args:
+        directory: Root directory path to traverse.
+
+    Yields:
+        Tuples of (relative_file_path, content).
+    """
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+        for file in sorted(files):
+            if file.endswith(".py"):  # Other files are released as resources, see iter_resource_files
+                file_path = os.path.join(root, file)
+                with open(file_path) as f:
+                    yield os.path.relpath(file_path, directory), f.read()
+
+
+def iter_resource_files(directory: str):  # noqa: ANN201
+    """Yield the relative and absolute path of every non-Python data file under a directory.
+
+    Hidden files and directories, ``__pycache__`` and compiled files are skipped.
+
+    Args:
+        directory: Root directory path to traverse.
+
+    Yields:
+        Tuples of (relative_file_path, file_path).
+    """
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if d != "__pycache__" and not d.startswith("."))
+        for file in sorted(files):
+            if not file.endswith((".py", ".pyc")) and not file.startswith("."):
+                file_path = os.path.join(root, file)
+                yield os.path.relpath(file_path, directory), file_path
+
+
+def file_hash(file_path: str) -> str:
+    """Return the sha256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(resource_chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def publish_resources(directory: str) -> list[dict]:
+    """Upload the non-Python files under a directory to GridFS and index them by path.
+
+    Files are stored once per content hash, the hash being the GridFS file id, and
+    streamed from disk in chunks so large reference data never has to fit in memory.
+    The index maps each path, e.g. ``lib/ecb/data/rates.csv``, to its content hash;
+    the importer serves it through ``importlib.resources``.
+
+    Args:
+        directory: Root directory path to traverse.
+
+    Returns:
+        Index entries with the path as ``_id``, ``content_hash`` and ``length``.
+    """
+    bucket = gridfs.GridFSBucket(db, bucket_name=resource_bucket, chunk_size_bytes=resource_chunk_size)
+    files = db[f"{resource_bucket}.files"]
+    entries = []
+    for relative_file_path, file_path in iter_resource_files(directory):
+        path = relative_file_path.replace(os.sep, "/")
+        digest = file_hash(file_path)
+        if files.find_one({"_id": digest}, {"_id": 1}) is None:
+            with open(file_path, "rb") as f:
+                bucket.upload_from_stream_with_id(digest, path, f, metadata={"path": path})
+            logger.info(f"Uploaded resource {path} as {digest}")
+        entries.append({"_id": path, "content_hash": digest, "length": os.path.getsize(file_path)})
+
+    if entries:
+        resource_index_collection.bulk_write(
+            [UpdateOne({"_id": entry["_id"]}, {"$set": entry}, upsert=True) for entry in entries], ordered=False
+        )
+    logger.info(f"Published {len(entries)} resources")
+    return entries
+
+
 def traverse_directory(directory: str) -> None:
     """Traverse a directory and upload Python modules to MongoDB.
 
-    This function walks through the directory structure, processes Python files,
-    and ensures proper package hierarchy by managing __init__.py files.
+    This function walks through the directory structure and uploads Python files.
+    Directories without an __init__.py need no document of their own, the importer
+    derives them from the ``parent`` field of the modules below them.
 
     Args:
         directory: Root directory path to traverse.
@@ -50,34 +163,16 @@ def traverse_directory(directory: str) -> None:
     Returns:
         None
     """
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            if "__pycache__" in root:
-                continue
-            file_path = os.path.join(root, file)
-            relative_file_path = os.path.relpath(file_path, directory)
-            path_parts = relative_file_path.split(os.sep)
-
-            current_path = ""
-            for i, part in enumerate(path_parts[:-1]):  # Exclude the filename
-                current_path = part if i == 0 else os.path.join(current_path, part)
-                if init_hierarchy.get(part, True):
-                    upsert_document(part, "__init__.py")
-                    init_hierarchy[part] = False
-
-            if file.endswith(".py"): # TODO: make this work for all files e.g. readme or configs
-                file_path = os.path.join(root, file)
-                with open(file_path) as f:
-                    content = f.read()
-                    relative_file_path = os.path.relpath(file_path, directory)
-                    upsert_document(relative_file_path, content)
+    for relative_file_path, content in iter_source_files(directory):
+        upsert_document(relative_file_path, content)
 
 def upsert_document(relative_file_path: str, content: str) -> None:
     """Upload a Python module to MongoDB with proper hierarchy handling.
 
     This function processes the file path to create appropriate MongoDB records,
-    handling special cases like __init__.py files and maintaining proper
-    package structure.
+    handling special cases like __init__.py files. Each record stores its
+    ``parent`` package and an ``is_package`` flag so the importer can resolve
+    packages and list direct children without regex scans.
 
     Args:
         relative_file_path: Path to the file relative to project root.
@@ -86,18 +181,185 @@ def upsert_document(relative_file_path: str, content: str) -> None:
     Returns:
         None
     """
-    record_name = relative_file_path.replace("/", ".")
+    record = module_record(relative_file_path, content)
+    record_name = record.pop("_id")
+    document = {"content": content, **record}
 
-    if record_name.endswith("__init__.py"):
-        record_name = record_name[:-12]  # Remove '.__init__.py' from the end
+    # Upsert content into MongoDB collection
+    write = collection.update_one({"_id": record_name}, {"$set": document}, upsert=True)
+    if write.modified_count > 0:
+        logger.info(f"Upserted document {record_name} into MongoDB")
+
+def module_record(relative_file_path: str, content: str | None = None) -> dict:
+    """Return the module name, parent and package flag for a source file path.
 
+    Args:
+        relative_file_path: Path to the file relative to project root.
+        content: Source of the module, when given its content hash and static imports are included.
+
+    Returns:
+        Dict with ``_id``, ``parent`` and ``is_package`` keys, plus ``content_hash`` and
+        ``imports`` when the content is given.
+    """
+    record_name = relative_file_path.replace(os.sep, ".")
+    is_package = record_name.endswith("__init__.py")
+    if is_package:
+        record_name = record_name[:-12]  # Remove '.__init__.py' from the end
     if record_name.endswith(".py"):
         record_name = record_name[:-3]  # Remove '.py' from the end
+    record = {"_id": record_name, "parent": record_name.rpartition(".")[0] or None, "is_package": is_package}
+    if content is not None:
+        record["content_hash"] = content_hash(content)
+        record["imports"] = static_imports(content, record_name, is_package)
+    return record
+
+
+def build_bundle(directory: str, version: str | None = None) -> bytes:
+    """Build a deflated zip of every Python module under a directory.
+
+    The archive holds the sources at their relative paths plus a manifest listing
+    each module's name, parent, package flag, content hash and path inside the archive.
+
+    Args:
+        directory: Root directory path to bundle.
+        version: Release version the bundle was built for, recorded in the manifest.
+
+    Returns:
+        The zip archive as bytes.
+    """
+    modules = []
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=9) as bundle:
+        for relative_file_path, content in iter_source_files(directory):
+            path = relative_file_path.replace(os.sep, "/")
+            bundle.writestr(path, content)
+            modules.append({**module_record(relative_file_path, content), "path": path})
+
+        manifest = {"created": datetime.datetime.now(datetime.timezone.utc).isoformat(), "version": version, "modules": modules}
+        bundle.writestr(bundle_manifest_name, json.dumps(manifest))
+    return buffer.getvalue()
+
+
+def versioned_bundle_name(version: str) -> str:
+    """Return the GridFS file name of the immutable bundle for a release version."""
+    return f"codebase-{version}.zip"
+
+
+def publish_bundle(directory: str, version: str | None = None) -> None:
+    """Publish the source tree as a single compressed bundle in GridFS.
+
+    Runners started with MICAP_IMPORT_MODE=bundle fetch this bundle in one read and
+    serve every import from memory. Older revisions beyond ``bundle_revisions_kept``
+    are removed. When a release version is given, an immutable copy is also stored
+    under the versioned name for runners pinned to that version.
+
+    Args:
+        directory: Root directory path to bundle.
+        version: Release version returned by publish_release.
+
+    Returns:
+        None
+    """
+    data = build_bundle(directory, version)
+    bucket = gridfs.GridFSBucket(db, bucket_name=bundle_bucket)
+
+    if version is not None:
+        pinned_name = versioned_bundle_name(version)
+        # Versioned bundles are immutable, an existing one already holds the same content
+        if next(iter(bucket.find({"filename": pinned_name}, limit=1)), None) is None:
+            bucket.upload_from_stream(pinned_name, data, metadata={"content_type": "application/zip", "version": version})
+            logger.info(f"Published immutable bundle {pinned_name}")
+
+    file_id = bucket.upload_from_stream(bundle_name, data, metadata={"content_type": "application/zip", "version": version})
+    logger.info(f"Published codebase bundle {bundle_name} ({len(data)} bytes) as {file_id}")
+
+    revisions = bucket.find({"filename": bundle_name}, sort=[("uploadDate", -1)], skip=bundle_revisions_kept)
+    for revision in revisions:
+        bucket.delete(revision._id)
+
+
+def populate_source_cache(sources: dict[str, str]) -> None:
+    """Write released sources to the shared Redis tier, so runners of the new release skip Mongo.
+
+    Redis is optional, the release carries on without it.
+
+    Args:
+        sources: Module sources by content hash.
+
+    Returns:
+        None
+    """
+    try:
+        cache = RedisSourceCache.connect(redis_url)
+    except ImportError as e:
+        logger.info(f"Skipping the Redis source cache: {e}")
+        return
+    cache.set_many(sources)
+    if cache.errors:
+        logger.warning(f"Unable to populate the Redis source cache at {redis_url}")
+    else:
+        logger.info(f"Populated the Redis source cache with {len(sources)} sources")
+
+
+def publish_release(directory: str, resources: list[dict] | None = None) -> str:
+    """Publish an immutable, content-hashed snapshot of the source tree.
+
+    Each source is stored once in the blob collection under its sha256, and written
+    to the shared Redis tier under the same hash, and the snapshot lists every module
+    with its content hash. The release version is the
+    hash of that listing, so republishing an unchanged tree yields the same version.
+    The ``current`` pointer is left alone, promote_release moves it once everything the
+    release needs has been published.
+
+    Args:
+        directory: Root directory path to release.
+        resources: Resource index entries returned by publish_resources, pinned with the release.
+
+    Returns:
+        The release version.
+    """
+    modules = []
+    blob_writes = []
+    sources = {}
+    for relative_file_path, content in iter_source_files(directory):
+        record = module_record(relative_file_path, content)
+        blob_writes.append(UpdateOne({"_id": record["content_hash"]}, {"$setOnInsert": {"content": content}}, upsert=True))
+        sources[record["content_hash"]] = content
+        modules.append(record)
+
+    if blob_writes:
+        blob_collection.bulk_write(blob_writes, ordered=False)
+    populate_source_cache(sources)
+
+    listed = sorted((module["_id"], module["content_hash"]) for module in modules)
+    if resources:
+        listed.append(sorted((resource["_id"], resource["content_hash"]) for resource in resources))
+    listing = json.dumps(listed)
+    version = hashlib.sha256(listing.encode("utf-8")).hexdigest()[:16]
+    now = datetime.datetime.now(datetime.timezone.utc)
+    snapshot = {"created": now, "modules": modules, "resources": resources or []}
+    release_collection.update_one({"_id": version}, {"$setOnInsert": snapshot}, upsert=True)
+    logger.info(f"Published release {version} with {len(modules)} modules")
+    return version
+
+
+def promote_release(version: str) -> None:
+    """Move the ``current`` pointer to a published release.
+
+    Called last, so runners following ``current`` never see a release whose snapshot or
+    pinned bundle is not written yet; runners started with ``--codeVersion`` keep loading
+    the version they were pinned to.
+
+    Args:
+        version: Release version returned by publish_release.
+
+    Returns:
+        None
+    """
+    now = datetime.datetime.now(datetime.timezone.utc)
+    release_collection.update_one({"_id": current_release_id}, {"$set": {"version": version, "updated": now}}, upsert=True)
+    logger.info(f"Promoted release {version} to {current_release_id}")
 
-    # Upsert content into MongoDB collection
-    write = collection.update_one({"_id": record_name}, {"$set": {"content": content}}, upsert=True)
-    if write.modified_count > 0:
-        logger.info(f"Upserted document {record_name} into MongoDB")
 
 def clear_collection() -> None:
     """Clear all documents from the MongoDB collection.
@@ -114,7 +376,9 @@ def clear_collection() -> None:
 def main() -> None:
     """Main entry point of the script.
 
-    Processes the source directory and uploads all Python modules to MongoDB.
+    Processes the source directory and uploads all Python modules and data files
+    to MongoDB, then publishes the same tree as an immutable release and a
+    single-fetch bundle.
     The source directory path is hardcoded for the current project structure.
 
     Returns:
@@ -122,6 +386,11 @@ def main() -> None:
     """
     directory_path = "/Users/daviddawson/Library/Mobile Documents/com~apple~CloudDocs/Documents/projects/mi_capital/source"
     traverse_directory(directory_path)
+    resources = publish_resources(directory_path)
+    version = publish_release(directory_path, resources)
+    publish_bundle(directory_path, version)
+    # Last, so the pointer never names a release whose bundle is missing
+    promote_release(version)
     # Uncomment the line below to clear the collection (use with caution)
     # clear_collection()
 